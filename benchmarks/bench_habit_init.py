@@ -0,0 +1,104 @@
+"""
+micro-benchmark for the construction of Habit objects (parsing) and the break calculation of evaluate(),
+and for the debug-logs of the time_handler helpers with and without the guard by the log-level.
+every measurement is done with the log-level above (ERROR) and below (DEBUG) the level of the debug-logs, the
+records are formatted but not written, so the log-file is not touched.
+
+execute from the root of the project:
+python -m benchmarks.bench_habit_init
+"""
+import json
+import logging
+import timeit
+from datetime import datetime, timedelta
+from helper import const_handler, time_handler
+from habits import habit
+
+const = const_handler.ConstHandler()
+
+__repeat__ = 5
+__number__ = 2000
+__log_levels__ = (logging.ERROR, logging.DEBUG)
+
+
+class __FormattingHandler__(logging.Handler):
+    """
+    formats every record like a file handler would and drops it
+    """
+    def emit(self, record):
+        self.format(record)
+
+
+def __create_habit_data__(days_since_created, days_since_checked, periodicity):
+    """
+    creates the parameters of a habit like they are stored in the database
+
+    :return: tuple of parameters for Habit()
+    """
+    now = datetime.now()
+    created = now - timedelta(days=days_since_created)
+    last_checked = str(now - timedelta(days=days_since_checked)) if days_since_checked is not None else ''
+    break_history = json.dumps({str(created.year): {str(created.month): 3}})
+    return (1, 'benchmark_user', 'benchmark habit', '', periodicity, str(created), '', last_checked, 0, 0,
+            break_history)
+
+
+def __start_of_day_format__(date):
+    """
+    get_start_of_day() before the change, the message is formatted before logging checks the level
+    """
+    adjusted_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    logging.debug("input date: {original}, adjusted_date: {changed}".format(original=date, changed=adjusted_date))
+    return adjusted_date
+
+
+def __start_of_day_unguarded__(date):
+    """
+    get_start_of_day() with deferred formatting but without the guard
+    """
+    adjusted_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    logging.debug('input date: %s, adjusted_date: %s', date, adjusted_date)
+    return adjusted_date
+
+
+def __measure__(function):
+    """
+    :return: best time of all runs per call in microseconds
+    """
+    return min(timeit.repeat(function, repeat=__repeat__, number=__number__)) / __number__ * 1e6
+
+
+def main():
+    scenarios = {
+        'daily, checked yesterday': __create_habit_data__(60, 1, const.get_periodicity_daily()),
+        'daily, 1 year without check': __create_habit_data__(400, 365, const.get_periodicity_daily()),
+        'weekly, checked this week': __create_habit_data__(60, 0, const.get_periodicity_weekly()),
+        'weekly, never checked (5 years)': __create_habit_data__(1825, None, const.get_periodicity_weekly()),
+    }
+    now = datetime.now()
+    log_variants = {
+        'get_start_of_day, str.format': lambda: __start_of_day_format__(now),
+        'get_start_of_day, %-args unguarded': lambda: __start_of_day_unguarded__(now),
+        'get_start_of_day, %-args guarded': lambda: time_handler.get_start_of_day(now),
+    }
+
+    root = logging.getLogger()
+    saved_level, saved_handlers = root.level, root.handlers[:]
+    root.handlers = [__FormattingHandler__()]
+    try:
+        for level in __log_levels__:
+            root.setLevel(level)
+            print('log-level {}, best of {} runs:'.format(logging.getLevelName(level), __repeat__))
+            for name, habit_data in scenarios.items():
+                microseconds = __measure__(lambda: habit.Habit(*habit_data).evaluate())
+                print('{name:<40}{microseconds:>10.2f}us per habit'.format(name=name, microseconds=microseconds))
+            for name, function in log_variants.items():
+                microseconds = __measure__(function)
+                print('{name:<40}{microseconds:>10.2f}us per call'.format(name=name, microseconds=microseconds))
+    finally:
+        root.setLevel(saved_level)
+        root.handlers = saved_handlers
+
+
+if __name__ == '__main__':
+    main()
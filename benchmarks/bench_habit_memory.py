@@ -0,0 +1,116 @@
+"""
+memory benchmark for holding many Habit objects, compares the slotted Habit with the same state in a per-instance dict
+(the layout of Habit before __slots__), and compares Habit.get_memory_estimate() (used by habits_store.HabitsStore)
+with the memory allocated for generated habits with up to 3 years of history
+
+execute from the root of the project:
+python -m benchmarks.bench_habit_memory
+"""
+import json
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from helper import const_handler
+from habits import habit
+from benchmarks import dataset_generator
+
+const = const_handler.ConstHandler()
+
+__habit_count__ = 100000
+__generated_habit_count__ = 10000
+
+
+class __UnslottedHabit__:
+    """
+    holds the same attributes as a Habit in its __dict__
+    """
+
+
+def __create_habits__(count):
+    """
+    creates habits like they are loaded from the database, evaluated for today so no breaks are calculated
+
+    :param count: integer
+
+    :return: list of habits
+    """
+    today = datetime.now()
+    created = today - timedelta(days=60)
+    break_history = json.dumps({str(created.year): {str(created.month): 3}})
+    return [habit.Habit(habit_id, 'benchmark_user', 'benchmark habit {}'.format(habit_id), '',
+                        const.get_periodicity_daily(), str(created), '', str(today), 1, 5, break_history,
+                        str(today.date()))
+            for habit_id in range(count)]
+
+
+def __create_generated_habits__(rows):
+    """
+    creates habits from generated rows and calculates their breaks
+
+    :param rows: list of rows from dataset_generator.generate_habit_row()
+
+    :return: list of habits
+    """
+    habits = [habit.Habit(habit_id, *row) for habit_id, row in enumerate(rows)]
+    for current_habit in habits:
+        current_habit.evaluate()
+    return habits
+
+
+def __to_unslotted__(current_habit):
+    """
+    copies the state of a habit into an object with a per-instance dict, the values are shared with the habit
+
+    :param current_habit: habit
+
+    :return: __UnslottedHabit__
+    """
+    unslotted_habit = __UnslottedHabit__()
+    for name in habit.Habit.__slots__:
+        setattr(unslotted_habit, name, getattr(current_habit, name))
+    return unslotted_habit
+
+
+def __measure__(function, *args):
+    """
+    measures the memory allocated by the result of function
+
+    :return: tuple of result and allocated bytes
+    """
+    tracemalloc.start()
+    result = function(*args)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def main():
+    habits, habits_bytes = __measure__(__create_habits__, __habit_count__)
+
+    # only the objects are measured, the values are shared with the habits above
+    habit_objects_bytes = __measure__(lambda: [object.__new__(habit.Habit) for _ in range(__habit_count__)])[1]
+    unslotted_bytes = __measure__(lambda: [__to_unslotted__(current_habit) for current_habit in habits])[1]
+
+    print('{} habits, allocated by tracemalloc:'.format(__habit_count__))
+    print('{name:<40}{size:>10.1f}MB'.format(name='habits with all values', size=habits_bytes / 1e6))
+    print('{name:<40}{size:>10.1f} bytes per habit'.format(name='slotted objects',
+                                                             size=habit_objects_bytes / __habit_count__))
+    print('{name:<40}{size:>10.1f} bytes per habit'.format(name='objects with __dict__',
+                                                             size=unslotted_bytes / __habit_count__))
+
+    # the rows are created before the measurement, only the habits created from them are allocated
+    rng = random.Random(2025)
+    now = datetime.now()
+    rows = [dataset_generator.generate_habit_row(rng, 'benchmark_user', now, 3)
+            for _ in range(__generated_habit_count__)]
+    generated_habits, generated_bytes = __measure__(__create_generated_habits__, rows)
+    estimated_bytes = sum(current_habit.get_memory_estimate() for current_habit in generated_habits)
+    print('{} generated habits with up to 3 years of history:'.format(__generated_habit_count__))
+    print('{name:<40}{size:>10.1f} bytes per habit'.format(name='allocated by tracemalloc',
+                                                             size=generated_bytes / __generated_habit_count__))
+    print('{name:<40}{size:>10.1f} bytes per habit'.format(name='Habit.get_memory_estimate()',
+                                                             size=estimated_bytes / __generated_habit_count__))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+benchmark suite of the Habits functions on a generated dataset (see dataset_generator.py), every benchmark runs in the
+'MEMORY' and in the 'SQL' query mode. the peak memory of one call is stored in extra_info['peak_memory'].
+the file is not collected by the default test run.
+
+execute from the root of the project (size of the dataset with HABITS_BENCH_USERS and HABITS_BENCH_HABITS):
+python -m pytest benchmarks/bench_habits_suite.py
+"""
+import os
+import tracemalloc
+from datetime import datetime, timedelta
+import pytest
+from helper import const_handler, db_handler, time_handler
+from habits import habits_handler
+from benchmarks import dataset_generator
+
+const = const_handler.ConstHandler()
+
+__query_modes__ = ['MEMORY', 'SQL']
+
+__sorted_getters__ = ['get_habits_by_streak', 'get_habits_by_longest_streak', 'get_habits_by_break',
+                      'get_habits_by_last_month_breaks', 'get_habits_by_created']
+
+
+def __record_peak_memory__(benchmark, function, *args):
+    """
+    calls function once while tracing the allocations and stores the peak in benchmark.extra_info['peak_memory']
+
+    :return: result of function
+    """
+    tracemalloc.start()
+    result = function(*args)
+    benchmark.extra_info['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    now = datetime.now()
+    generated = dataset_generator.generate_dataset(tmp_path_factory.mktemp('habits_bench'),
+                                                   int(os.environ.get('HABITS_BENCH_USERS', 20)),
+                                                   int(os.environ.get('HABITS_BENCH_HABITS', 200)), now=now)
+    generated['now'] = now
+    yield generated
+    db_handler.close_all_pools()
+
+
+@pytest.fixture(params=__query_modes__)
+def habits(request, dataset):
+    current_habits = habits_handler.Habits(dataset['habits_db'], request.param,
+                                           time_handler.FrozenClock(dataset['now']))
+    current_habits.select_user(dataset['user_ids'][0])
+    return current_habits
+
+
+def test_select_user(benchmark, habits, dataset):
+    user_ids = dataset['user_ids']
+    __record_peak_memory__(benchmark, habits.select_user, user_ids[-1])
+    benchmark(habits.select_user, user_ids[len(user_ids) // 2])
+
+
+def test_check_habit(benchmark, habits):
+    habit_id = habits.get_habits_by_periodicity(const.get_periodicity_daily())[0].get_id()
+    clock = habits.__clock__
+    clock.advance(timedelta(days=1))
+    __record_peak_memory__(benchmark, habits.check_habit, habit_id)
+
+    # a new day before every round, so the habit can be checked again
+    benchmark.pedantic(habits.check_habit, args=(habit_id,), setup=lambda: clock.advance(timedelta(days=1)),
+                       rounds=50)
+    assert habits.get_habit(habit_id).is_checked()
+
+
+def test_get_habits_by_periodicity(benchmark, habits):
+    __record_peak_memory__(benchmark, habits.get_habits_by_periodicity, const.get_periodicity_weekly())
+    benchmark(habits.get_habits_by_periodicity, const.get_periodicity_daily())
+
+
+@pytest.mark.parametrize('getter', __sorted_getters__)
+def test_sorted_habits(benchmark, habits, getter):
+    # top 5 like the terminal interface
+    function = lambda: getattr(habits, getter)(limit=5)
+    __record_peak_memory__(benchmark, function)
+    benchmark(function)
+
+
+def test_get_unchecked_habits(benchmark, habits):
+    __record_peak_memory__(benchmark, habits.get_unchecked_habits)
+    benchmark(habits.get_unchecked_habits)
+
+
+def test_habit_init_and_catch_up(benchmark, dataset):
+    # not evaluated yet, the breaks since the last check of every habit are calculated again
+    rows = [row[:11] + ('',) for row in db_handler.get_pool(dataset['habits_db']).execute(
+        'SELECT {} FROM habits WHERE user_id = ?'.format(habits_handler.__habit_columns__),
+        (dataset['user_ids'][0],), fetch=True)]
+    clock = time_handler.FrozenClock(dataset['now'])
+    break_histories = {} if const.get_db_break_storage() == 'TABLE' else None
+
+    def create_habits():
+        created_habits = [habits_handler.__create_habit__(row, clock, break_histories) for row in rows]
+        for current_habit in created_habits:
+            current_habit.evaluate()
+        return created_habits
+
+    __record_peak_memory__(benchmark, create_habits)
+    benchmark(create_habits)
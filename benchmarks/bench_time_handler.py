@@ -0,0 +1,133 @@
+"""
+micro-benchmarks for time_handler.parse_string_to_datetime() against the former strptime implementation
+and for the day/week comparisons and the break calculation with datetime objects against the integer ordinal
+functions used by Habit
+
+execute from the root of the project:
+python -m benchmarks.bench_time_handler
+"""
+import timeit
+from datetime import datetime, timedelta
+from helper import time_handler
+
+__repeat__ = 5
+__number__ = 20
+
+
+def __parse_with_strptime__(string_date):
+    """
+    former implementation of parse_string_to_datetime() as reference
+    """
+    try:
+        return datetime.strptime(string_date, '%Y-%m-%d %H:%M:%S.%f')
+    except ValueError:
+        try:
+            return datetime.strptime(string_date, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+
+
+def __count_breaks_by_datetime__(first_break_date, end_date, step):
+    """
+    former break calculation as reference, steps through every period and counts it into its month
+
+    :return: dictionary {(year, month): count}
+    """
+    breaks_per_month = {}
+    current_date = first_break_date
+    while current_date < end_date:
+        month = (current_date.year, current_date.month)
+        breaks_per_month[month] = breaks_per_month.get(month, 0) + 1
+        current_date += step
+    return breaks_per_month
+
+
+def __print_results__(results, title):
+    """
+    runs every benchmark and prints the best time and the speedup against the first one
+
+    :param results: dictionary {name: function}
+    :param title: string describing the measured calls
+    """
+    print('{}, best of {} runs:'.format(title, __repeat__))
+    baseline = None
+    for name, benchmark in results.items():
+        best = min(timeit.repeat(benchmark, repeat=__repeat__, number=__number__))
+        baseline = best if baseline is None else baseline
+        print('{name:<40}{seconds:>10.4f}s{speedup:>10.1f}x'.format(name=name, seconds=best, speedup=baseline / best))
+
+
+def main():
+    start_date = datetime(year=2020, month=1, day=1, hour=8, minute=30, second=15, microsecond=123456)
+    # both stored formats, like created (with microseconds) and last_break (start of day, without microseconds)
+    date_strings = [str(start_date + timedelta(days=day)) for day in range(1000)]
+    date_strings += [str((start_date + timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0))
+                     for day in range(1000)]
+
+    for parsed_string in date_strings:
+        assert time_handler.parse_string_to_datetime(parsed_string) == __parse_with_strptime__(parsed_string)
+
+    def parse_all(parse_function):
+        for date_string in date_strings:
+            parse_function(date_string)
+
+    results = {
+        'strptime (former)': lambda: parse_all(__parse_with_strptime__),
+        'fromisoformat (uncached)': lambda: parse_all(time_handler.__parse_stored_datetime__.__wrapped__),
+        'parse_string_to_datetime (memoized)': lambda: parse_all(time_handler.parse_string_to_datetime),
+    }
+
+    __print_results__(results, 'parsing {} date-strings'.format(len(date_strings) * __number__))
+
+    __compare_periods__(date_strings)
+
+
+def __compare_periods__(date_strings):
+    """
+    compares "is it this week?" like Habit.is_checked() and the weekly break calculation of
+    Habit.__evaluate_breaks__() with datetime objects and with the ordinal functions of time_handler.
+    the ordinal side calls the public functions like Habit does, including the conversion of the date.
+    """
+    dates = [time_handler.parse_string_to_datetime(date_string) for date_string in date_strings]
+    now = sorted(dates)[len(dates) // 2]
+    monday = time_handler.get_start_of_week(now)
+    week = time_handler.get_week_ordinal(time_handler.get_day_ordinal(now))
+
+    def same_week_by_ordinal(date):
+        return time_handler.get_week_ordinal(time_handler.get_day_ordinal(date)) == week
+
+    assert [time_handler.get_start_of_week(date) == monday for date in dates] \
+           == [same_week_by_ordinal(date) for date in dates]
+
+    results = {
+        'same week by datetime (former)': lambda: [time_handler.get_start_of_week(date) == monday for date in dates],
+        'same week by ordinal': lambda: [same_week_by_ordinal(date) for date in dates],
+    }
+    __print_results__(results, 'comparing {} dates with this week'.format(len(dates) * __number__))
+
+    # weekly breaks from the monday after the last interaction till this monday, for the dates before now
+    last_interactions = [date for date in dates if date < now]
+    this_monday = time_handler.get_monday_ordinal(week)
+
+    def breaks_by_datetime(date):
+        return __count_breaks_by_datetime__(time_handler.get_start_of_week(date) + timedelta(days=7), monday,
+                                            timedelta(days=7))
+
+    def breaks_by_ordinal(date):
+        first_break_day = time_handler.get_monday_ordinal(
+            time_handler.get_week_ordinal(time_handler.get_day_ordinal(date)) + 1)
+        return time_handler.count_periods_per_month_by_ordinal(first_break_day, this_monday, 7)
+
+    assert [breaks_by_datetime(date) for date in last_interactions] \
+           == [breaks_by_ordinal(date) for date in last_interactions]
+
+    results = {
+        'weekly breaks by datetime (former)': lambda: [breaks_by_datetime(date) for date in last_interactions],
+        'weekly breaks by ordinal': lambda: [breaks_by_ordinal(date) for date in last_interactions],
+    }
+    __print_results__(results, 'calculating the weekly breaks of {} habits'.format(
+        len(last_interactions) * __number__))
+
+
+if __name__ == '__main__':
+    main()
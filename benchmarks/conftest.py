@@ -0,0 +1,91 @@
+"""
+pytest configuration of the benchmark suite (see bench_habits_suite.py).
+uses the benchmark fixture of pytest-benchmark if it is installed, otherwise a minimal fixture with the same call
+signature measures the rounds with time.perf_counter() and prints a summary at the end of the run.
+
+provided fixtures:
+benchmark (only without pytest-benchmark)
+"""
+import statistics
+import time
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+    __has_pytest_benchmark__ = True
+except ImportError:
+    __has_pytest_benchmark__ = False
+
+# measuring time per test for the rounds of the minimal fixture, calibrated from the first round
+__max_time__ = 0.5
+__min_rounds__ = 5
+__max_rounds__ = 1000
+
+__results__ = []
+
+
+class __Benchmark__:
+    """
+    minimal replacement of the pytest-benchmark fixture
+
+    provided functions:
+    __call__()
+    pedantic()
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.extra_info = {}
+        self.timings = []
+
+    def __run__(self, target, args, kwargs, setup, rounds, iterations, warmup_rounds):
+        """
+        measures rounds x iterations calls of target, setup is called before every round and may return (args, kwargs)
+
+        :return: result of the last call of target
+        """
+        result = None
+        for round_number in range(warmup_rounds + rounds):
+            if setup is not None:
+                setup_result = setup()
+                if setup_result is not None:
+                    args, kwargs = setup_result
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*args, **kwargs)
+            duration = (time.perf_counter() - start) / iterations
+            if round_number >= warmup_rounds:
+                self.timings.append(duration)
+        __results__.append(self)
+        return result
+
+    def __call__(self, target, *args, **kwargs):
+        start = time.perf_counter()
+        result = target(*args, **kwargs)
+        self.timings.append(time.perf_counter() - start)
+        rounds = min(__max_rounds__, max(__min_rounds__, int(__max_time__ / max(self.timings[0], 1e-9)))) - 1
+        self.__run__(target, args, kwargs, None, rounds, 1, 0)
+        return result
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=1, warmup_rounds=0, iterations=1):
+        return self.__run__(target, args, kwargs if kwargs is not None else {}, setup, rounds, iterations,
+                            warmup_rounds)
+
+
+if not __has_pytest_benchmark__:
+    @pytest.fixture
+    def benchmark(request):
+        return __Benchmark__(request.node.name)
+
+    def pytest_terminal_summary(terminalreporter):
+        if len(__results__) == 0:
+            return
+        terminalreporter.section('benchmarks (pytest-benchmark is not installed, times in ms)')
+        terminalreporter.write_line('{:<60}{:>8}{:>12}{:>12}{:>12}{:>14}'.format(
+            'name', 'rounds', 'min', 'mean', 'max', 'peak memory'))
+        for result in __results__:
+            peak_memory = result.extra_info.get('peak_memory')
+            terminalreporter.write_line('{:<60}{:>8}{:>12.3f}{:>12.3f}{:>12.3f}{:>14}'.format(
+                result.name, len(result.timings), min(result.timings) * 1e3,
+                statistics.mean(result.timings) * 1e3, max(result.timings) * 1e3,
+                '{:.1f}KB'.format(peak_memory / 1e3) if peak_memory is not None else '-'))
@@ -0,0 +1,136 @@
+"""
+non-interactive generator for synthetic benchmark databases with users x habits and years of checks and breaks.
+unlike habits_test_db_entries.py it never touches the databases of the app, it writes into its own directory.
+
+execute from the root of the project:
+python -m benchmarks.dataset_generator --users 100 --habits 50 --years 3 --output ./benchmarks/data
+
+provided functions:
+generate_habit_row()
+generate_dataset()
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from helper import const_handler, db_handler, migration_handler
+
+const = const_handler.ConstHandler()
+
+__habit_titles__ = ['Go for a walk', 'Read', 'Meditate', 'Drink water', 'Stretch', 'Learn a language', 'Vacuum',
+                    'Call family', 'Water the plants', 'Write a journal', 'Practice guitar', 'Clean the kitchen']
+
+# share of habits that are not checked anymore, they need a break catch-up when they are loaded
+__abandoned_share__ = 0.2
+
+
+def generate_habit_row(rng, user_id, now, years):
+    """
+    simulates one habit period by period from its creation until its last activity.
+    every habit has its own probability to be checked in a period, missed periods are counted as breaks.
+
+    :param rng: random.Random
+    :param user_id: string
+    :param now: datetime the dataset is created for
+    :param years: integer - maximum age of the habit in years
+
+    :return: tuple of the columns user_id, title, description, periodicity, created_at, last_break, last_checked,
+             streak, longest_streak, break_history and evaluated_through
+    """
+    daily = rng.random() < 0.7
+    period = timedelta(days=1 if daily else 7)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    created = now - timedelta(days=rng.randint(1, 365 * years), seconds=rng.randint(0, 86399))
+    # abandoned habits stop some days or weeks ago, active ones are simulated until yesterday
+    last_activity = today - timedelta(days=rng.randint(2, 120)) if rng.random() < __abandoned_share__ \
+        else today - timedelta(days=1)
+    reliability = rng.uniform(0.3, 0.98)
+
+    break_history = {}
+    streak = longest_streak = 0
+    last_checked = last_break = None
+    period_start = created.replace(hour=0, minute=0, second=0, microsecond=0) + period
+    while period_start <= last_activity:
+        if rng.random() < reliability:
+            last_checked = period_start + timedelta(hours=rng.randint(6, 22), minutes=rng.randint(0, 59))
+            streak += 1
+            longest_streak = max(longest_streak, streak)
+        else:
+            history_year = break_history.setdefault(str(period_start.year), {})
+            history_year[str(period_start.month)] = history_year.get(str(period_start.month), 0) + 1
+            last_break = period_start
+            streak = 0
+        period_start += period
+
+    evaluated_through = str(last_activity.date()) if period_start > created + period else None
+    return (user_id, rng.choice(__habit_titles__), '',
+            const.get_periodicity_daily() if daily else const.get_periodicity_weekly(), str(created),
+            str(last_break) if last_break is not None else '', str(last_checked) if last_checked is not None else '',
+            streak, longest_streak, json.dumps(break_history), evaluated_through)
+
+
+def generate_dataset(directory, users, habits_per_user, years=3, seed=2025, now=None):
+    """
+    creates habits.db and user.db in the given directory, existing databases in it are replaced.
+    the breaks are written as json, Habits() converts them if breakStorage is TABLE.
+
+    :param directory: path of the directory for the databases
+    :param users: integer - number of users
+    :param habits_per_user: integer - number of habits of every user
+    :param years: integer - maximum age of the habits in years (default 3)
+    :param seed: integer - seed of the random generator, the same seed creates the same dataset (default 2025)
+    :param now: datetime the dataset is created for (optional, default datetime.now())
+
+    :return: dictionary with the paths 'habits_db' and 'users_db' and the list of 'user_ids' (strings)
+    """
+    now = now if now is not None else datetime.now()
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    habits_db = os.path.join(directory, 'habits.db')
+    users_db = os.path.join(directory, 'user.db')
+    for database in (habits_db, users_db):
+        if os.path.exists(database):
+            os.remove(database)
+
+    users_pool = db_handler.ConnectionPool(users_db, 1, 16, db_handler.get_pragmas())
+    with users_pool.connection() as connection:
+        migration_handler.migrate_users_db(connection)
+    users_pool.executemany('INSERT INTO users (name, deactivated) VALUES (?, 0)',
+                           [('benchmark user {}'.format(index),) for index in range(users)])
+    user_ids = [str(row[0]) for row in users_pool.execute('SELECT id FROM users ORDER BY id', fetch=True)]
+    users_pool.close()
+
+    habits_pool = db_handler.ConnectionPool(habits_db, 1, 16, db_handler.get_pragmas())
+    with habits_pool.connection() as connection:
+        migration_handler.migrate_habits_db(connection)
+    with habits_pool.transaction():
+        for user_id in user_ids:
+            habits_pool.executemany('''INSERT INTO habits (user_id, title, description, periodicity, created_at,
+                    last_break, last_checked, streak, longest_streak, break_history, evaluated_through)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                                    [generate_habit_row(rng, user_id, now, years) for _ in range(habits_per_user)])
+    habits_pool.close()
+
+    return {'habits_db': habits_db, 'users_db': users_db, 'user_ids': user_ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='creates synthetic databases for the benchmarks')
+    parser.add_argument('--users', type=int, default=100, help='number of users (default 100)')
+    parser.add_argument('--habits', type=int, default=50, help='habits per user (default 50)')
+    parser.add_argument('--years', type=int, default=3, help='maximum age of the habits in years (default 3)')
+    parser.add_argument('--seed', type=int, default=2025, help='seed of the random generator (default 2025)')
+    parser.add_argument('--output', default='./benchmarks/data', help='directory of the databases')
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = generate_dataset(arguments.output, arguments.users, arguments.habits, arguments.years, arguments.seed)
+    print('created {} habits for {} users in {:.1f}s: {}'.format(arguments.users * arguments.habits,
+                                                                 arguments.users, time.perf_counter() - start,
+                                                                 dataset['habits_db']))
+
+
+if __name__ == '__main__':
+    main()
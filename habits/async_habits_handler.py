@@ -0,0 +1,181 @@
+"""
+provides the AsyncHabits object, the asyncio front end of Habits
+"""
+import asyncio
+from helper import async_handler
+from habits import habits_handler
+
+
+class AsyncHabits:
+    """
+    AsyncHabits object, calls the functions of one Habits object on the thread pool of an AsyncRunner, so the event
+    loop is not blocked by sqlite. the calls of one AsyncHabits are done one after another because Habits keeps the
+    selected user, use one AsyncHabits per user to handle users concurrently.
+    the exceptions of Habits are raised by the coroutines.
+
+    provided functions:
+    select_user()
+    has_user_id()
+    get_habit()
+    count_habits()
+    add_habit()
+    edit_habit()
+    delete_habit()
+    check_habit()
+    check_habits()
+    get_habits()
+    get_habits_by_periodicity()
+    get_habits_by_streak()
+    get_habits_by_longest_streak()
+    get_habits_by_break()
+    get_habits_by_last_month_breaks()
+    get_habits_by_created()
+    get_unchecked_habits()
+    flush()
+    """
+
+    def __init__(self, database=None, query_mode=None, clock=None, runner=None):
+        """
+        initial function, the Habits object is created on the thread pool by the first call because creating it
+        migrates the database (see Habits)
+
+        :param database: path to the database file (optional, default DBSection -> name from habits.properties)
+        :param query_mode: 'MEMORY' or 'SQL' (optional, default DBSection -> queryMode from habits.properties)
+        :param clock: SystemClock or FrozenClock for today's date (optional, default time_handler.get_system_clock())
+        :param runner: AsyncRunner (optional, default async_handler.get_async_runner())
+        """
+        self.__database__ = database
+        self.__query_mode__ = query_mode
+        self.__clock__ = clock
+        self.__runner__ = runner if runner is not None else async_handler.get_async_runner()
+        self.__habits__ = None
+        self.__lock__ = asyncio.Lock()
+
+    def __call_habits__(self, function_name, args, kwargs):
+        """
+        calls the function of the Habits object on the thread of the runner, creates it on the first call.
+        the breaks of the returned habits are calculated on the thread as well, so reading them in the event loop does
+        not change them while the next call runs.
+
+        :return: result of the function
+        """
+        if self.__habits__ is None:
+            self.__habits__ = habits_handler.Habits(self.__database__, self.__query_mode__, self.__clock__)
+        return habits_handler.__evaluate_result__(getattr(self.__habits__, function_name)(*args, **kwargs))
+
+    async def __run__(self, function_name, *args, **kwargs):
+        """
+        waits until the previous call of this object is finished and calls the function of Habits on the runner
+
+        :return: result of the function
+        """
+        async with self.__lock__:
+            return await self.__runner__.run(self.__call_habits__, function_name, args, kwargs)
+
+    async def select_user(self, user_id, test_habits=None):
+        """
+        see Habits.select_user()
+        """
+        return await self.__run__('select_user', user_id, test_habits)
+
+    async def has_user_id(self):
+        """
+        see Habits.has_user_id()
+        """
+        return await self.__run__('has_user_id')
+
+    async def get_habit(self, habit_id):
+        """
+        see Habits.get_habit()
+        """
+        return await self.__run__('get_habit', habit_id)
+
+    async def count_habits(self):
+        """
+        see Habits.count_habits()
+        """
+        return await self.__run__('count_habits')
+
+    async def add_habit(self, title, description, periodicity):
+        """
+        see Habits.add_habit()
+        """
+        return await self.__run__('add_habit', title, description, periodicity)
+
+    async def edit_habit(self, habit_id, title='', description=''):
+        """
+        see Habits.edit_habit()
+        """
+        return await self.__run__('edit_habit', habit_id, title, description)
+
+    async def delete_habit(self, habit_id):
+        """
+        see Habits.delete_habit()
+        """
+        return await self.__run__('delete_habit', habit_id)
+
+    async def check_habit(self, habit_id):
+        """
+        see Habits.check_habit()
+        """
+        return await self.__run__('check_habit', habit_id)
+
+    async def check_habits(self, habit_ids):
+        """
+        see Habits.check_habits()
+        """
+        return await self.__run__('check_habits', habit_ids)
+
+    async def get_habits(self, force_update=False):
+        """
+        see Habits.get_habits()
+        """
+        return await self.__run__('get_habits', force_update)
+
+    async def get_habits_by_periodicity(self, periodicity, force_update=False):
+        """
+        see Habits.get_habits_by_periodicity()
+        """
+        return await self.__run__('get_habits_by_periodicity', periodicity, force_update)
+
+    async def get_habits_by_streak(self, force_update=False, limit=None):
+        """
+        see Habits.get_habits_by_streak()
+        """
+        return await self.__run__('get_habits_by_streak', force_update, limit)
+
+    async def get_habits_by_longest_streak(self, force_update=False, limit=None):
+        """
+        see Habits.get_habits_by_longest_streak()
+        """
+        return await self.__run__('get_habits_by_longest_streak', force_update, limit)
+
+    async def get_habits_by_break(self, force_update=False, limit=None):
+        """
+        see Habits.get_habits_by_break()
+        """
+        return await self.__run__('get_habits_by_break', force_update, limit)
+
+    async def get_habits_by_last_month_breaks(self, force_update=False, limit=None):
+        """
+        see Habits.get_habits_by_last_month_breaks()
+        """
+        return await self.__run__('get_habits_by_last_month_breaks', force_update, limit)
+
+    async def get_habits_by_created(self, force_update=False, limit=None):
+        """
+        see Habits.get_habits_by_created()
+        """
+        return await self.__run__('get_habits_by_created', force_update, limit)
+
+    async def get_unchecked_habits(self, force_update=False):
+        """
+        see Habits.get_unchecked_habits()
+        """
+        return await self.__run__('get_unchecked_habits', force_update)
+
+    async def flush(self):
+        """
+        see Habits.flush()
+        """
+        return await self.__run__('flush')
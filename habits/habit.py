@@ -2,11 +2,13 @@
 provides the Habit object and WrongUserException
 """
 import logging
-from datetime import datetime, timedelta
 import json
-from helper import const_handler
+import sys
+from helper import const_handler, log_handler
 from helper import time_handler
 
+log_handler.setup_logging()
+
 
 class WrongUserException(Exception):
     """
@@ -16,12 +18,35 @@ class WrongUserException(Exception):
         super().__init__(message)
 
 
+def __date_to_string__(date):
+    """
+    static helper function to create the string stored in the database from a datetime
+
+    :param date: datetime or None
+
+    :return: string, empty if date is None
+    """
+    return '' if date is None else str(date)
+
+
+# columns of the habits table a habit can change, in the order they are written by create_changes_query()
+__update_columns__ = ('title', 'description', 'last_break', 'last_checked', 'streak', 'longest_streak',
+                      'break_history', 'evaluated_through')
+
+# columns written by create_evaluation_query()
+__evaluation_columns__ = frozenset(('last_break', 'streak', 'break_history', 'evaluated_through'))
+
+# shared by all habits without changes, a set and a list are only created on the first change (see __mark_changed__())
+__no_changed_columns__ = frozenset()
+__no_changed_break_months__ = ()
+
+
 # noinspection SqlDialectInspection
 class Habit:
     """
     Habit Object, takes: habit_id, user_id, title, description, created, last_break, last_checked, streak,
     longest_streak, periodicity and break_history when called
-    automatically updates last_break, break_history and streak when called
+    automatically updates last_break, break_history and streak on the first access to one of them
 
     provided functions:
     get_id()
@@ -34,38 +59,53 @@ class Habit:
     get_longest_streak()
     get_periodicity()
     get_break_history()
+    get_changed_breaks()
+    get_breaks_sum()
     get_last_months_breaks()
+    get_created_datetime()
+    get_last_break_datetime()
+    get_last_checked_datetime()
+    get_evaluated_through()
+    get_memory_estimate()
 
     set_title()
     set_description()
 
     check()
     is_checked()
+    evaluate()
 
     create_update_query()
+    is_evaluation_saved()
+    set_evaluation_saved()
+    create_evaluation_query()
+    has_changes()
+    get_changed_columns()
+    create_changes_query()
+    set_changes_saved()
     """
-    __id__ = ''
-    __title__ = ''
-    __description__ = ''
-    __created__ = ''
-    __last_break__ = ''
-    __last_checked__ = ''
-    __streak__ = 0
-    __longest_streak__ = 0
-    __periodicity__ = ''
-    __break_history__ = {}
-    __user_id__ = ''
+    # no per-instance __dict__, all attributes are set in __init__
+    __slots__ = ('__id__', '__title__', '__description__', '__created__', '__last_break__', '__last_checked__',
+                 '__last_checked_day__',
+                 '__streak__', '__longest_streak__', '__periodicity__', '__break_history__', '__user_id__',
+                 '__evaluated_through__', '__evaluation_pending__', '__changed_break_months__',
+                 # columns changed since the habit was loaded or last saved
+                 '__changed_columns__',
+                 # cached sort keys
+                 '__breaks_sum__', '__last_months_breaks__',
+                 # cached result of get_memory_estimate(), reset when the habit changes
+                 '__memory_estimate__',
+                 # shared clock, see time_handler.SystemClock
+                 '__clock__')
 
     const = const_handler.ConstHandler()
-    logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
-                        filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(), force=True)
 
     def __init__(self, habit_id, user_id, title, description, periodicity, created, last_break, last_checked,
-                 streak, longest_streak, break_history):
+                 streak, longest_streak, break_history, evaluated_through='', clock=None):
         """
         init function, creates habit-object from parameters
-        updates history, last_break and break_history when called
-        parses break_history string from parameters into dictionary
+        break_history is parsed and history, last_break and break_history are updated on the first access to a
+        break-related value (see evaluate()), unless they are already evaluated for today
 
         :param habit_id: integer
         :param user_id: string
@@ -77,7 +117,9 @@ class Habit:
         :param streak: integer
         :param longest_streak: integer
         :param periodicity: string
-        :param break_history: string
+        :param break_history: string or dictionary (if it is loaded from the habit_breaks table)
+        :param evaluated_through: string "yyyy-mm-dd" of the day the breaks were last calculated and saved for
+        :param clock: SystemClock or FrozenClock for today's date (optional, default time_handler.get_system_clock())
 
         :raise: NameError if periodicity of the habit does not match the values from const
         :raise: ValueError if created, last_checked or last_break is not parseable
@@ -86,120 +128,157 @@ class Habit:
         self.__user_id__ = user_id
         self.__title__ = title
         self.__description__ = description
-        self.__created__ = created
-        self.__last_break__ = last_break
-        self.__last_checked__ = last_checked
         self.__streak__ = streak
         self.__longest_streak__ = longest_streak
         self.__periodicity__ = periodicity
-        try:
-            self.__break_history__ = json.loads(break_history)
-        except ValueError:
-            logging.error('could not parse break_history string to dictionary for habit-id: {}'.format(habit_id))
-            self.__break_history__ = {}
-
-        # calculate break_history, set last_break and set streak
-        today = time_handler.get_start_of_day(datetime.today())
-        yesterday = today - timedelta(days=1)
-
-        # get last_checked or created if it's not set yet, create a datetime object of it and set it to start of day
-        _last_checked_date_parsed_ = time_handler.parse_string_to_datetime(
-            self.__last_checked__ if len(self.__last_checked__) != 0 else self.__created__)
-        if _last_checked_date_parsed_ is None:
-            if len(self.__last_checked__) == 0:
+        self.__clock__ = clock if clock is not None else time_handler.get_system_clock()
+        # kept as given until evaluate() is called
+        self.__break_history__ = break_history
+        self.__changed_break_months__ = __no_changed_break_months__
+
+        # dates are parsed once here and kept as datetime, strings are only created for the getters and queries
+        self.__created__ = time_handler.parse_string_to_datetime(created)
+        self.__last_checked__ = None
+        if len(last_checked) != 0:
+            self.__last_checked__ = time_handler.parse_string_to_datetime(last_checked)
+            if self.__last_checked__ is None:
                 raise ValueError(
-                    'created could not be parsed for habit: {}, please contact the admin.'.format(
-                        habit_id))
-            else:
+                    'last_checked could not be parsed for habit: {}, please contact the admin.'.format(habit_id))
+        elif self.__created__ is None:
+            raise ValueError('created could not be parsed for habit: {}, please contact the admin.'.format(habit_id))
+        # day number of the last check for is_checked(), see time_handler.get_day_ordinal()
+        self.__last_checked_day__ = None
+        if self.__last_checked__ is not None:
+            self.__last_checked_day__ = time_handler.get_day_ordinal(self.__last_checked__)
+
+        self.__last_break__ = None
+        if len(last_break) != 0:
+            self.__last_break__ = time_handler.parse_string_to_datetime(last_break)
+            if self.__last_break__ is None:
                 raise ValueError(
-                    'last_checked could not be parsed for habit: {}, please contact the admin.'.format(
-                        habit_id))
+                    'last_break could not be parsed for habit: {}, please contact the admin.'.format(habit_id))
 
-        last_checked_date = time_handler.get_start_of_day(_last_checked_date_parsed_)
-        last_checked_days_till_today = time_handler.count_days_till_today(last_checked_date)
+        if self.__periodicity__ != self.const.get_periodicity_daily() \
+                and self.__periodicity__ != self.const.get_periodicity_weekly():
+            raise NameError('unknown periodicity, does not match any from const_handler: {}. please contact the admin.'
+                            .format(self.__periodicity__))
 
-        # get last_break if it exists, create a datetime object and set it to start of day or None
-        _last_break_date_parse_ = None
-        if len(self.__last_break__) != 0:
-            _last_break_date_parse_ = time_handler.parse_string_to_datetime(self.__last_break__)
-            if _last_break_date_parse_ is None:
-                raise ValueError(
-                    'last_break could not be parsed for habit: {}, please contact the admin.'.format(habit_id))
+        self.__evaluated_through__ = evaluated_through if evaluated_through is not None else ''
+        self.__changed_columns__ = __no_changed_columns__
+        self.__evaluation_pending__ = True
 
-        last_break_date = time_handler.get_start_of_day(
-            _last_break_date_parse_) if _last_break_date_parse_ is not None else None
+        # cached sort keys, set by evaluate()
+        self.__last_months_breaks__ = None
+        self.__breaks_sum__ = 0
+        self.__memory_estimate__ = None
 
-        if last_break_date is None:
-            last_interaction_date = last_checked_date
-        else:
-            last_break_days_till_today = time_handler.count_days_till_today(last_break_date)
+    def evaluate(self):
+        """
+        parses break_history and calculates the breaks till today, called by all functions depending on the breaks.
+        the breaks only have to be calculated once per day, the result is saved with evaluated_through
+        """
+        if not self.__evaluation_pending__:
+            return
+        self.__evaluation_pending__ = False
 
-            if last_checked_days_till_today <= last_break_days_till_today:
-                last_interaction_date = last_checked_date
-            else:
-                last_interaction_date = last_break_date
+        if not isinstance(self.__break_history__, dict):
+            try:
+                self.__break_history__ = json.loads(self.__break_history__)
+            except (TypeError, ValueError):
+                self.__break_history__ = None
+            if not isinstance(self.__break_history__, dict):
+                logging.error('could not parse break_history string to dictionary for habit-id: %s', self.__id__)
+                self.__break_history__ = {}
+
+        snapshot = self.__clock__.snapshot()
+        if self.__evaluated_through__ != snapshot.get_today_string():
+            self.__evaluate_breaks__(snapshot)
+            self.__evaluated_through__ = snapshot.get_today_string()
+            self.__mark_changed__('evaluated_through')
+
+        # break_history is final from here on, so its sum can be used as sort key
+        self.__breaks_sum__ = sum(count for history_year in self.__break_history__.values()
+                                  for count in history_year.values())
+        self.__memory_estimate__ = None
+
+    def __evaluate_breaks__(self, snapshot):
+        """
+        private function, calculates the breaks from the last interaction till today into break_history
+        and updates last_break and streak if there were breaks
+
+        :param snapshot: DateSnapshot of today
+        """
+        # all dates are day numbers here (see time_handler.get_day_ordinal())
+        today = snapshot.get_today_ordinal()
+
+        # last_checked or created if it's not set yet
+        last_interaction_day = self.__last_checked_day__
+        if last_interaction_day is None:
+            last_interaction_day = time_handler.get_day_ordinal(self.__created__)
+
+        # the later one of last_checked and last_break is the last interaction
+        if self.__last_break__ is not None:
+            last_interaction_day = max(last_interaction_day, time_handler.get_day_ordinal(self.__last_break__))
 
         # the point where I regretted making the break_history...
         # calculate the breaks from last interaction till today, daily or weekly intervals
         if self.__periodicity__ == self.const.get_periodicity_daily():
-            emergency_break = 0 # just in case
             # start counting the day after last interaction because it should already be calculated
             # sideeffect: the day it is created counts as 'trial' and is not counted into breaks
-            last_interaction_date = last_interaction_date + timedelta(days=1)
+            first_break_day = last_interaction_day + 1
 
-            # last_interaction_date < today not last_interaction_date <= today because today does not count as a break
-            while emergency_break <= 3650 and last_interaction_date < today:
-                # needs to be a string to make it compatible with json
-                history_year = str(last_interaction_date.year)
-                history_month = str(last_interaction_date.month)
-                emergency_break += 1  # to prevent infinite loop, equals to ~10 years
+            # today does not count as a break, limited to 3651 days (~10 years) just in case
+            breaks = self.__add_breaks__(first_break_day, min(today, first_break_day + 3651), 1)
 
-                # create break-history entries if not exist
-                if self.__break_history__.get(history_year) is None:
-                    self.__break_history__[history_year] = {}
-                if self.__break_history__.get(history_year).get(history_month) is None:
-                    self.__break_history__[history_year][history_month] = 0
-
-                self.__break_history__[history_year][history_month] += 1
-                last_interaction_date = last_interaction_date + timedelta(days=1)
-
-            # if emergency_break != 0 there were breaks calculated so last_break and streak needs to be updated
-            if emergency_break != 0:
-                self.__last_break__ = str(yesterday)
-                self.__streak__ = 0
-
-        elif self.__periodicity__ == self.const.get_periodicity_weekly():
-            emergency_break = 0 # just in case
+        else:
+            # weekly periodicity, unknown periodicities are rejected in __init__
             # fix: if today == monday, calculation of breaks would skip last week with old version
-            monday = time_handler.get_start_of_week(yesterday) if today.weekday() != 0 else today
+            monday = time_handler.get_monday_ordinal(snapshot.get_week_ordinal())
             # start counting the monday after last interaction because it should already be calculated
             # sideeffect: the week it is created counts as 'trial' and is not counted into breaks
-            last_interaction_date = time_handler.get_start_of_week(last_interaction_date) + timedelta(days=7)
+            first_break_day = time_handler.get_monday_ordinal(time_handler.get_week_ordinal(last_interaction_day) + 1)
 
-            # last_interaction_date < monday not last_interaction_date <= monday because this week does not count as a break
-            while emergency_break <= 420 and last_interaction_date < monday:
-                # needs to be a string to make it compatible with json
-                history_year = str(last_interaction_date.year)
-                history_month = str(last_interaction_date.month)
-                emergency_break += 1  # to prevent infinite loop, equals to ~10 years
+            # this week does not count as a break, limited to 421 weeks (~8 years) just in case
+            breaks = self.__add_breaks__(first_break_day, min(monday, first_break_day + 421 * 7), 7)
 
-                # create break-history entries if not exist
-                if self.__break_history__.get(history_year) is None:
-                    self.__break_history__[history_year] = {}
-                if self.__break_history__.get(history_year).get(history_month) is None:
-                    self.__break_history__[history_year][history_month] = 0
+        # if there were breaks calculated, last_break and streak needs to be updated
+        if breaks != 0:
+            self.__last_break__ = snapshot.get_yesterday()
+            self.__streak__ = 0
+            self.__mark_changed__('last_break', 'streak', 'break_history')
 
-                self.__break_history__[history_year][history_month] += 1
-                last_interaction_date = last_interaction_date + timedelta(days=7)  # add a week to last_interaction_date
+    def __add_breaks__(self, first_break_day, end_day, period_days):
+        """
+        private function, adds the missed periods from first_break_day till end_day (excluding) to the
+        break_history, counted per month instead of per period
 
-            # if emergency_break != 0 there were breaks calculated so last_break and streak needs to be updated
-            if emergency_break != 0:
-                self.__last_break__ = str(yesterday)
-                self.__streak__ = 0
+        :param first_break_day: integer, day number of the start of the first missed period
+        :param end_day: integer, day number of the start of the first period that is not counted
+        :param period_days: integer, 1 for daily or 7 for weekly periodicity
 
-        else:
-            raise NameError('unknown periodicity, does not match any from const_handler: {}. please contact the admin.'
-                            .format(self.__periodicity__))
+        :return: integer, number of added breaks
+        """
+        breaks = 0
+        for (year, month), count in time_handler.count_periods_per_month_by_ordinal(first_break_day, end_day,
+                                                                                    period_days).items():
+            # needs to be a string to make it compatible with json
+            history_year = self.__break_history__.setdefault(str(year), {})
+            history_year[str(month)] = history_year.get(str(month), 0) + count
+            if self.__changed_break_months__ is __no_changed_break_months__:
+                self.__changed_break_months__ = []
+            self.__changed_break_months__.append((year, month))
+            breaks += count
+        return breaks
+
+    def __mark_changed__(self, *columns):
+        """
+        private function, adds the columns to the changed columns, the set is created on the first change
+
+        :param columns: column names from __update_columns__
+        """
+        if self.__changed_columns__ is __no_changed_columns__:
+            self.__changed_columns__ = set()
+        self.__changed_columns__.update(columns)
 
     def get_id(self):
         """
@@ -223,24 +302,28 @@ class Habit:
         """
         :return: created date as string
         """
-        return self.__created__
+        return __date_to_string__(self.__created__)
 
     def get_last_break(self):
         """
         :return: last break date as string
         """
-        return self.__last_break__
+        if self.__evaluation_pending__:
+            self.evaluate()
+        return __date_to_string__(self.__last_break__)
 
     def get_last_checked(self):
         """
         :return: last checked date as string
         """
-        return self.__last_checked__
+        return __date_to_string__(self.__last_checked__)
 
     def get_streak(self):
         """
         :return: streak
         """
+        if self.__evaluation_pending__:
+            self.evaluate()
         return self.__streak__
 
     def get_longest_streak(self):
@@ -261,30 +344,114 @@ class Habit:
 
         :return: break history as a dictionary
         """
+        if self.__evaluation_pending__:
+            self.evaluate()
         return self.__break_history__
 
-    def get_last_months_breaks(self):
+    def get_changed_breaks(self):
+        """
+        months of the break history that were changed by the break calculation, used to write only these months
+        into the habit_breaks table
+
+        :return: list of tuples (year, month, breaks) with integer values
+        """
+        if self.__evaluation_pending__:
+            self.evaluate()
+        return [(year, month, self.__break_history__[str(year)][str(month)])
+                for year, month in self.__changed_break_months__]
+
+    def get_breaks_sum(self):
         """
-        takes info from break history
+        sum of all breaks in the break history, calculated once when the breaks are evaluated
+
+        :return: integer
+        """
+        if self.__evaluation_pending__:
+            self.evaluate()
+        return self.__breaks_sum__
+
+    def get_last_months_breaks(self, last_month_date=None):
+        """
+        takes info from break history, the result is cached until the month changes
+
+        :param last_month_date: datetime of the 1st of the last month (optional, calculated from today if not given)
 
         :return: number of months breaks for the last month or 0
         """
-        last_month_date = time_handler.get_last_month(datetime.today())  # get 1st of the last month
-        # needs to be a string to make it compatible with json
-        last_month_year = str(last_month_date.year)
-        last_month_month = str(last_month_date.month)
+        if last_month_date is None:
+            last_month_date = self.__clock__.snapshot().get_last_month()  # get 1st of the last month
 
-        last_month_year_history = self.__break_history__.get(last_month_year)
+        if self.__evaluation_pending__:
+            self.evaluate()
+        cache_key = (last_month_date.year, last_month_date.month)
+        if self.__last_months_breaks__ is not None and self.__last_months_breaks__[0] == cache_key:
+            return self.__last_months_breaks__[1]
+
+        # needs to be a string to make it compatible with json
+        last_month_year_history = self.__break_history__.get(str(last_month_date.year))
 
-        # check if the year exist in the history
+        # check if the year and the month exist in the history
+        last_months_breaks = 0
         if last_month_year_history is not None:
-            last_month_month_of_year_history = last_month_year_history.get(last_month_month)
+            last_months_breaks = last_month_year_history.get(str(last_month_date.month), 0)
+
+        self.__last_months_breaks__ = (cache_key, last_months_breaks)
+        return last_months_breaks
+
+    def get_created_datetime(self):
+        """
+        :return: created date as datetime or None if created was not parseable
+        """
+        return self.__created__
+
+    def get_last_break_datetime(self):
+        """
+        :return: last break date as datetime or None if there was no break yet
+        """
+        if self.__evaluation_pending__:
+            self.evaluate()
+        return self.__last_break__
 
-            # check if the month exist in the history
-            if last_month_month_of_year_history is not None:
-                return last_month_month_of_year_history
+    def get_last_checked_datetime(self):
+        """
+        :return: last checked date as datetime or None if the habit was never checked
+        """
+        return self.__last_checked__
 
-        return 0
+    def get_evaluated_through(self):
+        """
+        :return: date "yyyy-mm-dd" until which the breaks are calculated
+        """
+        if self.__evaluation_pending__:
+            self.evaluate()
+        return self.__evaluated_through__
+
+    def get_memory_estimate(self):
+        """
+        estimates the memory of the habit and its values from their sizes (see sys.getsizeof()), the break history is
+        counted with all of its months. values shared with other objects are counted as well, so the estimate is higher
+        than the allocated memory (see benchmarks/bench_habit_memory.py). the estimate is kept until the habit changes.
+
+        :return: integer, bytes
+        """
+        if self.__memory_estimate__ is None:
+            # the empty containers of a habit without changes are shared by all habits
+            size = sys.getsizeof(self) + sum(sys.getsizeof(value) for value in (
+                self.__title__, self.__description__, self.__created__, self.__last_checked__, self.__last_break__,
+                self.__evaluated_through__, self.__changed_columns__, self.__changed_break_months__)
+                if value is not None and value is not __no_changed_columns__
+                and value is not __no_changed_break_months__)
+            if isinstance(self.__break_history__, dict):
+                size += sys.getsizeof(self.__break_history__)
+                for year, history_year in self.__break_history__.items():
+                    # the counts are small integers, python shares them
+                    size += sys.getsizeof(year) + sys.getsizeof(history_year)
+                    size += sum(sys.getsizeof(month) for month in history_year)
+            else:
+                # not parsed yet, see evaluate()
+                size += sys.getsizeof(self.__break_history__)
+            self.__memory_estimate__ = size
+        return self.__memory_estimate__
 
     def set_title(self, new_title, user_id):
         """
@@ -297,6 +464,8 @@ class Habit:
         """
         if user_id == self.__user_id__:
             self.__title__ = new_title
+            self.__mark_changed__('title')
+            self.__memory_estimate__ = None
         else:
             raise WrongUserException('given user_id does not match user-id in habit')
 
@@ -311,6 +480,8 @@ class Habit:
         """
         if user_id == self.__user_id__:
             self.__description__ = new_description
+            self.__mark_changed__('description')
+            self.__memory_estimate__ = None
         else:
             raise WrongUserException('given user_id does not match user-id in habit')
 
@@ -323,11 +494,19 @@ class Habit:
         :raise: WrongUserException if mismatch user_id
         """
         if user_id == self.__user_id__:
-            if not self.is_checked():
-                self.__last_checked__ = str(datetime.today())
-                self.__streak__ += 1
-                if self.__streak__ > self.__longest_streak__:
-                    self.__longest_streak__ = self.__streak__
+            # the breaks and the check are calculated for the same day
+            with self.__clock__.batch() as snapshot:
+                if self.__evaluation_pending__:
+                    self.evaluate()
+                if not self.is_checked():
+                    self.__last_checked__ = snapshot.get_now()
+                    self.__last_checked_day__ = snapshot.get_today_ordinal()
+                    self.__streak__ += 1
+                    self.__mark_changed__('last_checked', 'streak')
+                    self.__memory_estimate__ = None
+                    if self.__streak__ > self.__longest_streak__:
+                        self.__longest_streak__ = self.__streak__
+                        self.__mark_changed__('longest_streak')
         else:
             raise WrongUserException('given user_id does not match user-id in habit')
 
@@ -339,51 +518,40 @@ class Habit:
 
         :raise: NameError if periodicity of the habit does not match the values from const
         """
-        today_detailed = datetime.today()
-        today = time_handler.get_start_of_day(today_detailed)
-        monday = time_handler.get_start_of_week(today)
-
-        if self.__last_checked__ == '':
+        if self.__last_checked_day__ is None:
             return False
+
+        snapshot = self.__clock__.snapshot()
+        if self.__periodicity__ == self.const.get_periodicity_daily():
+            return self.__last_checked_day__ == snapshot.get_today_ordinal()
+        elif self.__periodicity__ == self.const.get_periodicity_weekly():
+            return time_handler.get_week_ordinal(self.__last_checked_day__) == snapshot.get_week_ordinal()
         else:
-            try:
-                last_checked = time_handler.parse_string_to_datetime(self.__last_checked__)
-
-                if self.__periodicity__ == self.const.get_periodicity_daily():
-                    if time_handler.is_today(last_checked):
-                        return True
-                elif self.__periodicity__ == self.const.get_periodicity_weekly():
-                    if time_handler.is_same_date(monday, time_handler.get_start_of_week(last_checked)):
-                        return True
-                else:
-                    # critical error, it is not possible to handle any habits if periodicity is unknown
-                    raise NameError(
-                        'unknown periodicity, does not match any from const_handler: {}. please contact the admin.'
-                        .format(self.__periodicity__))
-                return False
-            except ValueError:
-                logging.error('could not parse last_checked, count this habit as checked and overwrite last_checked')
-                self.__last_checked__ = str(datetime.today())
-                self.__streak__ += 1
-                if self.__streak__ > self.__longest_streak__:
-                    self.__longest_streak__ = self.__streak__
-                return True
-
-    def create_update_query(self, user_id):
+            # critical error, it is not possible to handle any habits if periodicity is unknown
+            raise NameError(
+                'unknown periodicity, does not match any from const_handler: {}. please contact the admin.'
+                .format(self.__periodicity__))
+
+    def create_update_query(self, user_id, break_history_as_json=True):
         """
         creates update query for habit, requires user_id to prevent accidental user-collisions
 
         :param user_id:
+        :param break_history_as_json: boolean - false sets break_history to NULL because it is stored in habit_breaks
         :return: dictionary with 'query' for the sql-query-string and 'values' for the tuple of values
 
         :raise: WrongUserException if mismatch user_id
         """
         if user_id == self.__user_id__:
+            if self.__evaluation_pending__:
+                self.evaluate()
             query_string = '''UPDATE habits SET title = ?, description = ?,
                               last_break = ?, last_checked = ?, streak = ?,
                               longest_streak = ?, break_history = ? WHERE id = ? AND user_id = ?'''
-            query_values = (self.__title__, self.__description__, self.__last_break__, self.__last_checked__,
-                            self.__streak__, self.__longest_streak__, json.dumps(self.__break_history__),
+            query_values = (self.__title__, self.__description__, __date_to_string__(self.__last_break__),
+                            __date_to_string__(self.__last_checked__),
+                            self.__streak__, self.__longest_streak__,
+                            json.dumps(self.__break_history__) if break_history_as_json else None,
                             self.__id__, self.__user_id__)
             return {
                 'query': query_string,
@@ -391,3 +559,105 @@ class Habit:
             }
         else:
             raise WrongUserException('given user_id does not match user-id in habit')
+
+    def is_evaluation_saved(self):
+        """
+        returns false if the breaks were calculated by evaluate() and are not written to the db yet
+
+        :return: boolean
+        """
+        return 'evaluated_through' not in self.__changed_columns__
+
+    def set_evaluation_saved(self):
+        """
+        marks the calculated breaks as written to the db
+        """
+        self.__changed_columns__ = self.__changed_columns__ - __evaluation_columns__ or __no_changed_columns__
+        self.__changed_break_months__ = __no_changed_break_months__
+
+    def create_evaluation_query(self, user_id, break_history_as_json=True):
+        """
+        creates the query to write the calculated breaks, requires user_id to prevent accidental user-collisions
+
+        :param user_id:
+        :param break_history_as_json: boolean - false sets break_history to NULL because it is stored in habit_breaks
+        :return: dictionary with 'query' for the sql-query-string and 'values' for the tuple of values
+
+        :raise: WrongUserException if mismatch user_id
+        """
+        if user_id == self.__user_id__:
+            if self.__evaluation_pending__:
+                self.evaluate()
+            query_string = '''UPDATE habits SET last_break = ?, streak = ?, break_history = ?, evaluated_through = ?
+                              WHERE id = ? AND user_id = ?'''
+            query_values = (__date_to_string__(self.__last_break__), self.__streak__,
+                            json.dumps(self.__break_history__) if break_history_as_json else None,
+                            self.__evaluated_through__, self.__id__, self.__user_id__)
+            return {
+                'query': query_string,
+                'values': query_values,
+            }
+        else:
+            raise WrongUserException('given user_id does not match user-id in habit')
+
+    def has_changes(self):
+        """
+        returns true if a column of the habit was changed since it was loaded or last saved
+
+        :return: boolean
+        """
+        return len(self.__changed_columns__) > 0
+
+    def get_changed_columns(self):
+        """
+        columns of the habits table changed since the habit was loaded or last saved
+
+        :return: tuple of column names in a fixed order
+        """
+        return tuple(column for column in __update_columns__ if column in self.__changed_columns__)
+
+    def create_changes_query(self, user_id, break_history_as_json=True):
+        """
+        creates the update query for the changed columns only, requires user_id to prevent accidental user-collisions.
+        habits with the same changed columns get the same query string, so they can be written with one executemany
+
+        :param user_id:
+        :param break_history_as_json: boolean - false leaves out break_history because it is stored in habit_breaks
+        :return: dictionary with 'query' for the sql-query-string and 'values' for the tuple of values,
+                 None if nothing was changed
+
+        :raise: WrongUserException if mismatch user_id
+        """
+        if user_id == self.__user_id__:
+            columns = [column for column in self.get_changed_columns()
+                       if break_history_as_json or column != 'break_history']
+            if len(columns) == 0:
+                return None
+            column_values = {
+                'title': self.__title__,
+                'description': self.__description__,
+                'last_break': __date_to_string__(self.__last_break__),
+                'last_checked': __date_to_string__(self.__last_checked__),
+                'streak': self.__streak__,
+                'longest_streak': self.__longest_streak__,
+                'evaluated_through': self.__evaluated_through__,
+            }
+            if 'break_history' in columns:
+                column_values['break_history'] = json.dumps(self.__break_history__)
+            # column names only come from __update_columns__
+            query_string = 'UPDATE habits SET {} WHERE id = ? AND user_id = ?'.format(
+                ', '.join(column + ' = ?' for column in columns))
+            query_values = tuple(column_values[column] for column in columns) + (self.__id__, self.__user_id__)
+            return {
+                'query': query_string,
+                'values': query_values,
+            }
+        else:
+            raise WrongUserException('given user_id does not match user-id in habit')
+
+    def set_changes_saved(self):
+        """
+        marks all changed columns and the changed months of the break history as written to the db
+        """
+        self.__changed_columns__ = __no_changed_columns__
+        self.__changed_break_months__ = __no_changed_break_months__
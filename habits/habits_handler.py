@@ -1,26 +1,79 @@
 """
 provides the Habits object, MissingUserIdException and HabitDoesNotExistException
 """
-import sqlite3
+import heapq
 import logging
+import sys
 from datetime import datetime
-from helper import const_handler, time_handler
+from helper import const_handler, time_handler, db_handler, log_handler, migration_handler
 from habits import habit
 
+log_handler.setup_logging()
 
-def __habit_id_compare__(habit_id_a, habit_id_b):
+# columns of the habits table in the order of the Habit parameters
+__habit_columns__ = '''id, user_id, title, description, periodicity, created_at, last_break, last_checked, streak,
+                       longest_streak, break_history, evaluated_through'''
+
+# maximum number of habit-ids per IN (...) clause, stays below the sqlite variable limit
+__ids_per_query__ = 500
+
+
+def __normalize_habit_id__(habit_id):
     """
-    static helper function to compare two habit_ids after issues with string and int
+    static helper function to normalize a habit_id after issues with string and int
     database uses auto-incrementing integer as key, so int is default
 
-    :param habit_id_a: string or int
-    :param habit_id_b: string or int
+    :param habit_id: string or int
 
-    :return: boolean
+    :return: integer
 
-    :raise: ValueError if habit_id_a or habit_id_b are not parseable into integer
+    :raise: ValueError if habit_id is not parseable into integer
     """
-    return int(habit_id_a) == int(habit_id_b)
+    return int(habit_id)
+
+def __created_sort_key__(current_habit):
+    """
+    static helper function, sort key for the creation date, habits without parseable date are sorted last
+
+    :param current_habit: habit
+
+    :return: tuple
+    """
+    created = current_habit.get_created_datetime()
+    return created is None, created if created is not None else datetime.min
+
+def __create_habit__(habit_data, clock, break_histories=None):
+    """
+    static helper function to create a habit from a row of the habits table
+
+    :param habit_data: tuple of the columns in __habit_columns__
+    :param clock: clock of the habits
+    :param break_histories: dictionary {habit_id: break_history} if the breaks are stored in habit_breaks (optional)
+
+    :return: habit
+    """
+    break_history = habit_data[10] if break_histories is None else break_histories.get(habit_data[0], {})
+    # surely nothing can go wrong here
+    return habit.Habit(habit_data[0], habit_data[1], habit_data[2], habit_data[3], habit_data[4], habit_data[5],
+                       habit_data[6], habit_data[7], habit_data[8], habit_data[9], break_history, habit_data[11],
+                       clock)
+
+def __evaluate_result__(result):
+    """
+    static helper function, calculates the breaks of the habits returned by a get-function, so the breaks are not
+    calculated later while another thread uses the same habits
+
+    :param result: habit, tuple of habits, dictionary with 'habits' or any other result of a get-function
+
+    :return: the given result
+    """
+    if isinstance(result, habit.Habit):
+        result.evaluate()
+    elif isinstance(result, (tuple, list, dict)):
+        for current_habit in result.get('habits', ()) if isinstance(result, dict) else result:
+            if isinstance(current_habit, habit.Habit):
+                current_habit.evaluate()
+    return result
 
 class MissingUserIdException(Exception):
     """
@@ -40,17 +93,25 @@ class HabitDoesNotExistException(Exception):
 class Habits:
     """
     Habits object, creates db if it doesn't exist yet when initiated.
+    in the 'MEMORY' query mode all habits of a user are loaded by select_user() and filtered or sorted in python,
+    in the 'SQL' query mode the get-functions filter, sort and limit in sqlite and only load the habits they return.
 
     provided functions:
     select_user()
     has_user_id()
     get_periodicities()
+    get_habit()
+    count_habits()
+    count_cached_habits()
+    get_memory_estimate()
     add_habit()
     edit_habit()
     delete_habit()
     delete_all_habits_for_user()
     check_habit()
+    check_habits()
     get_habits()
+    iter_habits()
     get_habits_by_periodicity()
     get_habits_by_streak()
     get_habits_by_longest_streak()
@@ -58,14 +119,13 @@ class Habits:
     get_habits_by_last_month_breaks()
     get_habits_by_created()
     get_unchecked_habits()
+    flush()
     """
     const = const_handler.ConstHandler()
-    logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
-                        filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(), force=True)
 
     def __sql_call__(self, query, params=(), fetch=False):
         """
-        function for sql-handling
+        function for sql-handling, uses the shared connection pool of the habits database
 
         :param query: sql query as string
         :param params: tuple of parameters to pass to sql query
@@ -73,63 +133,320 @@ class Habits:
 
         :return: tuple of results from sql query if fetch is true, else return True
         """
-        return_value = True
+        return self.__pool__.execute(query, params, fetch)
 
-        connection = sqlite3.connect(self.const.get_habits_db_name().strip() + '.db')
-        cursor = connection.cursor()
-        cursor.execute(query, params)
-        connection.commit()
-        if fetch:
-            return_value = cursor.fetchall()
-        elif query.startswith('INSERT'):
-            return_value = cursor.lastrowid # returns the new users-id when created
-        connection.close()
-        return return_value
+    def __init__(self, database=None, query_mode=None, clock=None):
+        """
+        initial function, creates or migrates the database and converts the break history to the configured
+        storage once per database file (see migration_handler.prepare_habits_db()).
 
-    def __init__(self):
-        """initial function, creates the database if it doesn't exist yet."""
-        query = '''CREATE TABLE IF NOT EXISTS habits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, 
-                    title TEXT NOT NULL, description TEXT, 
-                    periodicity TEXT NOT NULL, created_at TEXT NOT NULL,
-                    deactivated BIT DEFAULT 0, last_break TEXT, last_checked TEXT,
-                    streak INTEGER DEFAULT 0, longest_streak INTEGER DEFAULT 0, break_history TEXT)'''
+        :param database: path to the database file (optional, default DBSection -> name from habits.properties)
+        :param query_mode: 'MEMORY' or 'SQL' (optional, default DBSection -> queryMode from habits.properties)
+        :param clock: SystemClock or FrozenClock for today's date (optional, default time_handler.get_system_clock())
+        """
+        if database is None:
+            database = self.const.get_habits_db_name().strip() + '.db'
+        if query_mode is None:
+            query_mode = self.const.get_db_query_mode()
+        elif query_mode not in ('MEMORY', 'SQL'):
+            raise ValueError('query_mode must be MEMORY or SQL, not: {}'.format(query_mode))
+        self.__pool__ = db_handler.get_pool(database)
+        self.__table_breaks__ = self.const.get_db_break_storage() == 'TABLE'
+        self.__sql_queries__ = query_mode == 'SQL'
+        self.__clock__ = clock if clock is not None else time_handler.get_system_clock()
 
-        self.__sql_call__(query)
+        migration_handler.prepare_habits_db(self.__pool__, self.const.get_db_break_storage())
 
     __user_id__ = None
     __habits__ = None
+    __habits_index__ = None
+    # true if __habits__ has to be rebuilt from __habits_index__, see __get_habits_list__()
+    __habits_stale__ = False
+    __table_breaks__ = False
+    __sql_queries__ = False
+    __clock__ = None
 
     def __is_test_user__(self):
         return self.__user_id__ == self.const.get_user_test_id_a() or self.__user_id__ == self.const.get_user_test_id_b()
 
     def __update_habits_list__(self):
         """
-        updates habits-list from DB
+        updates habits-list from DB, cached habits with unsaved changes are kept instead of reloaded
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if not self.__is_test_user__():
             if self.has_user_id():
-                query = '''SELECT id, user_id, title, description, periodicity, created_at, last_break, last_checked, 
-                streak, longest_streak, break_history FROM habits WHERE user_id = ? AND deactivated = 0'''
-                result = self.__sql_call__(query, (self.__user_id__,), True)
-                logging.debug(result)
-
-                self.__habits__ = []
-                for habit_data in result:
-                    # surely nothing can go wrong here
-                    habit_object = habit.Habit(habit_data[0], habit_data[1], habit_data[2], habit_data[3],
-                                                       habit_data[4], habit_data[5], habit_data[6], habit_data[7],
-                                                       habit_data[8], habit_data[9], habit_data[10])
-                    logging.debug(habit_object.__dict__)
-                    self.__habits__.append(habit_object)
+                changed_habits = {} if self.__habits_index__ is None else \
+                    {habit_id: cached_habit for habit_id, cached_habit in self.__habits_index__.items()
+                     if cached_habit.has_changes()}
+                if self.__sql_queries__:
+                    # habits are only loaded by the get-functions, the cached ones without changes are dropped
+                    self.__habits__ = None
+                    self.__habits_index__ = changed_habits
+                else:
+                    self.__habits_index__ = changed_habits
+                    # rebuilds the index, changed habits that are not active anymore are dropped
+                    self.__set_habits__(self.__query_habits__(order_by='id', refresh=True))
             else:
                 raise MissingUserIdException()
 
+    def __query_habits__(self, where='', params=(), order_by='', limit=None, refresh=False):
+        """
+        loads the active habits of the user matching the given sql-clauses, habits that are already cached are reused
+        unless refresh is true. cached habits with unsaved changes are always reused, so a refresh does not drop them.
+
+        :param where: sql condition added to the user filter (optional)
+        :param params: tuple of parameters for the placeholders in where and order_by
+        :param order_by: sql ORDER BY clause without the keywords (optional)
+        :param limit: integer - maximum number of habits (optional, default all)
+        :param refresh: boolean - create new habits from the database even if they are cached without changes
+
+        :return: list of habits in the order of the query
+        """
+        query = 'SELECT ' + __habit_columns__ + ' FROM habits WHERE user_id = ? AND deactivated = 0'
+        values = [self.__user_id__]
+        if len(where) > 0:
+            query += ' AND ' + where
+        values.extend(params)
+        if len(order_by) > 0:
+            query += ' ORDER BY ' + order_by
+        if limit is not None:
+            query += ' LIMIT ?'
+            values.append(limit)
+        result = self.__sql_call__(query, tuple(values), True)
+        logging.debug(result)
+
+        cached_habits = self.__habits_index__
+        if refresh:
+            cached_habits = {habit_id: cached_habit for habit_id, cached_habit in self.__habits_index__.items()
+                             if cached_habit.has_changes()}
+        new_rows = [habit_data for habit_data in result if habit_data[0] not in cached_habits]
+        break_histories = None
+        if self.__table_breaks__ and len(new_rows) > 0:
+            break_histories = self.__load_break_histories__(
+                None if len(where) == 0 and limit is None else [habit_data[0] for habit_data in new_rows])
+
+        habits = []
+        for habit_data in result:
+            cached_habit = cached_habits.get(habit_data[0])
+            if cached_habit is not None:
+                habits.append(cached_habit)
+                continue
+            habit_object = __create_habit__(habit_data, self.__clock__, break_histories)
+            self.__habits_index__[__normalize_habit_id__(habit_data[0])] = habit_object
+            habits.append(habit_object)
+        return habits
+
+    def __iter_habit_rows__(self, chunk_size):
+        """
+        generator for iter_habits(), keeps the connection of the thread until all rows are read or the generator is
+        closed
+
+        :param chunk_size: integer - number of rows read at once
+
+        :return: iterator of lists of habits, one list per chunk
+        """
+        query = 'SELECT ' + __habit_columns__ + ' FROM habits WHERE user_id = ? AND deactivated = 0 ORDER BY id'
+        with self.__pool__.connection() as connection:
+            cursor = connection.execute(query, (self.__user_id__,))
+            rows = cursor.fetchmany(chunk_size)
+            while len(rows) > 0:
+                break_histories = None
+                if self.__table_breaks__:
+                    break_histories = self.__load_break_histories__([habit_data[0] for habit_data in rows])
+                chunk = []
+                for habit_data in rows:
+                    cached_habit = self.__habits_index__.get(habit_data[0])
+                    chunk.append(cached_habit if cached_habit is not None else
+                                 __create_habit__(habit_data, self.__clock__, break_histories))
+                yield chunk
+                rows = cursor.fetchmany(chunk_size)
+
+    def __iter_and_save__(self, chunks):
+        """
+        generator for iter_habits(), yields the habits of the chunks and writes the breaks calculated while a chunk was
+        iterated in one transaction, before the next chunk is read or when the iteration is stopped
+
+        :param chunks: iterator of lists of habits
+        """
+        try:
+            for chunk in chunks:
+                try:
+                    yield from chunk
+                finally:
+                    self.__save_evaluations__(chunk)
+        finally:
+            chunks.close()
+
+    def __load_break_histories__(self, habit_ids=None):
+        """
+        loads the break history of habits from the habit_breaks table
+
+        :param habit_ids: list of habit-ids (optional, default all active habits of the user)
+
+        :return: dictionary {habit_id: {'yyyy': {'m': count}}}
+        """
+        if habit_ids is None:
+            query = '''SELECT habit_breaks.habit_id, habit_breaks.year, habit_breaks.month, habit_breaks.count
+                       FROM habits JOIN habit_breaks ON habit_breaks.habit_id = habits.id
+                       WHERE habits.user_id = ? AND habits.deactivated = 0'''
+            results = self.__sql_call__(query, (self.__user_id__,), True)
+        else:
+            results = []
+            for index in range(0, len(habit_ids), __ids_per_query__):
+                chunk = habit_ids[index:index + __ids_per_query__]
+                query = 'SELECT habit_id, year, month, count FROM habit_breaks WHERE habit_id IN ({})'.format(
+                    ', '.join('?' * len(chunk)))
+                results.extend(self.__sql_call__(query, tuple(chunk), True))
+
+        break_histories = {}
+        for habit_id, year, month, count in results:
+            break_histories.setdefault(habit_id, {}).setdefault(str(year), {})[str(month)] = count
+        return break_histories
+
+    def __evaluate_stale_habits__(self):
+        """
+        loads the habits whose breaks were not calculated today, so streak and breaks in the database are current
+        before sqlite sorts by them. after the first call of a day only the habits sorted by sqlite are loaded.
+        the unsaved changes of the cached habits are written in the same transaction, sqlite sorts by them as well.
+        """
+        stale_habits = self.__query_habits__('(evaluated_through IS NULL OR evaluated_through < ?)',
+                                             (self.__clock__.snapshot().get_today_string(),), refresh=True)
+        for current_habit in stale_habits:
+            current_habit.evaluate()
+        # the stale habits are cached by __query_habits__()
+        self.__write_changes__(list(self.__habits_index__.values()))
+
+    def __get_all_habits__(self, force_update=False):
+        """
+        returns all active habits of the user for the functions that filter or sort in python
+
+        :param force_update: boolean - reload habits from database
+
+        :return: list of habits
+        """
+        if self.__sql_queries__ and not self.__is_test_user__():
+            return self.__query_habits__(order_by='id', refresh=force_update)
+        if force_update:
+            self.__update_habits_list__()
+        return self.__get_habits_list__()
+
+    def __set_habits__(self, habits):
+        """
+        replaces the cached habits and rebuilds the index by normalized habit-id
+
+        :param habits: list of habits
+        """
+        self.__habits__ = habits
+        self.__habits_stale__ = False
+        self.__habits_index__ = {__normalize_habit_id__(current_habit.get_id()): current_habit
+                                 for current_habit in habits}
+
+    def __get_habits_list__(self):
+        """
+        returns the cached habits as list, the list is rebuilt from the index after habits were deleted.
+        the index keeps the order of the list because new habits are added at its end.
+
+        :return: list of habits
+        """
+        if self.__habits_stale__:
+            self.__habits__ = list(self.__habits_index__.values())
+            self.__habits_stale__ = False
+        return self.__habits__
+
+    def __get_cached_habit__(self, habit_id):
+        """
+        returns the cached habit with the given habit_id
+
+        :param habit_id: string or int
+
+        :return: habit
+
+        :raise HabitDoesNotExistException when the given habit_id does not exist
+        """
+        normalized_id = __normalize_habit_id__(habit_id)
+        current_habit = self.__habits_index__.get(normalized_id)
+        if current_habit is None and self.__sql_queries__ and not self.__is_test_user__():
+            self.__query_habits__('id = ?', (normalized_id,))
+            current_habit = self.__habits_index__.get(normalized_id)
+        if current_habit is None:
+            raise HabitDoesNotExistException(habit_id)
+        return current_habit
+
+    @staticmethod
+    def __sort_habits__(habits, key, reverse=False, limit=None):
+        """
+        stable sort of the given habits, uses a heap if only the top habits are requested
+
+        :param habits: list of habits
+        :param key: function returning the sort key of a habit
+        :param reverse: boolean - sort descending
+        :param limit: integer - number of habits to return (optional, default all)
+
+        :return: list of habits
+        """
+        if limit is None:
+            return sorted(habits, key=key, reverse=reverse)
+        elif reverse:
+            return heapq.nlargest(limit, habits, key=key)
+        else:
+            return heapq.nsmallest(limit, habits, key=key)
+
+    def __write_changes__(self, habits):
+        """
+        writes the changed columns of the given habits in one transaction. habits with the same changed columns are
+        written with one executemany, the months of the break history changed by the calculation are written into
+        habit_breaks if the breaks are stored there.
+
+        :param habits: list of habits of the user
+
+        :return: integer, number of written habits
+        """
+        queries = {}
+        written_habits = []
+        for current_habit in habits:
+            if not current_habit.has_changes():
+                continue
+            try:
+                query_data = current_habit.create_changes_query(self.__user_id__, not self.__table_breaks__)
+            except habit.WrongUserException:
+                # prevents overwriting habits from other users
+                logging.error('habit with habit-id %s does not exist for user with user-id: %s',
+                              current_habit.get_id(), self.__user_id__)
+                continue
+            if query_data is not None:
+                queries.setdefault(query_data['query'], []).append(query_data['values'])
+            written_habits.append(current_habit)
+
+        if len(written_habits) > 0:
+            with self.__pool__.transaction():
+                for query, values_list in queries.items():
+                    self.__pool__.executemany(query, values_list)
+                if self.__table_breaks__:
+                    # only the months changed by the calculation are written
+                    break_rows = [(current_habit.get_id(), year, month, count) for current_habit in written_habits
+                                  for year, month, count in current_habit.get_changed_breaks()]
+                    self.__pool__.executemany('''INSERT INTO habit_breaks (habit_id, year, month, count)
+                            VALUES (?, ?, ?, ?) ON CONFLICT (habit_id, year, month) DO UPDATE SET count = excluded.count''',
+                                              break_rows)
+            for current_habit in written_habits:
+                current_habit.set_changes_saved()
+        return len(written_habits)
+
+    def __save_evaluations__(self, habits):
+        """
+        writes the breaks calculated while loading the habits in one transaction, so they are only calculated once a day
+
+        :param habits: list of loaded habits
+        """
+        if self.__is_test_user__():
+            return
+        self.__write_changes__([current_habit for current_habit in habits if not current_habit.is_evaluation_saved()])
+
     def __save_habit__(self, habit_id):
         """
-        writes the habit-data with the given habit-id to the database
+        writes the changed columns of the habit with the given habit-id to the database
 
         :param habit_id: integer
 
@@ -138,41 +455,17 @@ class Habits:
         """
         if not self.__is_test_user__():
             if self.has_user_id():
-                found_habit = False
-
-                for current_habit in self.__habits__:
-                    if __habit_id_compare__(current_habit.get_id(), habit_id):
-                        found_habit = True
-                        try:
-                            query_data = current_habit.create_update_query(self.__user_id__)
-                            self.__sql_call__(query_data['query'], query_data['values'])
-                        except habit.WrongUserException:
-                            # prevents overwriting habits from other users
-                            logging.error('habit with habit-id {habit} does not exist for user with user-id: {user}'.format(habit = habit_id, user = self.__user_id__))
-
-                if not found_habit:
-                    raise HabitDoesNotExistException(habit_id)
+                self.__write_changes__([self.__get_cached_habit__(habit_id)])
             else:
                 raise MissingUserIdException()
 
     def __save_all_habits__(self):
         """
-        writes all habits into the database
+        writes all changed habits into the database, see flush()
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
-        if not self.__is_test_user__():
-            if self.has_user_id():
-                for current_habit in self.__habits__:
-                    try:
-                        query_data = current_habit.create_update_query(self.__user_id__)
-                        self.__sql_call__(query_data.query, query_data.values)
-                    except habit.WrongUserException:
-                        # prevents overwriting habits from other users
-                        logging.error('habit with habit-id {habit} does not exist for user with user-id: {user}'.format(
-                            habit=current_habit.get_id(), user=self.__user_id__))
-            else:
-                raise MissingUserIdException()
+        self.flush()
 
     def select_user(self, user_id, test_habits=None):
         """
@@ -183,11 +476,15 @@ class Habits:
 
         :raise: ValueError if test_habits is not given while using a test-user
         """
+        if self.has_user_id() and user_id != self.__user_id__:
+            # the changes of the previous user are written before its habits are dropped
+            self.flush()
+            self.__habits_index__ = None
         self.__user_id__ = user_id
-        logging.debug('switch to user with user_id: {}'.format(user_id))
+        logging.debug('switch to user with user_id: %s', user_id)
         if self.__is_test_user__():
             if type(test_habits) is list:
-                self.__habits__ = test_habits
+                self.__set_habits__(test_habits)
             else:
                 raise ValueError('no test_habits are given or is not a list')
         else:
@@ -208,9 +505,64 @@ class Habits:
             'weekly': self.const.get_periodicity_weekly()
         }
 
+    def get_habit(self, habit_id):
+        """
+        return the habit with the given habit_id
+
+        :param habit_id: string or int
+
+        :return: habit
+
+        :raise: MissingUserIdException when no user_id is given (call select_user())
+        :raise HabitDoesNotExistException when the given habit_id does not exist
+        """
+        if self.has_user_id():
+            return self.__get_cached_habit__(habit_id)
+        else:
+            raise MissingUserIdException()
+
+    def count_habits(self):
+        """
+        return the number of active habits of the user without loading them in the sql query mode
+
+        :return: integer
+
+        :raise: MissingUserIdException when no user_id is given (call select_user())
+        """
+        if self.has_user_id():
+            if self.__sql_queries__ and not self.__is_test_user__():
+                return self.__sql_call__('SELECT COUNT(*) FROM habits WHERE user_id = ? AND deactivated = 0',
+                                         (self.__user_id__,), True)[0][0]
+            return len(self.__habits_index__)
+        else:
+            raise MissingUserIdException()
+
+    def count_cached_habits(self):
+        """
+        return the number of habits kept in memory, used to estimate the memory of the cached habits
+
+        :return: integer
+        """
+        return len(self.__habits_index__) if self.__habits_index__ is not None else 0
+
+    def get_memory_estimate(self):
+        """
+        estimates the memory of this object and the habits kept in memory, see Habit.get_memory_estimate()
+
+        :return: integer, bytes
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+        if self.__habits__ is not None:
+            size += sys.getsizeof(self.__habits__)
+        if self.__habits_index__ is not None:
+            # the list and the index share the habits
+            size += sys.getsizeof(self.__habits_index__)
+            size += sum(current_habit.get_memory_estimate() for current_habit in self.__habits_index__.values())
+        return size
+
     def add_habit(self, title, description, periodicity):
         """
-        creates a new habit, adds it to the db and updates the list of habits after.
+        creates a new habit, adds it to the db and to the cached list of habits.
 
         :param title: string
         :param description: string
@@ -225,13 +577,20 @@ class Habits:
             if periodicity == self.const.get_periodicity_daily() or periodicity == self.const.get_periodicity_weekly():
                 query_string = '''INSERT INTO habits (user_id, title, description, periodicity, created_at, last_break, 
                         last_checked, streak, longest_streak, break_history) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
-                query_values = (self.__user_id__, title, description, periodicity, datetime.now(), '', '', 0, 0, '{}')
+                created = self.__clock__.now()
+                break_history = None if self.__table_breaks__ else '{}'
+                query_values = (self.__user_id__, title, description, periodicity, created, '', '', 0, 0, break_history)
 
                 if not self.__is_test_user__():
                     logging.debug(query_string)
                     logging.debug(query_values)
-                    self.__sql_call__(query_string, query_values)
-                    self.__update_habits_list__() # update habits list with all new data, especially the ids
+                    habit_id = self.__sql_call__(query_string, query_values) # INSERT returns the new habit-id
+                    # add the new habit to the cached habits instead of reloading all habits
+                    new_habit = habit.Habit(habit_id, self.__user_id__, title, description, periodicity,
+                                            str(created), '', '', 0, 0, {}, '', self.__clock__)
+                    if self.__habits__ is not None and not self.__habits_stale__:
+                        self.__habits__.append(new_habit)
+                    self.__habits_index__[__normalize_habit_id__(habit_id)] = new_habit
                 else:
                     return query_string, query_values
             else:
@@ -254,26 +613,18 @@ class Habits:
         :raise HabitDoesNotExistException when the given habit_id does not exist
         """
         if self.has_user_id():
-            found_habit = False
-
-            for current_habit in self.__habits__:
-                if __habit_id_compare__(current_habit.get_id(), habit_id):
-                    if len(title) > 0:
-                        current_habit.set_title(title, self.__user_id__)
-                    if len(description) > 0:
-                        current_habit.set_description(description, self.__user_id__)
-
-                    if not self.__is_test_user__():
-                        logging.debug('change title to: {}'.format(current_habit.get_title()))
-                        logging.debug('change description to: {}'.format(current_habit.get_description()))
-                        self.__save_habit__(current_habit.get_id())
-                        self.__update_habits_list__()
-                        found_habit = True
-                    else:
-                        return current_habit
-
-            if not found_habit:
-                raise HabitDoesNotExistException(habit_id)
+            current_habit = self.__get_cached_habit__(habit_id)
+            if len(title) > 0:
+                current_habit.set_title(title, self.__user_id__)
+            if len(description) > 0:
+                current_habit.set_description(description, self.__user_id__)
+
+            if not self.__is_test_user__():
+                logging.debug('change title to: %s', current_habit.get_title())
+                logging.debug('change description to: %s', current_habit.get_description())
+                self.__save_habit__(current_habit.get_id())
+            else:
+                return current_habit
         else:
             raise MissingUserIdException()
 
@@ -289,23 +640,19 @@ class Habits:
         :raise HabitDoesNotExistException when the given habit_id does not exist
         """
         if self.has_user_id():
-            found_habit = False
-
-            for current_habit in self.__habits__:
-                if __habit_id_compare__(current_habit.get_id(), habit_id):
-                    found_habit = True
-                    query_string = '''UPDATE habits SET deactivated = ? WHERE id = ? AND user_id = ?'''
-                    query_values = (1, habit_id, self.__user_id__)
-
-                    if not self.__is_test_user__():
-                        logging.debug(query_string)
-                        logging.debug(query_values)
-                        self.__sql_call__(query_string, query_values)
-                        self.__update_habits_list__()
-                    else:
-                        return query_string, query_values
-            if not found_habit:
-                raise HabitDoesNotExistException(habit_id)
+            current_habit = self.__get_cached_habit__(habit_id)
+            query_string = '''UPDATE habits SET deactivated = ? WHERE id = ? AND user_id = ?'''
+            query_values = (1, habit_id, self.__user_id__)
+
+            if not self.__is_test_user__():
+                logging.debug(query_string)
+                logging.debug(query_values)
+                self.__sql_call__(query_string, query_values)
+                del self.__habits_index__[__normalize_habit_id__(habit_id)]
+                # removing the habit from the list would search it, the list is rebuilt when it is needed
+                self.__habits_stale__ = self.__habits__ is not None
+            else:
+                return query_string, query_values
         else:
             raise MissingUserIdException()
 
@@ -326,6 +673,8 @@ class Habits:
             logging.debug(query_values)
             self.__sql_call__(query_string, query_values)
             if user_id == self.__user_id__:
+                # the changes of deleted habits are not written anymore
+                self.__habits_index__ = None
                 self.__update_habits_list__()
         else:
             return query_string, query_values
@@ -342,21 +691,72 @@ class Habits:
         :raise HabitDoesNotExistException when the given habit_id does not exist
         """
         if self.has_user_id():
-            found_habit = False
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                current_habit = self.__get_cached_habit__(habit_id)
+                current_habit.check(self.__user_id__)
 
-            for current_habit in self.__habits__:
-                if __habit_id_compare__(current_habit.get_id(), habit_id):
-                    found_habit = True
-                    current_habit.check(self.__user_id__)
+                if not self.__is_test_user__():
+                    self.__save_habit__(current_habit.get_id())
+                else:
+                    return current_habit
+        else:
+            raise MissingUserIdException()
 
-                    if not self.__is_test_user__():
-                        self.__save_habit__(current_habit.get_id())
-                        self.__update_habits_list__()
+    def check_habits(self, habit_ids):
+        """
+        checks all habits with the given habit_ids as finished and writes them in one transaction
+
+        :param habit_ids: iterable of habit-ids
+
+        :return: dictionary {habit_id (int): boolean}, true if the habit was checked now, false if it was already checked
+
+        :raise: MissingUserIdException when no user_id is given (call select_user())
+        :raise HabitDoesNotExistException when one of the habit_ids does not exist, no habit is checked in this case
+        """
+        if self.has_user_id():
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                # look up all habits first, so an unknown habit_id does not leave the habits partially checked
+                habits_to_check = [self.__get_cached_habit__(habit_id) for habit_id in habit_ids]
+
+                results = {}
+                checked_habits = []
+                for current_habit in habits_to_check:
+                    habit_id = __normalize_habit_id__(current_habit.get_id())
+                    if current_habit.is_checked():
+                        results.setdefault(habit_id, False)
                     else:
-                        return current_habit
+                        current_habit.check(self.__user_id__)
+                        results[habit_id] = True
+                        checked_habits.append(current_habit)
+
+                if not self.__is_test_user__() and len(checked_habits) > 0:
+                    try:
+                        self.__write_changes__(checked_habits)
+                    except Exception:
+                        # the transaction is rolled back, the checked habits have to match the database again
+                        for current_habit in checked_habits:
+                            del self.__habits_index__[__normalize_habit_id__(current_habit.get_id())]
+                        self.__update_habits_list__()
+                        raise
+                return results
+        else:
+            raise MissingUserIdException()
+
+    def flush(self):
+        """
+        writes the changed columns of all loaded habits that were changed since they were loaded or last saved,
+        in one transaction. the breaks calculated while loading are written too.
 
-            if not found_habit:
-                raise HabitDoesNotExistException(habit_id)
+        :return: integer, number of written habits
+
+        :raise: MissingUserIdException when no user_id is given (call select_user())
+        """
+        if self.has_user_id():
+            if self.__is_test_user__():
+                return 0
+            return self.__write_changes__(list(self.__habits_index__.values()))
         else:
             raise MissingUserIdException()
 
@@ -371,9 +771,38 @@ class Habits:
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-            return tuple(self.__habits__)
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                all_habits = self.__get_all_habits__(force_update)
+                for current_habit in all_habits:
+                    current_habit.evaluate()
+                self.__save_evaluations__(all_habits)
+                return tuple(all_habits)
+        else:
+            raise MissingUserIdException()
+
+    def iter_habits(self, chunk_size=256):
+        """
+        iterates over all current habits. in the sql query mode the habits are read in chunks and created when they are
+        reached, habits that are not loaded yet are not kept afterward.
+        the breaks of a habit are only calculated when a break-related value of it is accessed, the calculated breaks
+        are written once per chunk.
+
+        :param chunk_size: integer - number of habits read from the database or written at once (default 256)
+
+        :return: iterator of habits
+
+        :raise: MissingUserIdException when no user_id is given (call select_user())
+        :raise: ValueError if chunk_size is smaller than 1
+        """
+        if self.has_user_id():
+            if chunk_size < 1:
+                raise ValueError('chunk_size must be at least 1, not: {}'.format(chunk_size))
+            if self.__sql_queries__ and not self.__is_test_user__():
+                return self.__iter_and_save__(self.__iter_habit_rows__(chunk_size))
+            habits = tuple(self.__get_habits_list__())
+            return self.__iter_and_save__(habits[index:index + chunk_size]
+                                          for index in range(0, len(habits), chunk_size))
         else:
             raise MissingUserIdException()
 
@@ -391,12 +820,12 @@ class Habits:
         """
         if self.has_user_id():
             if periodicity == self.const.get_periodicity_daily() or periodicity == self.const.get_periodicity_weekly():
-                if force_update:
-                    self.__update_habits_list__()
+                if self.__sql_queries__ and not self.__is_test_user__():
+                    return tuple(self.__query_habits__('periodicity = ?', (periodicity,), 'id', refresh=force_update))
 
                 result_list = []
 
-                for current_habit in self.__habits__:
+                for current_habit in self.__get_all_habits__(force_update):
                     if current_habit.get_periodicity() == periodicity:
                         result_list.append(current_habit)
 
@@ -409,172 +838,143 @@ class Habits:
         else:
             raise MissingUserIdException()
 
-    def get_habits_by_streak(self, force_update=False):
+    def get_habits_by_streak(self, force_update=False, limit=None):
         """
         return list of habits, sorted by streak (desc)
 
         :param force_update: boolean - reload habits from database (default false)
+        :param limit: integer - return only the first habits (default all)
 
         :return: tuple of habits
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-
-            sorted_habits = sorted(self.__habits__, key=lambda current_habit: current_habit.get_streak(), reverse=True)
-            return tuple(sorted_habits)
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                if self.__sql_queries__ and not self.__is_test_user__():
+                    # a break resets the streak, so the breaks have to be calculated before sorting
+                    self.__evaluate_stale_habits__()
+                    return tuple(self.__query_habits__(order_by='streak DESC, id', limit=limit, refresh=force_update))
+
+                all_habits = self.__get_all_habits__(force_update)
+                sorted_habits = self.__sort_habits__(all_habits, habit.Habit.get_streak, True, limit)
+                # the sort key calculated the breaks of all habits
+                self.__save_evaluations__(all_habits)
+                return tuple(sorted_habits)
         else:
             raise MissingUserIdException()
 
-    def get_habits_by_longest_streak(self, force_update=False):
+    def get_habits_by_longest_streak(self, force_update=False, limit=None):
         """
         return list of habits, sorted by longest_streak (desc)
 
         :param force_update: boolean - reload habits from database (default false)
+        :param limit: integer - return only the first habits (default all)
 
         :return: tuple of habits
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
+            if self.__sql_queries__ and not self.__is_test_user__():
+                return tuple(self.__query_habits__(order_by='longest_streak DESC, id', limit=limit,
+                                                   refresh=force_update))
 
-            sorted_habits = sorted(self.__habits__, key=lambda current_habit: current_habit.get_longest_streak(), reverse=True)
+            sorted_habits = self.__sort_habits__(self.__get_all_habits__(force_update),
+                                                 habit.Habit.get_longest_streak, True, limit)
             return tuple(sorted_habits)
         else:
             raise MissingUserIdException()
 
-    def get_habits_by_break(self, force_update=False):
+    def get_habits_by_break(self, force_update=False, limit=None):
         """
         return list of habits, sorted by the sum of all breaks (from break_history) (desc)
+        sorted by sqlite in the sql query mode if the breaks are stored in the habit_breaks table
 
         :param force_update: boolean - reload habits from database (default false)
+        :param limit: integer - return only the first habits (default all)
 
         :return: dictionary of habits and breaks with "habits" and "breaks"
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-
-            reference_list = [] # list of the breaks, mirroring the result_list
-            result_list = []
-
-            # custom sorting for breaks
-            for current_habit in self.__habits__:
-                breaks_sum = 0
-
-                for year in current_habit.get_break_history().keys():
-                    for month in current_habit.get_break_history().get(year).keys():
-                        breaks_sum += current_habit.get_break_history().get(year).get(month)
-
-                # search for correct position
-                target_index = 0
-                for current_index, current_break in enumerate(reference_list):
-                    if current_break <= breaks_sum:
-                        target_index = current_index
-                        break
-
-                result_list.insert(target_index, current_habit)
-                reference_list.insert(target_index, breaks_sum)
-
-            logging.debug(reference_list)
-            return {"habits": result_list, "breaks": reference_list}
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                if self.__sql_queries__ and self.__table_breaks__ and not self.__is_test_user__():
+                    self.__evaluate_stale_habits__()
+                    result_list = self.__query_habits__(
+                        order_by='(SELECT TOTAL(count) FROM habit_breaks WHERE habit_id = habits.id) DESC, id',
+                        limit=limit, refresh=force_update)
+                else:
+                    all_habits = self.__get_all_habits__(force_update)
+                    result_list = self.__sort_habits__(all_habits, habit.Habit.get_breaks_sum, True, limit)
+                    # the sort key calculated the breaks of all habits
+                    self.__save_evaluations__(all_habits)
+                reference_list = [current_habit.get_breaks_sum() for current_habit in result_list]
+
+                logging.debug(reference_list)
+                return {"habits": result_list, "breaks": reference_list}
         else:
             raise MissingUserIdException()
 
-    def get_habits_by_last_month_breaks(self, force_update=False):
+    def get_habits_by_last_month_breaks(self, force_update=False, limit=None):
         """
         return list of habits, sorted by the breaks of last month (from break_history) (desc)
+        sorted by sqlite in the sql query mode if the breaks are stored in the habit_breaks table
 
         :param force_update: boolean - reload habits from database (default false)
+        :param limit: integer - return only the first habits (default all)
 
         :return: :return: dictionary of habits and breaks with "habits" and "breaks"
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-
-            reference_list = []  # list of the breaks, mirroring the result_list
-            result_list = []
-
-            last_month_date = time_handler.get_last_month(datetime.now())
-            year = str(last_month_date.year)
-            month = str(last_month_date.month)
-
-            # custom sorting for breaks
-            for current_habit in self.__habits__:
-                target_index = -1
-                current_habit_break = 0
-
-                if current_habit.get_break_history().get(year) is not None:
-                    if current_habit.get_break_history().get(year).get(month) is not None:
-                        current_habit_break = current_habit.get_break_history().get(year).get(month)
-
-                        if current_habit_break > 0:
-                            current_habit.last_months_breaks = current_habit_break
-                            for current_index, current_break in enumerate(reference_list):
-                                if current_break <= current_habit_break:
-                                    target_index = current_index
-                                    break
-
-                if target_index == -1:
-                    reference_list.append(current_habit_break)
-                    result_list.append(current_habit)
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                last_month_date = self.__clock__.snapshot().get_last_month()
+                last_month_key = lambda current_habit: current_habit.get_last_months_breaks(last_month_date)
+
+                if self.__sql_queries__ and self.__table_breaks__ and not self.__is_test_user__():
+                    self.__evaluate_stale_habits__()
+                    result_list = self.__query_habits__(
+                        params=(last_month_date.year, last_month_date.month),
+                        order_by='''(SELECT TOTAL(count) FROM habit_breaks
+                                     WHERE habit_id = habits.id AND year = ? AND month = ?) DESC, id''',
+                        limit=limit, refresh=force_update)
                 else:
-                    reference_list.insert(target_index, current_habit_break)
-                    result_list.insert(target_index, current_habit)
-
-            logging.debug(reference_list)
-            return {"habits": result_list, "breaks": reference_list}
+                    all_habits = self.__get_all_habits__(force_update)
+                    result_list = self.__sort_habits__(all_habits, last_month_key, True, limit)
+                    # the sort key calculated the breaks of all habits
+                    self.__save_evaluations__(all_habits)
+                reference_list = [last_month_key(current_habit) for current_habit in result_list]
+
+                logging.debug(reference_list)
+                return {"habits": result_list, "breaks": reference_list}
         else:
             raise MissingUserIdException()
 
-    def get_habits_by_created(self, force_update=False):
+    def get_habits_by_created(self, force_update=False, limit=None):
         """
         return list of habits, sorted by the creation date (oldest first)
+        habits with a created-date that could not be parsed are sorted last (in the memory query mode)
 
         :param force_update: boolean - reload habits from database (default false)
+        :param limit: integer - return only the first habits (default all)
 
         :return: tuple of habits
 
         :raise: MissingUserIdException when no user_id is given (call select_user())
-        :raise: ValueError when the created-date of a habit could not be parsed
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-
-            reference_list = []  # list of the datetime objects, mirroring the result_list
-            result_list = []
-
-            # custom sorting for created-at date
-            for current_habit in self.__habits__:
-                current_habit_created = time_handler.parse_string_to_datetime(current_habit.get_created())
-
-                if current_habit_created is None or len(result_list) == 0:
-                    result_list.append(current_habit)
-                    reference_list.append(current_habit_created)
-                else:
-                    found = False
-                    for current_index, current_break in enumerate(reference_list):
-                        if current_break is None or current_habit_created <= current_break:
-                            found = True
-                            result_list.insert(current_index, current_habit)
-                            reference_list.insert(current_index, current_habit_created)
-                            break
-
-                    if not found:
-                        result_list.append(current_habit)
-                        reference_list.append(current_habit_created)
-
+            if self.__sql_queries__ and not self.__is_test_user__():
+                # created_at is stored as "yyyy-mm-dd hh:mm:ss", so the text order is the order of the dates
+                return tuple(self.__query_habits__(order_by='created_at, id', limit=limit, refresh=force_update))
 
+            result_list = self.__sort_habits__(self.__get_all_habits__(force_update), __created_sort_key__,
+                                               False, limit)
             return tuple(result_list)
         else:
             raise MissingUserIdException()
@@ -591,15 +991,17 @@ class Habits:
         :raise: NameError if periodicity of the habit does not match the values from const
         """
         if self.has_user_id():
-            if force_update:
-                self.__update_habits_list__()
-
-            result_list = []
+            # one snapshot of today for all habits of the call
+            with self.__clock__.batch():
+                result_list = []
+                all_habits = self.__get_all_habits__(force_update)
 
-            for current_habit in self.__habits__:
-                if not current_habit.is_checked():
-                    result_list.append(current_habit)
+                for current_habit in all_habits:
+                    current_habit.evaluate()
+                    if not current_habit.is_checked():
+                        result_list.append(current_habit)
 
-            return tuple(result_list)
+                self.__save_evaluations__(all_habits)
+                return tuple(result_list)
         else:
             raise MissingUserIdException()
@@ -0,0 +1,406 @@
+"""
+provides the HabitsStore and ThreadSafeHabitsStore objects
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from helper import const_handler, time_handler, log_handler
+from habits import habits_handler
+
+log_handler.setup_logging()
+
+# number of locks the users are distributed on, users with the same lock wait for each other
+__lock_stripes__ = 64
+
+
+def __estimate_memory__(entry):
+    """
+    static helper function, estimates the memory of the habits cached by a session and keeps it in the entry, see
+    Habits.get_memory_estimate()
+
+    :param entry: dictionary with 'habits', 'day' and 'memory'
+    """
+    entry['memory'] = entry['habits'].get_memory_estimate()
+
+
+class HabitsStore:
+    """
+    HabitsStore object, keeps one Habits object per user, so switching between users does not reload and evaluate the
+    habits of the user again. the least recently used sessions are written with flush() and dropped when there are more
+    than max_sessions or their estimated memory exceeds max_memory.
+    not thread-safe, see ThreadSafeHabitsStore.
+
+    provided functions:
+    session()
+    close_session()
+    flush()
+    clear()
+    get_stats()
+    """
+    const = const_handler.ConstHandler()
+
+    def __init__(self, database=None, query_mode=None, clock=None, max_sessions=None, max_memory=None):
+        """
+        initial function, the parameters are passed to every Habits object created by session()
+
+        :param database: path to the database file (optional, default DBSection -> name from habits.properties)
+        :param query_mode: 'MEMORY' or 'SQL' (optional, default DBSection -> queryMode from habits.properties)
+        :param clock: SystemClock or FrozenClock for today's date (optional, default time_handler.get_system_clock())
+        :param max_sessions: integer - maximum number of cached sessions
+                             (optional, default StoreSection -> maxSessions from habits.properties)
+        :param max_memory: integer - maximum estimated memory of all cached sessions in bytes
+                           (optional, default StoreSection -> maxMemory from habits.properties)
+
+        :raise: ValueError if max_sessions is smaller than 1
+        """
+        self.__database__ = database
+        self.__query_mode__ = query_mode
+        self.__clock__ = clock if clock is not None else time_handler.get_system_clock()
+        self.__max_sessions__ = max_sessions if max_sessions is not None else self.const.get_store_max_sessions()
+        self.__max_memory__ = max_memory if max_memory is not None else self.const.get_store_max_memory()
+        if self.__max_sessions__ < 1:
+            raise ValueError('max_sessions must be at least 1, not: {}'.format(self.__max_sessions__))
+
+        # user_id -> {'habits': Habits, 'day': today's date string when the user was selected,
+        #             'memory': estimated bytes when the session was last used}, least recent first
+        self.__sessions__ = OrderedDict()
+        self.__hits__ = 0
+        self.__misses__ = 0
+        self.__evictions__ = 0
+
+    def __get_entry__(self, user_id):
+        """
+        returns the cached session of the user and marks it as most recently used, counts the hit or miss
+
+        :param user_id: string
+
+        :return: dictionary with 'habits', 'day' and 'memory', None if the user has no session
+        """
+        entry = self.__sessions__.get(user_id)
+        if entry is not None:
+            self.__hits__ += 1
+            self.__sessions__.move_to_end(user_id)
+        else:
+            self.__misses__ += 1
+        return entry
+
+    def __create_entry__(self, user_id):
+        """
+        creates a Habits object and selects the user, the session is not cached yet
+
+        :param user_id: string
+
+        :return: dictionary with 'habits', 'day' and 'memory'
+        """
+        current_habits = habits_handler.Habits(self.__database__, self.__query_mode__, self.__clock__)
+        current_habits.select_user(user_id)
+        return {'habits': current_habits, 'day': self.__clock__.snapshot().get_today_string(), 'memory': 0}
+
+    def __refresh_entry__(self, entry, user_id):
+        """
+        selects the user of a cached session again on a new day, so the breaks of the habits are calculated again
+
+        :param entry: dictionary with 'habits', 'day' and 'memory'
+        :param user_id: string
+        """
+        today = self.__clock__.snapshot().get_today_string()
+        if entry['day'] != today:
+            entry['habits'].flush()
+            entry['habits'].select_user(user_id)
+            entry['day'] = today
+
+    def __evict_session__(self, user_id, entry):
+        """
+        writes the session of a user before it is dropped
+
+        :param user_id: string
+        :param entry: dictionary with 'habits', 'day' and 'memory'
+
+        :return: boolean, true if the session can be dropped
+        """
+        entry['habits'].flush()
+        return True
+
+    def __evict__(self, keep_user_id):
+        """
+        writes and drops the least recently used sessions until the limits are kept, the session of keep_user_id is
+        never dropped. the memory of a session is estimated again whenever it was used, see session().
+
+        :param keep_user_id: string
+        """
+        memory = sum(entry['memory'] for entry in self.__sessions__.values())
+        for user_id, entry in list(self.__sessions__.items()):
+            if len(self.__sessions__) <= self.__max_sessions__ and memory <= self.__max_memory__:
+                break
+            # the session stays cached if it can not be written
+            if user_id == keep_user_id or not self.__evict_session__(user_id, entry):
+                continue
+            del self.__sessions__[user_id]
+            memory -= entry['memory']
+            self.__evictions__ += 1
+            logging.debug('evicted session of user with user_id: %s', user_id)
+
+    def session(self, user_id):
+        """
+        returns the Habits object of the user, it is created and the user is selected on the first call.
+        the user is selected again on a new day, so the breaks of the cached habits are calculated again.
+
+        :param user_id: string, test-users are not supported
+
+        :return: Habits with the selected user
+        """
+        if len(self.__sessions__) > 0:
+            # the most recently returned session grows while it is used until the next call
+            __estimate_memory__(next(reversed(self.__sessions__.values())))
+        entry = self.__get_entry__(user_id)
+        if entry is not None:
+            self.__refresh_entry__(entry, user_id)
+        else:
+            entry = self.__create_entry__(user_id)
+            self.__sessions__[user_id] = entry
+        __estimate_memory__(entry)
+        self.__evict__(user_id)
+        return entry['habits']
+
+    def close_session(self, user_id):
+        """
+        writes and drops the session of the user, nothing is done if there is none
+
+        :param user_id: string
+        """
+        entry = self.__sessions__.get(user_id)
+        if entry is not None:
+            entry['habits'].flush()
+            del self.__sessions__[user_id]
+
+    def flush(self):
+        """
+        writes the changed habits of all sessions, see Habits.flush()
+
+        :return: integer, number of written habits
+        """
+        return sum(entry['habits'].flush() for entry in self.__sessions__.values())
+
+    def clear(self):
+        """
+        writes and drops all sessions
+        """
+        self.flush()
+        self.__sessions__.clear()
+
+    def get_stats(self):
+        """
+        returns the counters of the cache
+
+        :return: dictionary with 'sessions', 'memory' (estimated bytes), 'hits', 'misses' and 'evictions'
+        """
+        return {
+            'sessions': len(self.__sessions__),
+            'memory': sum(entry['memory'] for entry in self.__sessions__.values()),
+            'hits': self.__hits__,
+            'misses': self.__misses__,
+            'evictions': self.__evictions__,
+        }
+
+
+class ThreadSafeHabitsStore(HabitsStore):
+    """
+    HabitsStore that can be shared by threads. the sessions are used while the lock of the user is held
+    (see locked_session()), the cache itself is guarded by one lock that is never held while waiting for a user.
+    submit_check() and submit_query() run on a ThreadPoolExecutor and return futures.
+    every thread uses its own sqlite connection (see db_handler.ConnectionPool).
+
+    provided functions:
+    session()
+    locked_session()
+    submit_check()
+    submit_query()
+    close_session()
+    flush()
+    clear()
+    get_stats()
+    shutdown()
+    """
+
+    def __init__(self, database=None, query_mode=None, clock=None, max_sessions=None, max_memory=None,
+                 max_workers=None):
+        """
+        initial function, see HabitsStore
+
+        :param max_workers: integer - number of threads of the executor
+                            (optional, default StoreSection -> maxWorkers from habits.properties)
+
+        :raise: ValueError if max_sessions or max_workers is smaller than 1
+        """
+        super().__init__(database, query_mode, clock, max_sessions, max_memory)
+        max_workers = max_workers if max_workers is not None else self.const.get_store_max_workers()
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1, not: {}'.format(max_workers))
+        self.__store_lock__ = threading.Lock()
+        self.__user_locks__ = tuple(threading.RLock() for _ in range(__lock_stripes__))
+        self.__executor__ = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='habits')
+
+    def __get_user_lock__(self, user_id):
+        """
+        returns the lock of the user
+
+        :param user_id: string
+
+        :return: threading.RLock
+        """
+        return self.__user_locks__[hash(user_id) % __lock_stripes__]
+
+    def __evict_session__(self, user_id, entry):
+        """
+        writes the session of a user before it is dropped, sessions in use by other threads are kept.
+        called while the cache lock is held, so it must not wait for the lock of the user.
+
+        :param user_id: string
+        :param entry: dictionary with 'habits', 'day' and 'memory'
+
+        :return: boolean, true if the session can be dropped
+        """
+        user_lock = self.__get_user_lock__(user_id)
+        if not user_lock.acquire(blocking=False):
+            return False
+        try:
+            entry['habits'].flush()
+        finally:
+            user_lock.release()
+        return True
+
+    def session(self, user_id):
+        """
+        see HabitsStore.session(), the session is loaded while holding the lock of the user like locked_session().
+        the lock is released when the Habits are returned, so they must not be used while another thread uses the
+        same user, use locked_session(), submit_check() or submit_query() for that.
+
+        :param user_id: string, test-users are not supported
+
+        :return: Habits with the selected user
+        """
+        with self.locked_session(user_id) as current_habits:
+            return current_habits
+
+    @contextmanager
+    def locked_session(self, user_id):
+        """
+        provides the Habits object of the user while holding the lock of the user, see HabitsStore.session().
+        the habits are loaded without holding the cache lock, so other users are not blocked. the memory of the session
+        is estimated again when it is given back.
+
+        :param user_id: string, test-users are not supported
+
+        :return: context manager yielding Habits with the selected user
+        """
+        with self.__get_user_lock__(user_id):
+            with self.__store_lock__:
+                entry = self.__get_entry__(user_id)
+            if entry is not None:
+                self.__refresh_entry__(entry, user_id)
+            else:
+                entry = self.__create_entry__(user_id)
+            __estimate_memory__(entry)
+            with self.__store_lock__:
+                self.__sessions__[user_id] = entry
+                self.__evict__(user_id)
+            try:
+                yield entry['habits']
+            finally:
+                __estimate_memory__(entry)
+
+    def __run__(self, user_id, function_name, args, kwargs):
+        """
+        calls a function of the Habits of the user while holding the lock of the user, the breaks of the returned
+        habits are calculated before the lock is released
+
+        :return: result of the function
+        """
+        with self.locked_session(user_id) as current_habits:
+            return habits_handler.__evaluate_result__(getattr(current_habits, function_name)(*args, **kwargs))
+
+    def submit_check(self, user_id, habit_id):
+        """
+        checks the habit on the executor, see Habits.check_habit()
+
+        :param user_id: string
+        :param habit_id: string or int
+
+        :return: concurrent.futures.Future, raises the exceptions of check_habit() on result()
+        """
+        return self.__executor__.submit(self.__run__, user_id, 'check_habit', (habit_id,), {})
+
+    def submit_query(self, user_id, query, *args, **kwargs):
+        """
+        calls a get-function of Habits on the executor, for example submit_query(user_id, 'get_habits_by_streak',
+        limit=5). the returned habits are the cached ones of the session and must not be changed, their breaks are
+        already calculated, so reading them does not change them.
+
+        :param user_id: string
+        :param query: string - name of the function: get_habit, get_habits, get_habits_by_*, get_unchecked_habits,
+                      get_periodicities or count_habits
+        :param args: parameters of the function
+        :param kwargs: keyword parameters of the function
+
+        :return: concurrent.futures.Future with the result of the function
+
+        :raise: ValueError if query is not a get-function of Habits
+        """
+        if not (query.startswith('get_') or query == 'count_habits') or not hasattr(habits_handler.Habits, query):
+            raise ValueError('query must be a get-function of Habits, not: {}'.format(query))
+        return self.__executor__.submit(self.__run__, user_id, query, args, kwargs)
+
+    def close_session(self, user_id):
+        """
+        writes and drops the session of the user, waits until no other thread uses it
+
+        :param user_id: string
+        """
+        with self.__get_user_lock__(user_id):
+            with self.__store_lock__:
+                entry = self.__sessions__.get(user_id)
+            if entry is not None:
+                entry['habits'].flush()
+                with self.__store_lock__:
+                    del self.__sessions__[user_id]
+
+    def flush(self):
+        """
+        writes the changed habits of all sessions, waits for every session until no other thread uses it
+
+        :return: integer, number of written habits
+        """
+        with self.__store_lock__:
+            entries = list(self.__sessions__.items())
+        written_habits = 0
+        for user_id, entry in entries:
+            with self.__get_user_lock__(user_id):
+                written_habits += entry['habits'].flush()
+        return written_habits
+
+    def clear(self):
+        """
+        writes and drops all sessions
+        """
+        with self.__store_lock__:
+            user_ids = list(self.__sessions__)
+        for user_id in user_ids:
+            self.close_session(user_id)
+
+    def get_stats(self):
+        """
+        see HabitsStore.get_stats()
+        """
+        with self.__store_lock__:
+            return super().get_stats()
+
+    def shutdown(self, wait=True):
+        """
+        stops the executor and writes all sessions
+
+        :param wait: boolean - wait for the submitted functions (default true)
+        """
+        self.__executor__.shutdown(wait=wait)
+        self.clear()
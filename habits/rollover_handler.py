@@ -0,0 +1,214 @@
+"""
+calculates the breaks of all active habits that were not evaluated today, for all users at once (nightly rollover).
+the habits are read in pages ordered by user, split into batches of whole users and evaluated in a
+ProcessPoolExecutor. every evaluated batch is written in its own transaction.
+
+provided functions:
+rollover()
+"""
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from helper import const_handler, db_handler, log_handler, migration_handler, time_handler
+from habits import habits_handler
+
+log_handler.setup_logging()
+
+const = const_handler.ConstHandler()
+
+# number of rows read per query
+__page_size__ = 5000
+
+# condition of __iter_stale_rows__(), checked again when the batch is written, so habits evaluated or checked in the
+# meantime are not overwritten
+__not_evaluated_condition__ = 'evaluated_through IS NULL OR evaluated_through < ?'
+
+
+def __iter_stale_rows__(pool, today_string):
+    """
+    generator of the active habits not evaluated for today, ordered by user_id and id.
+    the rows are read in pages with short read transactions, so the written batches do not wait for the reader.
+
+    :param pool: ConnectionPool of the habits database
+    :param today_string: string "yyyy-mm-dd"
+
+    :return: iterator of tuples of the columns in habits_handler.__habit_columns__
+    """
+    # read in the order of the partial index habits_active_user_id (user_id, id), without sorting
+    query = '''SELECT {} FROM habits WHERE deactivated = 0 AND (evaluated_through IS NULL OR evaluated_through < ?)
+               AND (user_id, id) > (?, ?) ORDER BY user_id, id LIMIT ?'''.format(habits_handler.__habit_columns__)
+    last_user_id, last_id = '', -1
+    while True:
+        rows = pool.execute(query, (today_string, last_user_id, last_id, __page_size__), True)
+        yield from rows
+        if len(rows) < __page_size__:
+            return
+        last_user_id, last_id = rows[-1][1], rows[-1][0]
+
+
+def __iter_user_batches__(rows, batch_size):
+    """
+    generator that splits the rows into batches of whole users, a batch only gets more than batch_size rows if a
+    single user has more habits
+
+    :param rows: iterator of habit rows ordered by user_id
+    :param batch_size: integer
+
+    :return: iterator of lists of rows
+    """
+    batch = []
+    user_rows = []
+    for row in rows:
+        if len(user_rows) > 0 and row[1] != user_rows[0][1]:
+            if len(batch) > 0 and len(batch) + len(user_rows) > batch_size:
+                yield batch
+                batch = []
+            batch.extend(user_rows)
+            user_rows = []
+        user_rows.append(row)
+    if len(batch) > 0 and len(batch) + len(user_rows) > batch_size:
+        yield batch
+        batch = []
+    batch.extend(user_rows)
+    if len(batch) > 0:
+        yield batch
+
+
+def __load_break_histories__(pool, habit_ids):
+    """
+    loads the break history of the given habits from the habit_breaks table
+
+    :param pool: ConnectionPool of the habits database
+    :param habit_ids: list of habit-ids
+
+    :return: dictionary {habit_id: {'yyyy': {'m': count}}}
+    """
+    break_histories = {}
+    for index in range(0, len(habit_ids), habits_handler.__ids_per_query__):
+        chunk = habit_ids[index:index + habits_handler.__ids_per_query__]
+        query = 'SELECT habit_id, year, month, count FROM habit_breaks WHERE habit_id IN ({})'.format(
+            ', '.join('?' * len(chunk)))
+        for habit_id, year, month, count in pool.execute(query, tuple(chunk), True):
+            break_histories.setdefault(habit_id, {}).setdefault(str(year), {})[str(month)] = count
+    return break_histories
+
+
+def __evaluate_batch__(rows, break_histories, now):
+    """
+    calculates the breaks of a batch of habits, runs in the worker processes
+
+    :param rows: list of habit rows
+    :param break_histories: dictionary {habit_id: break_history} if the breaks are stored in habit_breaks, else None
+    :param now: datetime all habits are evaluated for
+
+    :return: tuple of the update queries {query: [values]}, the rows for habit_breaks and the number of failed habits
+    """
+    clock = time_handler.FrozenClock(now)
+    queries = {}
+    break_rows = []
+    failed = 0
+    for row in rows:
+        try:
+            current_habit = habits_handler.__create_habit__(row, clock, break_histories)
+            current_habit.evaluate()
+        except (ValueError, NameError) as error:
+            # a broken habit must not stop the rollover of all other habits
+            logging.error('could not evaluate habit with habit-id %s: %s', row[0], error)
+            failed += 1
+            continue
+        query_data = current_habit.create_changes_query(row[1], break_histories is None)
+        if query_data is not None:
+            queries.setdefault(query_data['query'], []).append(query_data['values'])
+        if break_histories is not None:
+            break_rows.extend((row[0], year, month, count)
+                              for year, month, count in current_habit.get_changed_breaks())
+    return queries, break_rows, failed
+
+
+def __write_batch__(pool, queries, break_rows, today_string):
+    """
+    writes the results of one batch in one transaction, habits that were evaluated for today since they were read
+    (by Habits or a check of the user) are left as they are
+
+    :param pool: ConnectionPool of the habits database
+    :param queries: dictionary {query: [values]} of Habit.create_changes_query()
+    :param break_rows: list of tuples (habit_id, year, month, count)
+    :param today_string: string "yyyy-mm-dd" the habits are evaluated for
+    """
+    with pool.transaction():
+        # the breaks are written first, the updates set evaluated_through to today
+        if len(break_rows) > 0:
+            pool.executemany('''INSERT INTO habit_breaks (habit_id, year, month, count) SELECT ?, ?, ?, ?
+                                WHERE EXISTS (SELECT 1 FROM habits WHERE id = ? AND ({}))
+                                ON CONFLICT (habit_id, year, month) DO UPDATE SET count = excluded.count'''
+                             .format(__not_evaluated_condition__),
+                             [break_row + (break_row[0], today_string) for break_row in break_rows])
+        for query, values_list in queries.items():
+            pool.executemany('{} AND ({})'.format(query, __not_evaluated_condition__),
+                             [values + (today_string,) for values in values_list])
+
+
+def rollover(database=None, max_workers=None, batch_size=2000, now=None, progress=None):
+    """
+    calculates and writes the breaks of all active habits that were not evaluated today.
+    at most two batches per worker are evaluated or waiting at the same time, so the memory stays bounded.
+
+    :param database: path to the database file (optional, default DBSection -> name from habits.properties)
+    :param max_workers: integer - number of processes (optional, default number of cpus)
+    :param batch_size: integer - number of habits per batch, batches only contain whole users (default 2000)
+    :param now: datetime the habits are evaluated for (optional, default datetime.now())
+    :param progress: function called with the statistics (see return) after every written batch (optional)
+
+    :return: dictionary with 'users', 'habits', 'failed', 'seconds' and 'habits_per_second'
+
+    :raise: ValueError if batch_size is smaller than 1
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1, not: {}'.format(batch_size))
+    if database is None:
+        database = const.get_habits_db_name().strip() + '.db'
+    max_workers = max_workers if max_workers is not None else os.cpu_count() or 1
+    now = now if now is not None else time_handler.get_system_clock().now()
+    today_string = time_handler.DateSnapshot(now).get_today_string()
+
+    pool = db_handler.get_pool(database)
+    migration_handler.prepare_habits_db(pool, const.get_db_break_storage())
+    table_breaks = const.get_db_break_storage() == 'TABLE'
+
+    stats = {'users': 0, 'habits': 0, 'failed': 0, 'seconds': 0.0, 'habits_per_second': 0.0}
+    start = time.perf_counter()
+    # future -> (number of users, number of habits) of the batches that are not written yet
+    pending = {}
+
+    def write_result(future):
+        queries, break_rows, failed = future.result()
+        __write_batch__(pool, queries, break_rows, today_string)
+        batch_users, batch_habits = pending[future]
+        stats['users'] += batch_users
+        stats['habits'] += batch_habits
+        stats['failed'] += failed
+        stats['seconds'] = time.perf_counter() - start
+        stats['habits_per_second'] = stats['habits'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        if progress is not None:
+            progress(dict(stats))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for batch in __iter_user_batches__(__iter_stale_rows__(pool, today_string), batch_size):
+            break_histories = None
+            if table_breaks:
+                break_histories = __load_break_histories__(pool, [row[0] for row in batch])
+            future = executor.submit(__evaluate_batch__, batch, break_histories, now)
+            pending[future] = (len({row[1] for row in batch}), len(batch))
+            if len(pending) >= 2 * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for done_future in done:
+                    write_result(done_future)
+                    del pending[done_future]
+        for done_future in list(pending):
+            write_result(done_future)
+            del pending[done_future]
+
+    stats['seconds'] = time.perf_counter() - start
+    logging.info('rollover of %s habits of %s users in %.1fs', stats['habits'], stats['users'], stats['seconds'])
+    return stats
@@ -0,0 +1,46 @@
+"""
+nightly rollover, calculates the breaks of all habits that were not evaluated today (see habits/rollover_handler.py)
+without waiting for the users to load their habits.
+
+python ./habits_rollover.py --workers 4 --batch-size 2000
+"""
+import argparse
+import time
+from datetime import datetime
+from helper import log_handler
+from habits import rollover_handler
+
+log_handler.setup_logging()
+
+
+def __print_progress__(stats):
+    """
+    prints the statistics of the rollover so far, at most once per second
+    """
+    now = time.perf_counter()
+    if now - __print_progress__.last_print >= 1:
+        __print_progress__.last_print = now
+        print('{habits} habits of {users} users, {habits_per_second:.0f} habits/s, {seconds:.1f}s'.format(**stats))
+
+
+__print_progress__.last_print = 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='calculates the breaks of all habits not evaluated today')
+    parser.add_argument('--database', default=None,
+                        help='path to the habits database (default DBSection -> name from habits.properties)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default number of cpus)')
+    parser.add_argument('--batch-size', type=int, default=2000, help='habits per batch (default 2000)')
+    parser.add_argument('--date', default=None, help='evaluate for this day instead of today, format yyyy-mm-dd')
+    arguments = parser.parse_args()
+
+    now = datetime.strptime(arguments.date, '%Y-%m-%d') if arguments.date is not None else None
+    stats = rollover_handler.rollover(arguments.database, arguments.workers, arguments.batch_size, now,
+                                      __print_progress__)
+    print('finished: {habits} habits of {users} users, {failed} failed, {habits_per_second:.0f} habits/s, '
+          '{seconds:.1f}s'.format(**stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,12 @@ creates a dialog and works as main
 
 import logging
 import random
-from helper import const_handler
+from helper import const_handler, log_handler
 from users import user_handler
 from habits import habits_handler
 
 const = const_handler.ConstHandler()
-logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
-                    filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(), force=True)
+log_handler.setup_logging()
 
 user_handler_obj = user_handler.UserHandler()
 habits_handler_obj = habits_handler.Habits()
@@ -812,7 +811,7 @@ def __dialog_display_filtered_habits__():
         print('current streak: {}'.format(habit_to_print.get_streak()))
         print('longest streak: {}'.format(habit_to_print.get_longest_streak()))
 
-    if len(habits_handler_obj.get_habits()) == 0:
+    if habits_handler_obj.count_habits() == 0:
         print('you dont have any habits that could be shown')
     else:
         print('please select:')
@@ -835,9 +834,7 @@ def __dialog_display_filtered_habits__():
                 case '1':
                     print('all habits:')
                     print()
-                    found_habits = habits_handler_obj.get_habits()
-
-                    for found_habit in found_habits:
+                    for found_habit in habits_handler_obj.iter_habits():
                         print_habit(found_habit)
                         print()
 
@@ -866,7 +863,7 @@ def __dialog_display_filtered_habits__():
                 case '4':
                     print('top 5 habits by streak:')
                     print()
-                    found_habits = habits_handler_obj.get_habits_by_streak()
+                    found_habits = habits_handler_obj.get_habits_by_streak(limit=5)
                     max_index = 5 if len(found_habits) > 5 else len(found_habits)
 
                     for i in range(max_index):
@@ -875,7 +872,7 @@ def __dialog_display_filtered_habits__():
                 case '5':
                     print('top 5 habits by longest streak:')
                     print()
-                    found_habits = habits_handler_obj.get_habits_by_longest_streak()
+                    found_habits = habits_handler_obj.get_habits_by_longest_streak(limit=5)
                     max_index = 5 if len(found_habits) > 5 else len(found_habits)
 
                     for i in range(max_index):
@@ -884,7 +881,7 @@ def __dialog_display_filtered_habits__():
                 case '6':
                     print('top 5 habits breaks last month:')
                     print()
-                    found_habits_results = habits_handler_obj.get_habits_by_last_month_breaks()
+                    found_habits_results = habits_handler_obj.get_habits_by_last_month_breaks(limit=5)
                     found_habits = found_habits_results.get('habits')
                     corresponding_breaks = found_habits_results.get('breaks')
                     max_index = 5 if len(found_habits) > 5 else len(found_habits)
@@ -896,7 +893,7 @@ def __dialog_display_filtered_habits__():
                 case '7':
                     print('top 5 habits breaks:')
                     print()
-                    found_habits_results = habits_handler_obj.get_habits_by_break()
+                    found_habits_results = habits_handler_obj.get_habits_by_break(limit=5)
                     found_habits = found_habits_results.get('habits')
                     corresponding_breaks = found_habits_results.get('breaks')
                     max_index = 5 if len(found_habits) > 5 else len(found_habits)
@@ -908,7 +905,7 @@ def __dialog_display_filtered_habits__():
                 case '8':
                     print('top 5 oldest habits:')
                     print()
-                    found_habits = habits_handler_obj.get_habits_by_created()
+                    found_habits = habits_handler_obj.get_habits_by_created(limit=5)
                     max_index = 5 if len(found_habits) > 5 else len(found_habits)
 
                     for i in range(max_index):
@@ -7,7 +7,7 @@ import os
 import json
 from tabulate import tabulate
 from datetime import datetime, timedelta
-from helper import const_handler
+from helper import const_handler, migration_handler
 
 Const = const_handler.ConstHandler()
 
@@ -21,15 +21,6 @@ def main():
         file_path_users_db = './users/user.db'
         file_path_habits_db = Const.get_habits_db_name() + '.db'
 
-        sql_create_user_db = '''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, deactivated BIT DEFAULT 0)'''
-        sql_create_habit_db = '''CREATE TABLE IF NOT EXISTS habits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, 
-                    title TEXT NOT NULL, description TEXT, 
-                    periodicity TEXT NOT NULL, created_at TEXT NOT NULL,
-                    deactivated BIT DEFAULT 0, last_break TEXT, last_checked TEXT,
-                    streak INTEGER DEFAULT 0, longest_streak INTEGER DEFAULT 0, break_history TEXT)'''
-
         sql_add_test_users_query = '''INSERT INTO users (name, deactivated) VALUES (?, ?)'''
         sql_add_test_users_values = (('main test user', 0), ('alternative test user', 0))
 
@@ -76,9 +67,8 @@ def main():
             os.remove(file_path_users_db)
             print('deleted {}'.format(file_path_users_db))
         connection = sqlite3.connect(file_path_users_db)
+        migration_handler.migrate_users_db(connection)
         cursor = connection.cursor()
-        cursor.execute(sql_create_user_db)
-        connection.commit()
         cursor.executemany(sql_add_test_users_query, sql_add_test_users_values)
         connection.commit()
         created_users = cursor.execute("select * from users").fetchall()
@@ -94,9 +84,8 @@ def main():
             os.remove(file_path_habits_db)
             print('deleted {}'.format(file_path_habits_db))
         connection = sqlite3.connect(file_path_habits_db)
+        migration_handler.migrate_habits_db(connection)
         cursor = connection.cursor()
-        cursor.execute(sql_create_habit_db)
-        connection.commit()
         cursor.executemany(sql_add_test_habits_query, sql_add_test_habits_values)
         connection.commit()
         created_habits = cursor.execute("select * from habits").fetchall()
@@ -105,7 +94,7 @@ def main():
         print('created habits for testing:')
         print(tabulate(created_habits, headers=['id', 'user-id', 'title', 'description', 'periodicity',
                                                 'created date', 'deactivated', 'last break', 'last checked',
-                                                'steak', 'longest streak', 'break history']))
+                                                'steak', 'longest streak', 'break history', 'evaluated through']))
         connection.close()
 
 main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+provides the AsyncRunner object to call the blocking handlers from asyncio without blocking the event loop
+
+provided functions:
+get_async_runner()
+"""
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from helper import const_handler
+
+const = const_handler.ConstHandler()
+
+__runner__ = None
+__runner_lock__ = threading.Lock()
+
+
+class AsyncRunner:
+    """
+    runs blocking functions on a dedicated thread pool. at most max_pending calls are handed to the pool at the same
+    time, further calls wait in the event loop until one of them is finished (backpressure).
+
+    provided functions:
+    run()
+    shutdown()
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        """
+        init function, the threads are started when they are needed
+
+        :param max_workers: integer - number of threads (optional, default AsyncSection -> maxWorkers)
+        :param max_pending: integer - number of calls handed to the threads at the same time
+                            (optional, default AsyncSection -> maxPending)
+
+        :raise: ValueError if max_workers or max_pending is smaller than 1
+        """
+        max_workers = max_workers if max_workers is not None else const.get_async_max_workers()
+        max_pending = max_pending if max_pending is not None else const.get_async_max_pending()
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError('max_workers and max_pending must be at least 1, not: {}, {}'.format(max_workers,
+                                                                                                 max_pending))
+        self.__executor__ = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='habits_async')
+        self.__max_pending__ = max_pending
+        # one semaphore per event loop, an asyncio.Semaphore must not be shared between loops
+        self.__semaphores__ = weakref.WeakKeyDictionary()
+
+    def __get_semaphore__(self):
+        """
+        returns the semaphore of the running event loop
+
+        :return: asyncio.Semaphore
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.__semaphores__.get(loop)
+        if semaphore is None:
+            semaphore = self.__semaphores__.setdefault(loop, asyncio.Semaphore(self.__max_pending__))
+        return semaphore
+
+    async def run(self, function, *args, **kwargs):
+        """
+        calls the function on the thread pool and waits for its result without blocking the event loop
+
+        :param function: blocking function
+        :param args: parameters of the function
+        :param kwargs: keyword parameters of the function
+
+        :return: result of the function, its exceptions are raised here
+        """
+        async with self.__get_semaphore__():
+            return await asyncio.get_running_loop().run_in_executor(
+                self.__executor__, functools.partial(function, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        """
+        stops the threads
+
+        :param wait: boolean - wait for the running calls (default true)
+        """
+        self.__executor__.shutdown(wait=wait)
+
+
+def get_async_runner():
+    """
+    returns the runner shared by all async handlers, it is created on the first call
+
+    :return: AsyncRunner
+    """
+    global __runner__
+    with __runner_lock__:
+        if __runner__ is None:
+            __runner__ = AsyncRunner()
+        return __runner__
@@ -3,18 +3,36 @@ provides the ConstHandler object
 """
 import logging
 import configparser
+import threading
 
 
 class ConstHandler:
     """
     Provides constants to the project which can be overwritten in the habits.properties file (see README.md).
+    There is only one instance per process: ConstHandler() reads habits.properties on the first call and returns
+    the same, immutable instance afterwards. Call reload() to read habits.properties again.
 
     logging is disabled here by default, enable in properties file (see README.md)
 
     given functions:
+    reload()
     get_periodicity_daily()
     get_periodicity_weekly()
     get_habits_db_name()
+    get_db_pool_size()
+    get_db_cached_statements()
+    get_db_journal_mode()
+    get_db_synchronous()
+    get_db_mmap_size()
+    get_db_cache_size()
+    get_db_busy_timeout()
+    get_db_break_storage()
+    get_db_query_mode()
+    get_store_max_sessions()
+    get_store_max_memory()
+    get_store_max_workers()
+    get_async_max_workers()
+    get_async_max_pending()
     get_logger_log_level()
     get_logger_log_format()
     get_logger_log_filename()
@@ -22,13 +40,29 @@ class ConstHandler:
     get_user_test_id_a()
     get_user_test_id_b()
     """
-    __config__ = configparser.RawConfigParser()
-    __config__.read('habits.properties')
+    __instance__ = None
+    __instance_lock__ = threading.Lock()
+    __loaded__ = False
+    __config__ = None
 
     # act as well as the storage for the variable as well as its default value
     __periodicity_daily__ = 0
     __periodicity_weekly__ = 1
     __habits_db_name__ = 'habits'
+    __db_pool_size__ = 5
+    __db_cached_statements__ = 128
+    __db_journal_mode__ = 'WAL'
+    __db_synchronous__ = 'NORMAL'
+    __db_mmap_size__ = 67108864
+    __db_cache_size__ = -16000
+    __db_busy_timeout__ = 5000
+    __db_break_storage__ = 'JSON'
+    __db_query_mode__ = 'MEMORY'
+    __store_max_sessions__ = 1000
+    __store_max_memory__ = 134217728
+    __store_max_workers__ = 4
+    __async_max_workers__ = 4
+    __async_max_pending__ = 16
     __logger_log_level__ = logging.WARNING
     __logger_log_format__ = '%(levelname)s: %(asctime)s: %(message)s'
     __logger_log_filename__ = None
@@ -64,15 +98,50 @@ class ConstHandler:
                         return logging_log_level
                 return config_data
             except configparser.NoOptionError:
-                logging.info(
-                    'could not find "{option}" in section "{section}", default value "{default_value}" will be used.'.format(
-                        option=option, section=section, default_value=default_value))
+                logging.info('could not find "%s" in section "%s", default value "%s" will be used.',
+                             option, section, default_value)
         else:
-            logging.info(
-                'habits.properties or section "{section}" could not be found, default value "{default_value}" for option "{option}" will be used'.format(
-                    section=section, default_value=default_value, option=option))
+            logging.info('habits.properties or section "%s" could not be found, default value "%s" for option "%s" will be used',
+                         section, default_value, option)
         return default_value
 
+    def __get_config_int__(self, section, option, default_value):
+        """
+        private function to read an integer from the config file, uses the default value if it is not a valid integer.
+
+        :param section: section name in config file
+        :param option: option name in config file
+        :param default_value: default value if config is not set or invalid
+
+        :return: integer from config file or the given default value
+        """
+        config_data = self.__get_config_data__(section, option, default_value)
+        try:
+            return int(config_data)
+        except (TypeError, ValueError):
+            logging.info('"%s" in section "%s" is not an integer, default value "%s" will be used.',
+                         option, section, default_value)
+            return default_value
+
+    def __get_config_choice__(self, section, option, choices, default_value):
+        """
+        private function to read an option from the config file that has to be one of the given choices
+        (case-insensitive), uses the default value otherwise.
+
+        :param section: section name in config file
+        :param option: option name in config file
+        :param choices: tuple of valid upper-case values
+        :param default_value: default value if config is not set or invalid
+
+        :return: upper-case value from config file or the given default value
+        """
+        config_data = str(self.__get_config_data__(section, option, default_value)).upper()
+        if config_data not in choices:
+            logging.info('"%s" in section "%s" must be one of %s, default value "%s" will be used.',
+                         option, section, choices, default_value)
+            return default_value
+        return config_data
+
     def __get_logging_file_config_data__(self):
         """
         private function to set __logger_log_filename__ and __logger_log_filemode__ because they validate each other
@@ -102,25 +171,100 @@ class ConstHandler:
             logging.info(
                 'habits.properties or section "Logging" could not be found, file-export for logs is disabled by default.')
 
+    def __new__(cls):
+        """
+        returns the shared instance, habits.properties is read when it is created
+        """
+        if cls.__instance__ is None:
+            with cls.__instance_lock__:
+                if cls.__instance__ is None:
+                    instance = super().__new__(cls)
+                    instance.__load__()
+                    cls.__instance__ = instance
+        return cls.__instance__
+
     def __init__(self):
         """
-        init function, sets log-level of const_handler from habits.properties file, default is Warning
+        init function, nothing to do here because the values are only loaded once (see __load__())
+        """
+
+    def __setattr__(self, name, value):
+        """
+        prevents changes of the values after habits.properties was loaded
+
+        :raise: AttributeError if the values are already loaded
+        """
+        if self.__loaded__:
+            raise AttributeError('ConstHandler is immutable, call reload() to read habits.properties again')
+        object.__setattr__(self, name, value)
+
+    def __load__(self):
+        """
+        private function, sets log-level of const_handler from habits.properties file, default is Warning
         sets all values from habits.properties file or uses its default values
         """
+        defaults = type(self)
+        self.__config__ = configparser.RawConfigParser()
+        self.__config__.read('habits.properties')
+
         if self.__config__.has_section('Const'):
             const_log_display = self.__config__.get('Const', 'displayLog')
             if const_log_display is not None and (
                     'true' in const_log_display.lower() or 'yes' in const_log_display.lower()):
-                logging.basicConfig(level=logging.INFO, force=True)
+                # only takes effect before logging is configured (see log_handler.setup_logging())
+                logging.basicConfig(level=logging.INFO)
 
-        self.__periodicity_daily__ = self.__get_config_data__('Periodicity', 'daily', self.__periodicity_daily__)
-        self.__periodicity_weekly__ = self.__get_config_data__('Periodicity', 'weekly', self.__periodicity_weekly__)
-        self.__habits_db_name__ = self.__get_config_data__('DBSection', 'name', self.__habits_db_name__)
-        self.__logger_log_level__ = self.__get_config_data__('Logging', 'level', self.__logger_log_level__)
-        self.__logger_log_format__ = self.__get_config_data__('Logging', 'format', self.__logger_log_format__)
+        self.__periodicity_daily__ = self.__get_config_data__('Periodicity', 'daily', defaults.__periodicity_daily__)
+        self.__periodicity_weekly__ = self.__get_config_data__('Periodicity', 'weekly',
+                                                               defaults.__periodicity_weekly__)
+        self.__habits_db_name__ = self.__get_config_data__('DBSection', 'name', defaults.__habits_db_name__)
+        self.__db_pool_size__ = self.__get_config_int__('DBSection', 'poolSize', defaults.__db_pool_size__)
+        self.__db_cached_statements__ = self.__get_config_int__('DBSection', 'cachedStatements',
+                                                                defaults.__db_cached_statements__)
+        self.__db_journal_mode__ = self.__get_config_choice__(
+            'DBSection', 'journalMode', ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+            defaults.__db_journal_mode__)
+        self.__db_synchronous__ = self.__get_config_choice__(
+            'DBSection', 'synchronous', ('OFF', 'NORMAL', 'FULL', 'EXTRA'), defaults.__db_synchronous__)
+        self.__db_mmap_size__ = self.__get_config_int__('DBSection', 'mmapSize', defaults.__db_mmap_size__)
+        self.__db_cache_size__ = self.__get_config_int__('DBSection', 'cacheSize', defaults.__db_cache_size__)
+        self.__db_busy_timeout__ = self.__get_config_int__('DBSection', 'busyTimeout', defaults.__db_busy_timeout__)
+        self.__db_break_storage__ = self.__get_config_choice__('DBSection', 'breakStorage', ('JSON', 'TABLE'),
+                                                               defaults.__db_break_storage__)
+        self.__db_query_mode__ = self.__get_config_choice__('DBSection', 'queryMode', ('MEMORY', 'SQL'),
+                                                            defaults.__db_query_mode__)
+        self.__store_max_sessions__ = self.__get_config_int__('StoreSection', 'maxSessions',
+                                                              defaults.__store_max_sessions__)
+        self.__store_max_memory__ = self.__get_config_int__('StoreSection', 'maxMemory', defaults.__store_max_memory__)
+        self.__store_max_workers__ = self.__get_config_int__('StoreSection', 'maxWorkers',
+                                                             defaults.__store_max_workers__)
+        self.__async_max_workers__ = self.__get_config_int__('AsyncSection', 'maxWorkers',
+                                                             defaults.__async_max_workers__)
+        self.__async_max_pending__ = self.__get_config_int__('AsyncSection', 'maxPending',
+                                                             defaults.__async_max_pending__)
+        self.__logger_log_level__ = self.__get_config_data__('Logging', 'level', defaults.__logger_log_level__)
+        self.__logger_log_format__ = self.__get_config_data__('Logging', 'format', defaults.__logger_log_format__)
+        self.__logger_log_filename__ = defaults.__logger_log_filename__
+        self.__logger_log_filemode__ = defaults.__logger_log_filemode__
         self.__get_logging_file_config_data__()
-        self.__user_test_id_a__ = self.__get_config_data__('TestUsers', 'userA', self.__user_test_id_a__)
-        self.__user_test_id_b__ = self.__get_config_data__('TestUsers', 'userB', self.__user_test_id_b__)
+        self.__user_test_id_a__ = self.__get_config_data__('TestUsers', 'userA', defaults.__user_test_id_a__)
+        self.__user_test_id_b__ = self.__get_config_data__('TestUsers', 'userB', defaults.__user_test_id_b__)
+
+        object.__setattr__(self, '__loaded__', True)
+
+    def reload(self):
+        """
+        reads habits.properties again and replaces all values of the shared instance at once, so other threads either
+        get only old or only new values.
+        logging is not reconfigured automatically, call log_handler.setup_logging(force=True) for that.
+        pool size, cached statements and the PRAGMA profile only apply to pools created afterward, the pools that
+        already exist (see db_handler.get_pool()) keep the values they were created with.
+        """
+        with self.__instance_lock__:
+            # the values are loaded into a new instance and its attributes replace the attributes of this one
+            loaded = super().__new__(type(self))
+            loaded.__load__()
+            object.__setattr__(self, '__dict__', loaded.__dict__)
 
     def get_periodicity_daily(self):
         """
@@ -140,6 +284,90 @@ class ConstHandler:
         """
         return self.__habits_db_name__
 
+    def get_db_pool_size(self):
+        """
+        :return: DBSection -> poolSize from habits.properties or 5
+        """
+        return self.__db_pool_size__
+
+    def get_db_cached_statements(self):
+        """
+        :return: DBSection -> cachedStatements from habits.properties or 128
+        """
+        return self.__db_cached_statements__
+
+    def get_db_journal_mode(self):
+        """
+        :return: DBSection -> journalMode from habits.properties or 'WAL'
+        """
+        return self.__db_journal_mode__
+
+    def get_db_synchronous(self):
+        """
+        :return: DBSection -> synchronous from habits.properties or 'NORMAL'
+        """
+        return self.__db_synchronous__
+
+    def get_db_mmap_size(self):
+        """
+        :return: DBSection -> mmapSize in bytes from habits.properties or 67108864 (64 MiB)
+        """
+        return self.__db_mmap_size__
+
+    def get_db_cache_size(self):
+        """
+        :return: DBSection -> cacheSize from habits.properties or -16000 (pages if positive, KiB if negative)
+        """
+        return self.__db_cache_size__
+
+    def get_db_busy_timeout(self):
+        """
+        :return: DBSection -> busyTimeout in milliseconds from habits.properties or 5000
+        """
+        return self.__db_busy_timeout__
+
+    def get_db_break_storage(self):
+        """
+        :return: DBSection -> breakStorage from habits.properties or 'JSON' ('JSON' or 'TABLE')
+        """
+        return self.__db_break_storage__
+
+    def get_db_query_mode(self):
+        """
+        :return: DBSection -> queryMode from habits.properties or 'MEMORY' ('MEMORY' or 'SQL')
+        """
+        return self.__db_query_mode__
+
+    def get_store_max_sessions(self):
+        """
+        :return: StoreSection -> maxSessions from habits.properties or 1000
+        """
+        return self.__store_max_sessions__
+
+    def get_store_max_memory(self):
+        """
+        :return: StoreSection -> maxMemory in bytes from habits.properties or 134217728 (128 MiB)
+        """
+        return self.__store_max_memory__
+
+    def get_store_max_workers(self):
+        """
+        :return: StoreSection -> maxWorkers from habits.properties or 4
+        """
+        return self.__store_max_workers__
+
+    def get_async_max_workers(self):
+        """
+        :return: AsyncSection -> maxWorkers from habits.properties or 4
+        """
+        return self.__async_max_workers__
+
+    def get_async_max_pending(self):
+        """
+        :return: AsyncSection -> maxPending from habits.properties or 16
+        """
+        return self.__async_max_pending__
+
     def get_logger_log_level(self):
         """
         :return: Logging -> level from habits.properties or logging.WARNING
@@ -0,0 +1,235 @@
+"""
+provides the ConnectionPool object for long-lived sqlite connections, shared per database file.
+
+provided functions:
+get_pragmas()
+get_pool()
+close_all_pools()
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from helper import const_handler
+
+const = const_handler.ConstHandler()
+
+__pools__ = {}
+__pools_lock__ = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Pool of long-lived sqlite connections for one database file.
+    A connection is bound to the thread using it until its outermost scope ends, afterwards it is kept idle for the
+    next caller (up to pool_size connections), so connect/close only happens when the pool is exhausted.
+    Connections run in autocommit mode, use transaction() to group statements.
+
+    provided functions:
+    get_database()
+    connection()
+    transaction()
+    execute()
+    executemany()
+    close()
+    """
+
+    def __init__(self, database, pool_size, cached_statements, pragmas=()):
+        """
+        init function, no connection is opened before it is needed
+
+        :param database: path to the database file
+        :param pool_size: integer - maximum number of idle connections kept open
+        :param cached_statements: integer - number of prepared statements cached per connection
+        :param pragmas: tuple of (name, value) applied to every new connection, values must be validated already
+        """
+        self.__database__ = database
+        self.__pool_size__ = max(int(pool_size), 0)
+        self.__cached_statements__ = max(int(cached_statements), 0)
+        self.__pragmas__ = tuple(pragmas)
+        self.__idle__ = []
+        self.__lock__ = threading.Lock()
+        self.__local__ = threading.local()
+        self.__closed__ = False
+
+    def __create_connection__(self):
+        """
+        private function to open a new connection, check_same_thread is disabled because idle connections are
+        handed over to other threads (but never used by two threads at the same time)
+
+        :return: sqlite3 connection
+        """
+        logging.debug('open new connection to %s', self.__database__)
+        connection = sqlite3.connect(self.__database__, isolation_level=None, check_same_thread=False,
+                                     cached_statements=self.__cached_statements__)
+        for name, value in self.__pragmas__:
+            # PRAGMA does not take parameters, the values come from ConstHandler where they are validated
+            connection.execute('PRAGMA {name} = {value}'.format(name=name, value=value))
+        return connection
+
+    def __acquire__(self):
+        """
+        private function to get an idle connection or open a new one
+
+        :return: sqlite3 connection
+        """
+        with self.__lock__:
+            if self.__idle__:
+                return self.__idle__.pop()
+        return self.__create_connection__()
+
+    def __release__(self, connection):
+        """
+        private function to put a connection back into the pool or close it if the pool is full
+
+        :param connection: sqlite3 connection
+        """
+        if connection.in_transaction:
+            # a scope must never leave an open transaction behind for the next caller
+            connection.rollback()
+        with self.__lock__:
+            if not self.__closed__ and len(self.__idle__) < self.__pool_size__:
+                self.__idle__.append(connection)
+                return
+        connection.close()
+
+    def get_database(self):
+        """
+        :return: path to the database file
+        """
+        return self.__database__
+
+    @contextmanager
+    def connection(self):
+        """
+        provides the connection of the current thread, nested scopes in the same thread share one connection
+
+        :return: context manager yielding a sqlite3 connection
+        """
+        held_connection = getattr(self.__local__, 'connection', None)
+        if held_connection is not None:
+            yield held_connection
+            return
+
+        connection = self.__acquire__()
+        self.__local__.connection = connection
+        try:
+            yield connection
+        finally:
+            self.__local__.connection = None
+            self.__release__(connection)
+
+    @contextmanager
+    def transaction(self):
+        """
+        explicit transaction scope, commits when the scope ends and rolls back on any exception.
+        nested transaction scopes join the outer transaction.
+        the write lock is taken at the start, so concurrent writers wait for busy_timeout instead of failing when
+        they would upgrade a read lock.
+
+        :return: context manager yielding a sqlite3 connection
+        """
+        with self.connection() as connection:
+            if connection.in_transaction:
+                yield connection
+                return
+
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def execute(self, query, params=(), fetch=False):
+        """
+        executes a single statement, autocommitted unless called inside of transaction()
+
+        :param query: sql query as string
+        :param params: tuple of parameters to pass to sql query
+        :param fetch: boolean flag to fetch results from sql query
+
+        :return: list of results if fetch is true, the new row-id for INSERT queries, else True
+        """
+        with self.connection() as connection:
+            cursor = connection.execute(query, params)
+            if fetch:
+                return cursor.fetchall()
+            elif query.lstrip().startswith('INSERT'):
+                return cursor.lastrowid
+            return True
+
+    def executemany(self, query, params_list):
+        """
+        executes one statement for every parameter tuple in a single transaction
+
+        :param query: sql query as string
+        :param params_list: iterable of parameter tuples
+
+        :return: number of changed rows
+        """
+        with self.transaction() as connection:
+            return connection.executemany(query, params_list).rowcount
+
+    def close(self):
+        """
+        closes all idle connections, connections in use are closed when their scope ends
+        """
+        with self.__lock__:
+            self.__closed__ = True
+            idle_connections = self.__idle__
+            self.__idle__ = []
+        for connection in idle_connections:
+            connection.close()
+
+
+def get_pragmas():
+    """
+    returns the PRAGMA profile from habits.properties (see README.md), busy_timeout is applied first so setting the
+    journal_mode waits for other connections
+
+    :return: tuple of (name, value)
+    """
+    return (
+        ('busy_timeout', int(const.get_db_busy_timeout())),
+        ('journal_mode', const.get_db_journal_mode()),
+        ('synchronous', const.get_db_synchronous()),
+        ('mmap_size', int(const.get_db_mmap_size())),
+        ('cache_size', int(const.get_db_cache_size())),
+    )
+
+
+def get_pool(database):
+    """
+    returns the shared pool for the given database file, creates it on first use.
+    pool size, statement cache and PRAGMA profile are read from habits.properties (see README.md)
+
+    :param database: path to the database file
+
+    :return: ConnectionPool
+    """
+    key = os.path.abspath(database)
+    with __pools_lock__:
+        pool = __pools__.get(key)
+        if pool is None:
+            pool = ConnectionPool(database, const.get_db_pool_size(), const.get_db_cached_statements(),
+                                  get_pragmas())
+            __pools__[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """
+    closes all shared pools, called automatically when the interpreter exits
+    """
+    with __pools_lock__:
+        pools = list(__pools__.values())
+        __pools__.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
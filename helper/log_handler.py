@@ -0,0 +1,33 @@
+"""
+provides the logging bootstrap of the project, configures the root logger once from habits.properties
+
+provided functions:
+setup_logging()
+"""
+import logging
+import threading
+from helper import const_handler
+
+__configured__ = False
+__configure_lock__ = threading.Lock()
+
+
+def setup_logging(force=False):
+    """
+    configures the root logger with level, format and file-export from habits.properties (see README.md).
+    only the first call configures logging, following calls do nothing unless force is set, so the log-file is only
+    opened once.
+
+    :param force: boolean - configure logging again, e.g. after ConstHandler().reload() (default false)
+    """
+    global __configured__
+    with __configure_lock__:
+        if __configured__ and not force:
+            return
+
+        const = const_handler.ConstHandler()
+        # force replaces the temporary handler of ConstHandler (Const -> displayLog) or a previous configuration
+        logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
+                            filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(),
+                            force=True)
+        __configured__ = True
@@ -0,0 +1,267 @@
+"""
+provides the versioned schema of habits.db and user.db.
+every migration is applied once, the number of applied migrations is stored in PRAGMA user_version.
+new tables, columns or indexes are added by appending a function to the list of the database.
+
+provided functions:
+migrate()
+migrate_habits_db()
+migrate_users_db()
+convert_break_storage()
+prepare_habits_db()
+prepare_users_db()
+"""
+import json
+import logging
+import os
+import threading
+
+# (database kind, absolute path, break storage) of the databases prepared by this process
+__prepared__ = set()
+__prepared_lock__ = threading.Lock()
+
+
+def __create_habits_table__(connection):
+    """
+    version 1: habits table, IF NOT EXISTS because databases before versioning already have it
+    """
+    connection.execute('''CREATE TABLE IF NOT EXISTS habits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                    title TEXT NOT NULL, description TEXT,
+                    periodicity TEXT NOT NULL, created_at TEXT NOT NULL,
+                    deactivated BIT DEFAULT 0, last_break TEXT, last_checked TEXT,
+                    streak INTEGER DEFAULT 0, longest_streak INTEGER DEFAULT 0, break_history TEXT)''')
+
+
+def __add_habits_evaluated_through__(connection):
+    """
+    version 2: date until which the breaks are calculated (see Habit.get_evaluated_through())
+    """
+    columns = [column[1] for column in connection.execute('PRAGMA table_info(habits)').fetchall()]
+    if 'evaluated_through' not in columns:
+        connection.execute('ALTER TABLE habits ADD COLUMN evaluated_through TEXT')
+
+
+def __add_habits_active_user_index__(connection):
+    """
+    version 3: partial index for loading the active habits of a user
+    """
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_id
+                          ON habits (user_id) WHERE deactivated = 0''')
+
+
+def __add_habit_breaks_table__(connection):
+    """
+    version 4: normalized storage of the break history (see DBSection -> breakStorage in README.md).
+    the primary key covers all lookups by habit, the second index covers the breaks of one month over all habits.
+    settings stores the storage mode the data is currently in.
+    """
+    connection.execute('''CREATE TABLE IF NOT EXISTS habit_breaks (
+                          habit_id INTEGER NOT NULL, year INTEGER NOT NULL, month INTEGER NOT NULL,
+                          count INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (habit_id, year, month)) WITHOUT ROWID''')
+    connection.execute('''CREATE INDEX IF NOT EXISTS habit_breaks_month
+                          ON habit_breaks (year, month, habit_id, count)''')
+    connection.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+    connection.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('break_storage', 'JSON')")
+
+
+def __add_habits_query_indexes__(connection):
+    """
+    version 5: partial indexes for the filtered and sorted queries of the sql query mode (see Habits)
+    """
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_periodicity
+                          ON habits (user_id, periodicity) WHERE deactivated = 0''')
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_streak
+                          ON habits (user_id, streak DESC) WHERE deactivated = 0''')
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_longest_streak
+                          ON habits (user_id, longest_streak DESC) WHERE deactivated = 0''')
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_created
+                          ON habits (user_id, created_at) WHERE deactivated = 0''')
+    connection.execute('''CREATE INDEX IF NOT EXISTS habits_active_user_evaluated_through
+                          ON habits (user_id, evaluated_through) WHERE deactivated = 0''')
+
+
+def __create_users_table__(connection):
+    """
+    version 1: users table, IF NOT EXISTS because databases before versioning already have it
+    """
+    connection.execute('''CREATE TABLE IF NOT EXISTS users (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, deactivated BIT DEFAULT 0)''')
+
+
+__habits_migrations__ = [
+    __create_habits_table__,
+    __add_habits_evaluated_through__,
+    __add_habits_active_user_index__,
+    __add_habit_breaks_table__,
+    __add_habits_query_indexes__,
+]
+
+__users_migrations__ = [
+    __create_users_table__,
+]
+
+
+def migrate(connection, migrations):
+    """
+    applies all migrations the database does not have yet, each one in its own transaction.
+    the version is read again after locking the database, so concurrent processes do not apply a migration twice.
+
+    :param connection: sqlite3 connection, must not be in a transaction
+    :param migrations: list of functions taking the connection
+
+    :return: integer, schema version of the database
+    """
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    while version < len(migrations):
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+            if version < len(migrations):
+                migrations[version](connection)
+                version += 1
+                # PRAGMA does not take parameters, version is always an integer
+                connection.execute('PRAGMA user_version = {}'.format(version))
+                logging.info('migrated database to version %s', version)
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+    return version
+
+
+def migrate_habits_db(connection):
+    """
+    brings the habits database to the latest version
+
+    :param connection: sqlite3 connection to the habits database
+
+    :return: integer, schema version of the database
+    """
+    return migrate(connection, __habits_migrations__)
+
+
+def migrate_users_db(connection):
+    """
+    brings the users database to the latest version
+
+    :param connection: sqlite3 connection to the users database
+
+    :return: integer, schema version of the database
+    """
+    return migrate(connection, __users_migrations__)
+
+
+def __break_history_to_rows__(habit_id, break_history):
+    """
+    converts the json break_history of a habit into rows of the habit_breaks table
+
+    :param habit_id: integer
+    :param break_history: json string {'yyyy': {'m': count}}
+
+    :return: list of tuples (habit_id, year, month, count)
+    """
+    try:
+        history = json.loads(break_history)
+    except ValueError:
+        history = None
+    # 'null', lists or numbers are valid json as well, they must not abort the conversion of all habits
+    if not isinstance(history, dict) or not all(isinstance(months, dict) for months in history.values()):
+        logging.error('could not parse break_history string to dictionary for habit-id: %s', habit_id)
+        return []
+    return [(habit_id, int(year), int(month), count)
+            for year, months in history.items() for month, count in months.items()]
+
+
+def convert_break_storage(connection, break_storage):
+    """
+    moves the break history of all habits to the given storage (see DBSection -> breakStorage in README.md)
+    in one transaction, nothing is done if the database already uses it.
+    'JSON' stores the history in habits.break_history, 'TABLE' stores one row per habit and month in habit_breaks.
+
+    :param connection: sqlite3 connection to the habits database, must not be in a transaction
+    :param break_storage: string - 'JSON' or 'TABLE'
+
+    :return: boolean, true if the break history was converted
+    """
+    # checked without locking first, so opening a database in the configured storage does not wait for writers
+    if connection.execute("SELECT value FROM settings WHERE key = 'break_storage'").fetchone()[0] == break_storage:
+        return False
+
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        current_storage = connection.execute(
+            "SELECT value FROM settings WHERE key = 'break_storage'").fetchone()[0]
+        if current_storage == break_storage:
+            connection.commit()
+            return False
+
+        if break_storage == 'TABLE':
+            rows = []
+            for habit_id, break_history in connection.execute(
+                    'SELECT id, break_history FROM habits WHERE break_history IS NOT NULL').fetchall():
+                rows.extend(__break_history_to_rows__(habit_id, break_history))
+            connection.executemany('''INSERT INTO habit_breaks (habit_id, year, month, count) VALUES (?, ?, ?, ?)
+                                      ON CONFLICT (habit_id, year, month) DO UPDATE SET count = excluded.count''',
+                                   rows)
+            connection.execute('UPDATE habits SET break_history = NULL')
+        else:
+            histories = {}
+            for habit_id, year, month, count in connection.execute(
+                    'SELECT habit_id, year, month, count FROM habit_breaks').fetchall():
+                histories.setdefault(habit_id, {}).setdefault(str(year), {})[str(month)] = count
+            connection.executemany('UPDATE habits SET break_history = ? WHERE id = ?',
+                                   [(json.dumps(history), habit_id) for habit_id, history in histories.items()])
+            connection.execute("UPDATE habits SET break_history = '{}' WHERE break_history IS NULL")
+            connection.execute('DELETE FROM habit_breaks')
+
+        connection.execute("UPDATE settings SET value = ? WHERE key = 'break_storage'", (break_storage,))
+        logging.info('converted break history from %s to %s', current_storage, break_storage)
+    except BaseException:
+        connection.rollback()
+        raise
+    connection.commit()
+    return True
+
+
+def __prepare__(pool, key, prepare_function):
+    """
+    private function, calls prepare_function with a connection of the pool once per key in this process
+
+    :param pool: ConnectionPool of the database
+    :param key: tuple identifying the database and its preparation
+    :param prepare_function: function taking the connection
+    """
+    # checked without the lock first, the handlers are created for every session
+    if key in __prepared__:
+        return
+    with __prepared_lock__:
+        if key in __prepared__:
+            return
+        with pool.connection() as connection:
+            prepare_function(connection)
+        __prepared__.add(key)
+
+
+def prepare_habits_db(pool, break_storage):
+    """
+    migrates the habits database and converts the break history to the given storage, only once per database file
+    and storage in this process. later calls do not query the database.
+
+    :param pool: ConnectionPool of the habits database
+    :param break_storage: string - 'JSON' or 'TABLE'
+    """
+    def prepare(connection):
+        migrate_habits_db(connection)
+        convert_break_storage(connection, break_storage)
+
+    __prepare__(pool, ('habits', os.path.abspath(pool.get_database()), break_storage), prepare)
+
+
+def prepare_users_db(pool):
+    """
+    migrates the users database, only once per database file in this process. later calls do not query the database.
+
+    :param pool: ConnectionPool of the users database
+    """
+    __prepare__(pool, ('users', os.path.abspath(pool.get_database())), migrate_users_db)
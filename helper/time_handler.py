@@ -1,7 +1,8 @@
 """
-provides helpful functions for date handling.
+provides helpful functions for date handling and the DateSnapshot, SystemClock and FrozenClock objects.
 
 provided functions:
+get_system_clock()
 get_start_of_day()
 get_start_of_week()
 is_same_date()
@@ -11,15 +12,27 @@ count_weeks_between_dates()
 count_days_till_today()
 count_weeks_till_today()
 get_last_month()
+count_periods_per_month()
+get_day_ordinal()
+get_week_ordinal()
+get_monday_ordinal()
+get_datetime_from_ordinal()
+count_periods_per_month_by_ordinal()
 parse_string_to_datetime()
+
+debug-logs are guarded by the log-level, because these functions are called multiple times for every habit
 """
+import functools
 import logging
-from datetime import datetime, timedelta
-from helper import const_handler
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from helper import log_handler
+
+log_handler.setup_logging()
 
-const = const_handler.ConstHandler()
-logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
-                    filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(), force=True)
+# number of parsed date-strings kept by parse_string_to_datetime()
+__parse_cache_size__ = 4096
 
 def get_start_of_day(date):
     """
@@ -30,7 +43,8 @@ def get_start_of_day(date):
     :return: datetime
     """
     adjusted_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
-    logging.debug("input date: {original}, adjusted_date: {changed}".format(original=date, changed=adjusted_date))
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug('input date: %s, adjusted_date: %s', date, adjusted_date)
     return adjusted_date
 
 def get_start_of_week(date):
@@ -42,7 +56,8 @@ def get_start_of_week(date):
     :return: datetime
     """
     adjusted_date = get_start_of_day(date - timedelta(days=date.weekday()))
-    logging.debug("input date: {original}, adjusted_date: {changed}".format(original=date, changed=adjusted_date))
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug('input date: %s, adjusted_date: %s', date, adjusted_date)
     return adjusted_date
 
 def is_same_date(date1, date2):
@@ -54,21 +69,21 @@ def is_same_date(date1, date2):
 
     :return:  boolean
     """
-    same_date = get_start_of_day(date1) == get_start_of_day(date2)
-    logging.debug(
-        "input date: {original1} and {original2}, is same date?: {same_date}".format(original1=date1, original2=date2,
-                                                                                   same_date=same_date))
+    same_date = date1.toordinal() == date2.toordinal()
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug('input date: %s and %s, is same date?: %s', date1, date2, same_date)
     return same_date
 
-def is_today(date):
+def is_today(date, now=None):
     """
     checks if date is today
 
     :param date: datetime
+    :param now: datetime of today (optional, default datetime.now())
 
     :return: boolean
     """
-    return is_same_date(date, datetime.now())
+    return is_same_date(date, now if now is not None else datetime.now())
 
 def count_days_between_dates(start_date, end_date):
     """
@@ -79,10 +94,9 @@ def count_days_between_dates(start_date, end_date):
 
     :return: integer, 0 or +
     """
-    date_difference = abs((get_start_of_day(end_date) - get_start_of_day(start_date)).days)
-    logging.debug("input date: {original1} and {original2}, days between: {difference}".format(original1=start_date,
-                                                                                             original2=end_date,
-                                                                                             difference=date_difference))
+    date_difference = abs(get_day_ordinal(end_date) - get_day_ordinal(start_date))
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug('input date: %s and %s, days between: %s', start_date, end_date, date_difference)
     return date_difference
 
 def count_weeks_between_dates(start_date, end_date):
@@ -94,35 +108,33 @@ def count_weeks_between_dates(start_date, end_date):
 
     :return: integer, 0 or +
     """
-    date_difference = count_days_between_dates(get_start_of_week(start_date), get_start_of_week(end_date))
-    date_difference_weeks = int(date_difference / 7) if date_difference != 0 else 0
-    logging.debug(
-        "input date: {original1} and {original2}, days between: {difference_day}, weeks between: {difference_weeks}".format(
-            original1=start_date,
-            original2=end_date,
-            difference_day=date_difference,
-            difference_weeks=date_difference_weeks))
+    date_difference_weeks = abs(get_week_ordinal(get_day_ordinal(end_date))
+                                - get_week_ordinal(get_day_ordinal(start_date)))
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug('input date: %s and %s, weeks between: %s', start_date, end_date, date_difference_weeks)
     return date_difference_weeks
 
-def count_days_till_today(date):
+def count_days_till_today(date, now=None):
     """
     counts the days till today
 
     :param date: datetime
+    :param now: datetime of today (optional, default datetime.now())
 
     :return: integer, 0 or +
     """
-    return count_days_between_dates(date, datetime.now())
+    return count_days_between_dates(date, now if now is not None else datetime.now())
 
-def count_weeks_till_today(date):
+def count_weeks_till_today(date, now=None):
     """
     counts the weeks till today
 
     :param date: datetime
+    :param now: datetime of today (optional, default datetime.now())
 
     :return: integer, 0 or +
     """
-    return count_weeks_between_dates(date, datetime.now())
+    return count_weeks_between_dates(date, now if now is not None else datetime.now())
 
 def get_last_month(date):
     """
@@ -137,19 +149,298 @@ def get_last_month(date):
     last_month = last_month.replace(day=1) # set to first day of the past month
     return last_month
 
-def parse_string_to_datetime(string_date):
+def count_periods_per_month(start_date, end_date, period_days=1):
     """
-    convert string date to datetime by format "yyyy-mm-dd hh:mm:ss.ffffff"
+    counts the periods starting at start_date every period_days days until end_date (excluding), grouped by the
+    month the period starts in. calculated per month instead of per period.
 
-    :param string_date:
+    :param start_date: datetime, start of the first period
+    :param end_date: datetime, periods starting on or after this date are not counted
+    :param period_days: integer, length of a period in days (1 for daily, 7 for weekly)
+
+    :return: dictionary {(year, month): count} in chronological order, only months with at least one period
+    """
+    return count_periods_per_month_by_ordinal(get_day_ordinal(start_date), get_day_ordinal(end_date), period_days)
+
+def get_day_ordinal(date):
+    """
+    maps a date to its day number (0001-01-01 is 1), the time is ignored
+
+    :param date: datetime
+
+    :return: integer
+    """
+    return date.toordinal()
+
+def get_week_ordinal(day_ordinal):
+    """
+    maps a day number to the number of its week (monday to sunday), 0001-01-01 is a monday
+
+    :param day_ordinal: integer, see get_day_ordinal()
+
+    :return: integer
+    """
+    return (day_ordinal - 1) // 7
+
+def get_monday_ordinal(week_ordinal):
+    """
+    returns the day number of the monday of the week
+
+    :param week_ordinal: integer, see get_week_ordinal()
+
+    :return: integer
+    """
+    return week_ordinal * 7 + 1
+
+def get_datetime_from_ordinal(day_ordinal):
+    """
+    returns the start of the day with the given day number
+
+    :param day_ordinal: integer, see get_day_ordinal()
 
     :return: datetime
     """
-    try:
-        return datetime.strptime(string_date, '%Y-%m-%d %H:%M:%S.%f')
-    except ValueError:
+    return datetime.fromordinal(day_ordinal)
+
+def count_periods_per_month_by_ordinal(first_day, end_day, period_days=1):
+    """
+    integer version of count_periods_per_month(), only the month boundaries are calculated as dates
+
+    :param first_day: integer, day number of the start of the first period
+    :param end_day: integer, periods starting on or after this day number are not counted
+    :param period_days: integer, length of a period in days (1 for daily, 7 for weekly)
+
+    :return: dictionary {(year, month): count} in chronological order, only months with at least one period
+    """
+    periods_per_month = {}
+    if first_day >= end_day:
+        return periods_per_month
+
+    first_date = date.fromordinal(first_day)
+    year, month = first_date.year, first_date.month
+    month_start = first_day
+    while month_start < end_day:
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        next_month_start = date(next_year, next_month, 1).toordinal()
+        month_end = min(next_month_start, end_day)
+
+        # number of periods starting before month_end minus the ones starting before month_start (ceiling division)
+        periods = -(-(month_end - first_day) // period_days) - -(-(month_start - first_day) // period_days)
+        if periods > 0:
+            periods_per_month[(year, month)] = periods
+        month_start = next_month_start
+        year, month = next_year, next_month
+
+    return periods_per_month
+
+@functools.lru_cache(maxsize=__parse_cache_size__)
+def __parse_stored_datetime__(string_date):
+    """
+    private function, parses the two stored formats "yyyy-mm-dd hh:mm:ss" and "yyyy-mm-dd hh:mm:ss.ffffff".
+    results are memoized because the same dates are parsed again on every reload.
+
+    :param string_date: string
+
+    :return: datetime or None if string_date has another format
+    """
+    length = len(string_date)
+    # fast path: check the layout first, fromisoformat alone would accept more formats than the stored ones
+    if string_date[10:11] == ' ' and (length == 19 or (
+            20 < length <= 26 and string_date[19] == '.' and string_date[20:].isdigit())):
         try:
-            return datetime.strptime(string_date, '%Y-%m-%d %H:%M:%S')
+            return datetime.fromisoformat(string_date)
         except ValueError:
-            logging.error('could not parse string_date: {}, return None'.format(string_date))
+            return None
+
+    # slow path for the remaining variants accepted by strptime (e.g. single-digit months)
+    for date_format in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(string_date, date_format)
+        except ValueError:
+            pass
     return None
+
+def parse_string_to_datetime(string_date):
+    """
+    convert string date to datetime by format "yyyy-mm-dd hh:mm:ss.ffffff" or "yyyy-mm-dd hh:mm:ss"
+
+    :param string_date:
+
+    :return: datetime or None if string_date could not be parsed
+    """
+    parsed_date = __parse_stored_datetime__(string_date)
+    if parsed_date is None:
+        logging.error('could not parse string_date: %s, expected "yyyy-mm-dd hh:mm:ss[.ffffff]", return None',
+                      string_date)
+    return parsed_date
+
+
+class DateSnapshot:
+    """
+    the dates needed by the habit calculations, derived once from one point in time
+
+    provided functions:
+    get_now()
+    get_today()
+    get_today_string()
+    get_yesterday()
+    get_monday()
+    get_last_month()
+    get_today_ordinal()
+    get_week_ordinal()
+    """
+    __slots__ = ('__now__', '__today__', '__today_string__', '__yesterday__', '__monday__', '__last_month__',
+                 '__today_ordinal__', '__week_ordinal__')
+
+    def __init__(self, now):
+        """
+        :param now: datetime
+        """
+        self.__now__ = now
+        self.__today__ = get_start_of_day(now)
+        self.__today_string__ = str(self.__today__.date())
+        self.__yesterday__ = self.__today__ - timedelta(days=1)
+        self.__monday__ = self.__today__ - timedelta(days=self.__today__.weekday())
+        self.__last_month__ = get_last_month(self.__today__)
+        self.__today_ordinal__ = get_day_ordinal(now)
+        self.__week_ordinal__ = get_week_ordinal(self.__today_ordinal__)
+
+    def get_now(self):
+        """
+        :return: datetime of the snapshot
+        """
+        return self.__now__
+
+    def get_today(self):
+        """
+        :return: datetime, start of today
+        """
+        return self.__today__
+
+    def get_today_string(self):
+        """
+        :return: today as string "yyyy-mm-dd"
+        """
+        return self.__today_string__
+
+    def get_yesterday(self):
+        """
+        :return: datetime, start of yesterday
+        """
+        return self.__yesterday__
+
+    def get_monday(self):
+        """
+        :return: datetime, start of the monday of this week
+        """
+        return self.__monday__
+
+    def get_last_month(self):
+        """
+        :return: datetime, 1st of the last month
+        """
+        return self.__last_month__
+
+    def get_today_ordinal(self):
+        """
+        :return: integer, day number of today (see get_day_ordinal())
+        """
+        return self.__today_ordinal__
+
+    def get_week_ordinal(self):
+        """
+        :return: integer, week number of this week (see get_week_ordinal())
+        """
+        return self.__week_ordinal__
+
+
+class SystemClock:
+    """
+    clock reading the system time. inside of batch() every snapshot() of the thread returns the same DateSnapshot,
+    so a reload or query over many habits calculates the dates once and does not straddle midnight.
+
+    provided functions:
+    now()
+    snapshot()
+    batch()
+    """
+    __slots__ = ('__local__',)
+
+    def __init__(self):
+        self.__local__ = threading.local()
+
+    def now(self):
+        """
+        :return: current datetime
+        """
+        return datetime.now()
+
+    def snapshot(self):
+        """
+        :return: DateSnapshot of the current batch of the thread or of now()
+        """
+        snapshot = getattr(self.__local__, 'snapshot', None)
+        return snapshot if snapshot is not None else DateSnapshot(self.now())
+
+    @contextmanager
+    def batch(self):
+        """
+        takes one snapshot for the scope, nested scopes in the same thread use the snapshot of the outer scope
+
+        :return: context manager yielding the DateSnapshot
+        """
+        snapshot = getattr(self.__local__, 'snapshot', None)
+        if snapshot is not None:
+            yield snapshot
+            return
+
+        self.__local__.snapshot = DateSnapshot(self.now())
+        try:
+            yield self.__local__.snapshot
+        finally:
+            self.__local__.snapshot = None
+
+
+class FrozenClock(SystemClock):
+    """
+    clock standing still at a given time for tests and simulations, only changed by set_now() and advance()
+
+    provided functions:
+    set_now()
+    advance()
+    """
+    __slots__ = ('__frozen_now__',)
+
+    def __init__(self, now):
+        """
+        :param now: datetime
+        """
+        super().__init__()
+        self.__frozen_now__ = now
+
+    def now(self):
+        """
+        :return: frozen datetime
+        """
+        return self.__frozen_now__
+
+    def set_now(self, now):
+        """
+        :param now: datetime
+        """
+        self.__frozen_now__ = now
+
+    def advance(self, delta):
+        """
+        :param delta: timedelta
+        """
+        self.__frozen_now__ += delta
+
+
+__system_clock__ = SystemClock()
+
+def get_system_clock():
+    """
+    :return: the SystemClock shared by all habits that are not given a clock
+    """
+    return __system_clock__
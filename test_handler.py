@@ -1,10 +1,15 @@
 """
 automated tests, use pytest on the project (see README.md)
 """
-from helper import const_handler, time_handler
-from habits import habits_handler, habit
+from helper import const_handler, time_handler, db_handler, migration_handler, async_handler
+from habits import habits_handler, habits_store, async_habits_handler, rollover_handler, habit
+from users import async_user_handler
 from datetime import datetime, timedelta
+import asyncio
 import configparser
+import random
+import json
+import threading
 import pytest
 
 __config__ = configparser.RawConfigParser()
@@ -106,6 +111,23 @@ def test_const_periodicity():
     assert __expected_daily_periodicity__ == Const.get_periodicity_daily() # is daily periodicity created correctly?
     assert __expected_weekly_periodicity__ == Const.get_periodicity_weekly() # is weekly periodicity created correctly?
 
+def test_const_singleton():
+    """
+    Test is there only one immutable ConstHandler and does reload() keep the values of habits.properties?
+    """
+    assert const_handler.ConstHandler() is Const
+    with pytest.raises(AttributeError):
+        Const.__periodicity_daily__ = 'changed'
+
+    # the values are replaced at once and stay immutable
+    values = Const.__dict__
+    Const.reload()
+    assert const_handler.ConstHandler() is Const and Const.__dict__ is not values
+    assert __expected_daily_periodicity__ == Const.get_periodicity_daily()
+    assert Const.get_db_pool_size() == values['__db_pool_size__']
+    with pytest.raises(AttributeError):
+        Const.__db_pool_size__ = 1
+
 def test_date_calculations():
     """
     Test functions from time_handler.py
@@ -142,8 +164,22 @@ def test_date_calculations():
     # are date-strings parsed correctly?
     parsed_date = time_handler.parse_string_to_datetime('2025-12-24 12:00:00.000000')
     assert parsed_date.year == 2025 and parsed_date.month == 12 and parsed_date.day == 24
+    # are date-strings without microseconds parsed correctly?
+    assert time_handler.parse_string_to_datetime('2025-12-24 12:00:00') == datetime(year=2025, month=12, day=24, hour=12)
+    # are other iso-formats rejected?
+    assert time_handler.parse_string_to_datetime('2025-12-24T12:00:00+01:00') is None
     # is the ValueError Exception called correctly while parsing an invalid date-string (return None and log error)?
     assert time_handler.parse_string_to_datetime('24.12.2025 12:00:00.000000') is None
+    # are monday and sunday in the same week and is the monday of the week found by the ordinals?
+    monday_ordinal = time_handler.get_day_ordinal(__expected_start_of_week__)
+    assert time_handler.get_week_ordinal(monday_ordinal) == time_handler.get_week_ordinal(monday_ordinal + 6)
+    assert time_handler.get_week_ordinal(monday_ordinal) + 1 == time_handler.get_week_ordinal(monday_ordinal + 7)
+    assert time_handler.get_monday_ordinal(time_handler.get_week_ordinal(monday_ordinal + 3)) == monday_ordinal
+    assert time_handler.get_datetime_from_ordinal(monday_ordinal) == __expected_start_of_week__
+    # are the periods counted per month over the year change?
+    assert time_handler.count_periods_per_month_by_ordinal(
+        time_handler.get_day_ordinal(datetime(2024, 12, 30)), time_handler.get_day_ordinal(datetime(2025, 2, 3)), 7) \
+           == {(2024, 12): 1, (2025, 1): 4}
 
 def test_habit_autoupdating():
     """
@@ -269,6 +305,19 @@ def test_habits_switch_user_handling():
     for current_habit in new_habits:
         assert current_habit.get_id() == 3 or current_habit.get_id() == 4
 
+def test_habits_get_habit():
+    """
+    checks the lookup of a single habit by its id, string ids are normalized to integer
+    """
+    assert Habits.get_habit(3).get_id() == 3
+    assert Habits.get_habit('4').get_id() == 4
+
+    with pytest.raises(habits_handler.HabitDoesNotExistException):
+        Habits.get_habit(1) # belongs to the previous user
+
+    with pytest.raises(habits_handler.MissingUserIdException):
+        Habits_without_user.get_habit(3)
+
 def test_habits_sorting_response():
     """
     checks the sorting functions
@@ -290,6 +339,12 @@ def test_habits_sorting_response():
     assert len(habits_by_breaks_last_month.keys()) == 2 and len(habits_by_breaks_last_month.get('habits')) == 2 and len(habits_by_breaks_last_month.get('breaks')) == 2 and habits_by_breaks_last_month.get('habits')[0].get_id() == 4
     assert len(habits_by_created) == 2 and habits_by_created[0].get_id() == 4
 
+    # top-k queries return the same order as the full sort
+    assert [current_habit.get_id() for current_habit in Habits.get_habits_by_streak(limit=1)] == [4]
+    assert Habits.get_habits_by_break(limit=1) == {'habits': [habits_by_break.get('habits')[0]], 'breaks': [2]}
+    assert Habits.get_habits_by_last_month_breaks(limit=5).get('breaks') == [2, 0]
+    assert [current_habit.get_id() for current_habit in Habits.get_habits_by_created(limit=1)] == [4]
+
 def test_habits_create():
     """
     tests create-habit behaviour (see tutor feedback)
@@ -411,4 +466,757 @@ def test_habits_delete():
 
 
     else:
-        raise Exception('Habits is not in testing-mode, something went wrong')
\ No newline at end of file
+        raise Exception('Habits is not in testing-mode, something went wrong')
+
+def test_db_connection_pool(tmp_path):
+    """
+    tests the shared connection pool: connection reuse, transaction commit and rollback
+    """
+    pool = db_handler.ConnectionPool(str(tmp_path / 'pool_test.db'), 1, 16)
+    pool.execute('CREATE TABLE pool_test (id INTEGER PRIMARY KEY AUTOINCREMENT, value TEXT)')
+
+    # INSERT returns the new row-id, the idle connection is reused for the next call
+    with pool.connection() as connection:
+        assert pool.execute('INSERT INTO pool_test (value) VALUES (?)', ('a',)) == 1
+    with pool.connection() as reused_connection:
+        assert reused_connection is connection
+
+    with pool.transaction():
+        pool.execute('INSERT INTO pool_test (value) VALUES (?)', ('b',))
+        pool.executemany('INSERT INTO pool_test (value) VALUES (?)', [('c',), ('d',)])
+
+    # a failing transaction must not leave any rows behind
+    with pytest.raises(ValueError):
+        with pool.transaction():
+            pool.execute('INSERT INTO pool_test (value) VALUES (?)', ('e',))
+            raise ValueError('rollback')
+
+    assert pool.execute('SELECT value FROM pool_test ORDER BY id', fetch=True) == [('a',), ('b',), ('c',), ('d',)]
+    pool.close()
+
+    # PRAGMA profile from habits.properties is applied to new connections
+    pragma_pool = db_handler.ConnectionPool(str(tmp_path / 'pool_test.db'), 1, 16, db_handler.get_pragmas())
+    assert pragma_pool.execute('PRAGMA journal_mode', fetch=True)[0][0].upper() == Const.get_db_journal_mode()
+    assert pragma_pool.execute('PRAGMA busy_timeout', fetch=True)[0][0] == Const.get_db_busy_timeout()
+    pragma_pool.close()
+
+
+def test_habits_cache_mutations(tmp_path):
+    """
+    tests that add, edit, delete and delete all keep the cached habits equal to the habits reloaded from the database
+    """
+    def habit_rows(habits):
+        return [(current_habit.get_id(), current_habit.get_title(), current_habit.get_description(),
+                 current_habit.get_periodicity(), current_habit.get_created()) for current_habit in habits]
+
+    for query_mode in ('MEMORY', 'SQL'):
+        database = str(tmp_path / 'cache_{}_test.db'.format(query_mode.lower()))
+        cache_habits = habits_handler.Habits(database, query_mode)
+        cache_habits.select_user('cache_user')
+        for index in range(3):
+            cache_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+        # the new habits are cached with the habit-id of the insert
+        assert [cache_habits.get_habit(habit_id).get_title() for habit_id in (1, 2, 3)] == \
+               ['habit 0', 'habit 1', 'habit 2']
+        cache_habits.edit_habit(2, 'edited', 'edited description')
+        cache_habits.delete_habit(1)
+        with pytest.raises(habits_handler.HabitDoesNotExistException):
+            cache_habits.get_habit(1)
+        # the list of the cached habits is rebuilt after the delete, in the order of the habit-ids
+        cache_habits.add_habit('habit 3', '', Const.get_periodicity_weekly())
+        assert [current_habit.get_id() for current_habit in cache_habits.get_habits()] == [2, 3, 4]
+        assert cache_habits.count_habits() == 3
+
+        reloaded_habits = habits_handler.Habits(database, query_mode)
+        reloaded_habits.select_user('cache_user')
+        assert habit_rows(cache_habits.get_habits()) == habit_rows(reloaded_habits.get_habits())
+        assert habit_rows(cache_habits.get_habits())[0][1:3] == ('edited', 'edited description')
+
+        cache_habits.delete_all_habits_for_user('cache_user')
+        reloaded_habits.select_user('cache_user')
+        assert cache_habits.get_habits() == () and reloaded_habits.get_habits() == ()
+        assert cache_habits.count_cached_habits() == 0
+
+def test_habit_datetime_fields():
+    """
+    tests that the date strings from the database are parsed once and check() and the break reset update the datetime
+    and the string of the dates
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    db_habit = habit.Habit(1, 'datetime_user', 'from db', '', Const.get_periodicity_daily(), '2025-02-25 08:00:00',
+                           '2025-02-26 00:00:00', '2025-02-27 09:30:00.123456', 2, 2, '{}', '2025-02-27', clock)
+    assert db_habit.get_created_datetime() == datetime(2025, 2, 25, 8)
+    assert db_habit.get_last_checked_datetime() == datetime(2025, 2, 27, 9, 30, 0, 123456)
+    assert db_habit.get_created() == '2025-02-25 08:00:00' and db_habit.get_last_checked() == '2025-02-27 09:30:00.123456'
+
+    # 3 missed days since the last check reset the streak, last_break is yesterday
+    assert db_habit.get_last_break_datetime() == datetime(2025, 3, 2)
+    assert db_habit.get_last_break() == '2025-03-02 00:00:00' and db_habit.get_streak() == 0
+
+    db_habit.check('datetime_user')
+    assert db_habit.get_last_checked_datetime() == clock.now() == datetime(2025, 3, 3, 12)
+    assert db_habit.get_last_checked() == '2025-03-03 12:00:00' and db_habit.get_streak() == 1
+    assert db_habit.get_longest_streak() == 2 and db_habit.is_checked()
+
+    never_checked = habit.Habit(2, 'datetime_user', 'new', '', Const.get_periodicity_weekly(), '2025-03-03 08:00:00',
+                                '', '', 0, 0, '{}', '', clock)
+    assert never_checked.get_last_checked_datetime() is None and never_checked.get_last_checked() == ''
+    assert never_checked.get_last_break_datetime() is None and never_checked.get_last_break() == ''
+    with pytest.raises(ValueError):
+        habit.Habit(3, 'datetime_user', 'broken', '', Const.get_periodicity_daily(), '2025-03-03 08:00:00', '',
+                    'yesterday', 0, 0, '{}', '', clock)
+
+def test_habit_evaluated_through():
+    """
+    tests that the breaks are only calculated once per day and the query to save them
+    """
+    created = str(__date_test_end__ - timedelta(days=10))
+    today_string = str(__expected_start_of_day__.date())
+
+    evaluated_habit = habit.Habit(5, Const.get_user_test_id_a(), 'evaluated', '', Const.get_periodicity_daily(),
+                                  created, '', '', 2, 2, '{}', today_string)
+    assert evaluated_habit.get_breaks_sum() == 0 and evaluated_habit.get_streak() == 2
+    assert evaluated_habit.is_evaluation_saved()
+    # habits without changes share the empty containers of the dirty tracking
+    assert not evaluated_habit.has_changes() and evaluated_habit.get_changed_breaks() == []
+    assert evaluated_habit.__changed_columns__ is habit.__no_changed_columns__
+    assert evaluated_habit.__changed_break_months__ is habit.__no_changed_break_months__
+
+    outdated_habit = habit.Habit(6, Const.get_user_test_id_a(), 'outdated', '', Const.get_periodicity_daily(),
+                                 created, '', '', 2, 2, '{}', str((__date_test_end__ - timedelta(days=3)).date()))
+    assert outdated_habit.get_breaks_sum() == 9 and outdated_habit.get_streak() == 0
+    assert not outdated_habit.is_evaluation_saved()
+    assert outdated_habit.get_evaluated_through() == today_string
+
+    query = outdated_habit.create_evaluation_query(Const.get_user_test_id_a())
+    assert 'evaluated_through' in query.get('query')
+    assert query.get('values')[3] == today_string and query.get('values')[4] == 6
+
+    with pytest.raises(habit.WrongUserException):
+        outdated_habit.create_evaluation_query(Const.get_user_test_id_b())
+
+    outdated_habit.set_title('renamed', Const.get_user_test_id_a())
+    outdated_habit.set_evaluation_saved()
+    assert outdated_habit.get_changed_columns() == ('title',) and outdated_habit.get_changed_breaks() == []
+    outdated_habit.set_changes_saved()
+    assert outdated_habit.__changed_columns__ is habit.__no_changed_columns__
+
+def test_habits_check_multiple():
+    """
+    tests checking multiple habits at once, unknown habit-ids must not check any habit
+    """
+    with pytest.raises(habits_handler.HabitDoesNotExistException):
+        Habits.check_habits([3, -1])
+    assert Habits.get_habit(3).is_checked() is False
+
+    # habit 4 is weekly and could already be checked this week, ids are normalized and only counted once
+    results = Habits.check_habits([3, '4', 3])
+    assert list(results.keys()) == [3, 4] and results.get(3) is True
+    assert Habits.check_habits([4, 3]) == {4: False, 3: False}
+    assert len(Habits.get_unchecked_habits()) == 0
+
+    with pytest.raises(habits_handler.MissingUserIdException):
+        Habits_without_user.check_habits([3])
+
+def test_habits_sql_query_mode(tmp_path):
+    """
+    tests if the sql query mode returns the same habits as the memory query mode and only loads the returned habits
+    """
+    database = str(tmp_path / 'query_mode_test.db')
+    memory_habits = habits_handler.Habits(database, 'MEMORY')
+    memory_habits.select_user('query_mode_user')
+    for index in range(6):
+        periodicity = Const.get_periodicity_daily() if index % 2 == 0 else Const.get_periodicity_weekly()
+        memory_habits.add_habit('habit {}'.format(index), '', periodicity)
+    pool = db_handler.get_pool(database)
+    pool.executemany('UPDATE habits SET streak = ?, longest_streak = ?, created_at = ? WHERE id = ?',
+                     [(index % 3, 6 - index, str(datetime(2025, 1, 10 - index, 8)), index + 1) for index in range(6)])
+
+    sql_habits = habits_handler.Habits(database, 'SQL')
+    sql_habits.select_user('query_mode_user')
+    assert sql_habits.count_habits() == 6 and len(sql_habits.__habits_index__) == 0
+
+    def habit_ids(habits):
+        return [current_habit.get_id() for current_habit in habits]
+
+    # sorting by streak in the memory query mode calculates and saves the breaks of all habits
+    memory_streak_ids = habit_ids(memory_habits.get_habits_by_streak(True, 2))
+    assert habit_ids(sql_habits.get_habits_by_streak(limit=2)) == memory_streak_ids
+    assert len(sql_habits.__habits_index__) == 2
+    assert habit_ids(sql_habits.get_habits_by_streak()) == habit_ids(memory_habits.get_habits_by_streak())
+    assert habit_ids(sql_habits.get_habits_by_longest_streak(limit=3)) \
+           == habit_ids(memory_habits.get_habits_by_longest_streak(limit=3))
+    assert habit_ids(sql_habits.get_habits_by_created(limit=3)) == habit_ids(memory_habits.get_habits_by_created(limit=3))
+    assert habit_ids(sql_habits.get_habits_by_periodicity(Const.get_periodicity_weekly())) \
+           == habit_ids(memory_habits.get_habits_by_periodicity(Const.get_periodicity_weekly()))
+    assert habit_ids(sql_habits.get_habits_by_break()['habits']) == habit_ids(memory_habits.get_habits_by_break()['habits'])
+
+    # loaded habits are reused, so changes are visible in all results
+    sql_habits.check_habit(1)
+    assert sql_habits.get_habit(1) is sql_habits.get_habits_by_created()[-1]
+    assert sql_habits.get_habit(1).is_checked()
+    with pytest.raises(habits_handler.HabitDoesNotExistException):
+        sql_habits.get_habit(100)
+    with pytest.raises(ValueError):
+        habits_handler.Habits(database, 'FILE')
+
+def test_habits_sql_query_mode_keeps_changes(tmp_path):
+    """
+    tests that the get-functions of the sql query mode do not drop the unsaved changes of cached habits
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    database = str(tmp_path / 'sql_changes_test.db')
+    sql_habits = habits_handler.Habits(database, 'SQL', clock)
+    sql_habits.select_user('sql_changes_user')
+    for index in range(3):
+        sql_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+    clock.advance(timedelta(days=2))
+
+    changed_habit = sql_habits.get_habit(1)
+    changed_habit.set_title('renamed', 'sql_changes_user')
+    changed_habit.check('sql_changes_user')
+    # the stale habits are reloaded before sorting, the changed habit is kept and written with them
+    assert sql_habits.get_habits_by_streak(limit=1)[0] is changed_habit
+    assert sql_habits.flush() == 0
+    assert db_handler.get_pool(database).execute('SELECT title, streak FROM habits WHERE id = 1', fetch=True) \
+           == [('renamed', 1)]
+
+    changed_habit.set_description('changed', 'sql_changes_user')
+    assert sql_habits.get_habits(True)[0] is changed_habit and sql_habits.get_habit(2) is not None
+    assert sql_habits.flush() == 1
+    reloaded_habits = habits_handler.Habits(database, 'SQL', clock)
+    reloaded_habits.select_user('sql_changes_user')
+    assert reloaded_habits.get_habit(1).get_description() == 'changed'
+
+def test_habits_iter_and_lazy_evaluation(tmp_path):
+    """
+    tests iter_habits() in both query modes and that the breaks are only calculated when they are accessed
+    """
+    created = str(__date_test_end__ - timedelta(days=10))
+    lazy_habit = habit.Habit(7, Const.get_user_test_id_a(), 'lazy', '', Const.get_periodicity_daily(),
+                             created, '', '', 2, 2, '{}', str((__date_test_end__ - timedelta(days=3)).date()))
+    assert lazy_habit.get_title() == 'lazy' and not lazy_habit.is_checked()
+    assert lazy_habit.__evaluation_pending__ and lazy_habit.is_evaluation_saved()
+    assert lazy_habit.get_streak() == 0 and lazy_habit.get_breaks_sum() == 9
+    assert not lazy_habit.__evaluation_pending__ and not lazy_habit.is_evaluation_saved()
+
+    database = str(tmp_path / 'iter_test.db')
+    memory_habits = habits_handler.Habits(database, 'MEMORY')
+    memory_habits.select_user('iter_user')
+    for index in range(5):
+        memory_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+    assert [current_habit.get_id() for current_habit in memory_habits.iter_habits()] == [1, 2, 3, 4, 5]
+
+    sql_habits = habits_handler.Habits(database, 'SQL')
+    sql_habits.select_user('iter_user')
+    cached_habit = sql_habits.get_habit(2)
+    iterated_habits = list(sql_habits.iter_habits(chunk_size=2))
+    assert [current_habit.get_title() for current_habit in iterated_habits] == \
+           ['habit {}'.format(index) for index in range(5)]
+    assert iterated_habits[1] is cached_habit and len(sql_habits.__habits_index__) == 1
+
+    # the connection is given back to the pool if the iteration is stopped early
+    habit_iterator = sql_habits.iter_habits(chunk_size=2)
+    next(habit_iterator)
+    habit_iterator.close()
+    assert sql_habits.count_habits() == 5
+    with pytest.raises(ValueError):
+        sql_habits.iter_habits(0)
+    with pytest.raises(habits_handler.MissingUserIdException):
+        Habits_without_user.iter_habits()
+
+def test_habits_save_lazy_evaluations(tmp_path):
+    """
+    tests that get_habits(), get_unchecked_habits() and iter_habits() write the breaks they calculated
+    """
+    for query_mode in ('MEMORY', 'SQL'):
+        clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+        database = str(tmp_path / 'lazy_{}_test.db'.format(query_mode.lower()))
+        pool = db_handler.get_pool(database)
+        lazy_habits = habits_handler.Habits(database, query_mode, clock)
+        lazy_habits.select_user('lazy_user')
+        for index in range(5):
+            lazy_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+
+        def evaluated_days():
+            return [row[0] for row in pool.execute('SELECT evaluated_through FROM habits ORDER BY id', fetch=True)]
+
+        # the calculated breaks are written per chunk, also if the iteration is stopped early
+        clock.advance(timedelta(days=1))
+        lazy_habits.select_user('lazy_user')
+        habit_iterator = lazy_habits.iter_habits(chunk_size=2)
+        for _ in range(3):
+            next(habit_iterator).get_streak()
+        assert evaluated_days()[:2] == ['2025-03-04'] * 2 and evaluated_days()[2] != '2025-03-04'
+        habit_iterator.close()
+        assert evaluated_days()[:3] == ['2025-03-04'] * 3 and evaluated_days()[3] != '2025-03-04'
+
+        clock.advance(timedelta(days=1))
+        lazy_habits.check_habit(1)
+        assert len(lazy_habits.get_unchecked_habits(True)) == 4 and evaluated_days() == ['2025-03-05'] * 5
+
+        # the missed day resets the streak of the checked habit
+        clock.advance(timedelta(days=2))
+        assert len(lazy_habits.get_habits(True)) == 5 and evaluated_days() == ['2025-03-07'] * 5
+        assert [row[0] for row in pool.execute('SELECT streak FROM habits ORDER BY id', fetch=True)] == [0] * 5
+
+def test_frozen_clock(tmp_path):
+    """
+    tests the calculations with a frozen clock and that a batch keeps its snapshot over midnight
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 23, 59, 59)) # monday
+    with clock.batch() as snapshot:
+        clock.advance(timedelta(seconds=1))
+        assert clock.snapshot() is snapshot and snapshot.get_today() == datetime(2025, 3, 3)
+    snapshot = clock.snapshot()
+    assert snapshot.get_today_string() == '2025-03-04' and snapshot.get_yesterday() == datetime(2025, 3, 3)
+    assert snapshot.get_monday() == datetime(2025, 3, 3) and snapshot.get_last_month() == datetime(2025, 2, 1)
+    assert time_handler.is_today(datetime(2025, 3, 4, 8), clock.now())
+
+    # daily habit created on the 25th of february, 7 days without a check
+    frozen_habit = habit.Habit(1, 'clock_user', 'frozen', '', Const.get_periodicity_daily(), '2025-02-25 08:00:00',
+                               '', '', 4, 4, '{}', '', clock)
+    assert frozen_habit.get_break_history() == {'2025': {'2': 3, '3': 3}}
+    assert frozen_habit.get_last_months_breaks() == 3 and frozen_habit.get_last_break() == '2025-03-03 00:00:00'
+    frozen_habit.check('clock_user')
+    assert frozen_habit.get_last_checked_datetime() == clock.now() and frozen_habit.get_streak() == 1
+
+    clock_habits = habits_handler.Habits(str(tmp_path / 'clock_test.db'), 'MEMORY', clock)
+    clock_habits.select_user('clock_user')
+    clock_habits.add_habit('weekly', '', Const.get_periodicity_weekly())
+    assert clock_habits.get_habit(1).get_created_datetime() == clock.now()
+    clock.advance(timedelta(weeks=3))
+    assert clock_habits.get_habits_by_break(True)['breaks'] == [2]
+    assert len(clock_habits.get_unchecked_habits()) == 1
+
+def test_habits_flush(tmp_path):
+    """
+    tests that flush() writes only the changed habits and their changed columns
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    database = str(tmp_path / 'flush_test.db')
+    flush_habits = habits_handler.Habits(database, 'MEMORY', clock)
+    flush_habits.select_user('flush_user')
+    for title in ('first', 'second', 'third'):
+        flush_habits.add_habit(title, '', Const.get_periodicity_daily())
+    clock.advance(timedelta(days=3))
+    flush_habits.select_user('flush_user')
+
+    flush_habits.get_habit(1).set_title('renamed', 'flush_user')
+    flush_habits.get_habit(2).check('flush_user')
+    assert flush_habits.get_habit(1).get_changed_columns() == ('title',)
+    assert flush_habits.get_habit(2).get_changed_columns() == ('last_break', 'last_checked', 'streak', 'longest_streak',
+                                                               'break_history', 'evaluated_through')
+    assert not flush_habits.get_habit(3).has_changes()
+    assert flush_habits.get_habit(1).create_changes_query('flush_user')['values'] == ('renamed', 1, 'flush_user')
+    with pytest.raises(habit.WrongUserException):
+        flush_habits.get_habit(1).create_changes_query('other_user')
+
+    assert flush_habits.flush() == 2
+    assert flush_habits.flush() == 0
+    flush_habits.__save_all_habits__()
+
+    reloaded_habits = habits_handler.Habits(database, 'MEMORY', clock)
+    reloaded_habits.select_user('flush_user')
+    assert reloaded_habits.get_habit(1).get_title() == 'renamed'
+    assert reloaded_habits.get_habit(2).get_evaluated_through() == '2025-03-06'
+    assert reloaded_habits.get_habit(2).is_checked() and reloaded_habits.get_habit(2).get_streak() == 1
+    assert reloaded_habits.get_habit(3).get_streak() == 0
+
+def test_habits_refresh_keeps_changes(tmp_path):
+    """
+    tests that reloading the habits with force_update or select_user() keeps the unsaved changes in both query modes
+    and that switching the user writes them
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    for query_mode in ('MEMORY', 'SQL'):
+        database = str(tmp_path / 'refresh_{}_test.db'.format(query_mode.lower()))
+        refresh_habits = habits_handler.Habits(database, query_mode, clock)
+        refresh_habits.select_user('refresh_user')
+        for index in range(3):
+            refresh_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+
+        changed_habit = refresh_habits.get_habit(2)
+        changed_habit.set_title('renamed', 'refresh_user')
+        changed_habit.check('refresh_user')
+        # get_habits() writes the calculated breaks together with the changes, they are reloaded afterward
+        assert refresh_habits.get_habits(True)[1] is changed_habit and not changed_habit.has_changes()
+        changed_habit.set_title('renamed again', 'refresh_user')
+        refresh_habits.select_user('refresh_user')
+        assert refresh_habits.get_habit(2) is changed_habit
+        assert refresh_habits.get_habits_by_streak(True)[0].get_title() == 'renamed again'
+        assert refresh_habits.get_habit(2).is_checked() and len(refresh_habits.get_unchecked_habits(True)) == 2
+
+        refresh_habits.get_habit(2).set_description('changed', 'refresh_user')
+        refresh_habits.select_user('other_user')
+        assert refresh_habits.count_cached_habits() == 0
+        reloaded_habits = habits_handler.Habits(database, query_mode, clock)
+        reloaded_habits.select_user('refresh_user')
+        assert reloaded_habits.get_habit(2).get_title() == 'renamed again' and reloaded_habits.get_habit(2).is_checked()
+        assert reloaded_habits.get_habit(2).get_description() == 'changed'
+
+def test_habits_store(tmp_path):
+    """
+    tests the cached sessions of the HabitsStore, the eviction by count and memory and the write-back on eviction
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    database = str(tmp_path / 'store_test.db')
+    store = habits_store.HabitsStore(database, 'MEMORY', clock, max_sessions=2, max_memory=10 ** 9)
+    for user_id in ('user_a', 'user_b'):
+        store.session(user_id).add_habit(user_id, '', Const.get_periodicity_daily())
+    assert store.session('user_a') is store.session('user_a')
+    memory = sum(store.session(user_id).get_memory_estimate() for user_id in ('user_b', 'user_a'))
+    assert store.get_stats() == {'sessions': 2, 'memory': memory, 'hits': 4, 'misses': 2, 'evictions': 0}
+
+    # user_b is the least recently used session, its check is written when it is evicted
+    store.session('user_b').get_habit(2).check('user_b')
+    store.session('user_a')
+    store.session('user_c')
+    assert store.get_stats()['evictions'] == 1
+    check_habits = habits_handler.Habits(database, 'MEMORY', clock)
+    check_habits.select_user('user_b')
+    assert check_habits.get_habit(2).is_checked()
+
+    # a new day selects the user again, so the cached habits are evaluated for it
+    session_a = store.session('user_a')
+    clock.advance(timedelta(days=2))
+    assert store.session('user_a') is session_a and session_a.get_habit(1).get_streak() == 0
+
+    # only the current session is kept if the memory limit is too small
+    small_store = habits_store.HabitsStore(database, 'MEMORY', clock, max_sessions=10, max_memory=1)
+    small_store.session('user_a')
+    small_store.session('user_b')
+    assert small_store.get_stats()['sessions'] == 1 and small_store.get_stats()['evictions'] == 1
+    with pytest.raises(ValueError):
+        habits_store.HabitsStore(database, max_sessions=0)
+
+    # the estimate grows with the break history, the session is estimated again by the next call of session()
+    memory = session_a.get_memory_estimate()
+    clock.advance(timedelta(days=60))
+    old_habit = store.session('user_a').get_habit(1)
+    assert old_habit.get_breaks_sum() == 61
+    store.session('user_c')
+    assert session_a.get_memory_estimate() > memory
+    assert store.get_stats()['memory'] == sum(store.session(user_id).get_memory_estimate()
+                                              for user_id in ('user_a', 'user_c'))
+
+def test_thread_safe_habits_store(tmp_path):
+    """
+    tests concurrent checks and queries of several users on the executor of the ThreadSafeHabitsStore
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    database = str(tmp_path / 'thread_safe_store_test.db')
+    store = habits_store.ThreadSafeHabitsStore(database, 'MEMORY', clock, max_sessions=3, max_workers=4)
+    user_ids = ['user_{}'.format(index) for index in range(6)]
+    habit_ids = {}
+    for user_id in user_ids:
+        with store.locked_session(user_id) as current_habits:
+            for index in range(5):
+                current_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+            habit_ids[user_id] = [current_habit.get_id() for current_habit in current_habits.get_habits()]
+    # session() waits for the lock of the user like locked_session() and returns the same cached Habits
+    with store.locked_session(user_ids[-1]) as locked_habits:
+        sessions = []
+        session_thread = threading.Thread(target=lambda: sessions.append(store.session(user_ids[-1])))
+        session_thread.start()
+        session_thread.join(timeout=0.2)
+        assert session_thread.is_alive()
+    session_thread.join()
+    assert len(sessions) == 1 and sessions[0] is locked_habits and len(locked_habits.get_habits()) == 5
+    with pytest.raises(ValueError):
+        store.submit_query(user_ids[0], 'delete_habit', 1)
+
+    # the sessions are evicted while the checks of other users are running
+    futures = [store.submit_check(user_id, habit_id) for habit_index in range(5) for user_id in user_ids
+               for habit_id in (habit_ids[user_id][habit_index],)]
+    for future in futures:
+        future.result()
+    streaks = [store.submit_query(user_id, 'get_habits_by_streak', limit=1) for user_id in user_ids]
+    assert [future.result()[0].get_streak() for future in streaks] == [1] * len(user_ids)
+    assert store.get_stats()['sessions'] <= 3 and store.get_stats()['evictions'] > 0
+    store.shutdown()
+
+    check_habits = habits_handler.Habits(database, 'MEMORY', clock)
+    for user_id in user_ids:
+        check_habits.select_user(user_id)
+        assert len(check_habits.get_unchecked_habits()) == 0
+
+def test_thread_safe_habits_store_readers(tmp_path):
+    """
+    tests that the habits returned by submit_query() are evaluated before the lock of the user is released, while
+    other threads check and query the same user
+    """
+    for query_mode in ('MEMORY', 'SQL'):
+        clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+        database = str(tmp_path / 'readers_{}_test.db'.format(query_mode.lower()))
+        store = habits_store.ThreadSafeHabitsStore(database, query_mode, clock, max_workers=4)
+        with store.locked_session('reader') as current_habits:
+            for index in range(20):
+                current_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+        # the session is loaded again by the next call, all habits have to be evaluated for the new day
+        clock.advance(timedelta(days=3))
+
+        # the checks calculate the breaks of the last 10 habits, the first 10 habits are only read
+        checks = []
+        queries = []
+        for habit_id in range(1, 11):
+            queries.append(store.submit_query('reader', 'get_habits_by_created', limit=10))
+            queries.append(store.submit_query('reader', 'get_habit', habit_id))
+            checks.append(store.submit_check('reader', habit_id + 10))
+        returned_habits = []
+        for future in queries:
+            result = future.result()
+            returned_habits.extend(result if isinstance(result, tuple) else (result,))
+        assert {current_habit.get_id() for current_habit in returned_habits} == set(range(1, 11))
+        for current_habit in returned_habits:
+            # reading a value calculates the pending breaks, they have to be calculated already
+            assert not current_habit.__evaluation_pending__
+            assert current_habit.get_evaluated_through() == '2025-03-06'
+        for future in checks:
+            future.result()
+        assert store.submit_query('reader', 'count_habits').result() == 20
+        store.shutdown()
+
+def test_async_handlers(tmp_path):
+    """
+    tests the asyncio front ends with a runner that only hands one call at a time to its threads
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    runner = async_handler.AsyncRunner(max_workers=2, max_pending=1)
+
+    async def run_async_handlers():
+        async_users = async_user_handler.AsyncUserHandler(str(tmp_path / 'async_users.db'), runner)
+        user_ids = await asyncio.gather(*[async_users.create_user('async user {}'.format(index))
+                                          for index in range(4)])
+        assert sorted(current_user.get_user_id() for current_user in await async_users.get_all_users()) == [1, 2, 3, 4]
+
+        async def add_and_check(user_id):
+            async_habits = async_habits_handler.AsyncHabits(str(tmp_path / 'async_habits.db'), 'MEMORY', clock, runner)
+            await async_habits.select_user(str(user_id))
+            # the calls of one object are done in order, even if they are not awaited one after another
+            await asyncio.gather(*[async_habits.add_habit('habit {}'.format(index), '', Const.get_periodicity_daily())
+                                   for index in range(3)])
+            checked = await asyncio.gather(*[async_habits.check_habit(current_habit.get_id())
+                                             for current_habit in await async_habits.get_habits()])
+            with pytest.raises(habits_handler.HabitDoesNotExistException):
+                await async_habits.check_habit(1000)
+            return len(checked), len(await async_habits.get_unchecked_habits())
+
+        assert await asyncio.gather(*[add_and_check(user_id) for user_id in user_ids]) == [(3, 0)] * 4
+
+        # the returned habits are evaluated on the thread of the runner
+        clock.advance(timedelta(days=2))
+        sorting_habits = async_habits_handler.AsyncHabits(str(tmp_path / 'async_habits.db'), 'SQL', clock, runner)
+        await sorting_habits.select_user(str(user_ids[0]))
+        returned_habits = list(await sorting_habits.get_habits_by_created())
+        single_habits = async_habits_handler.AsyncHabits(str(tmp_path / 'async_habits.db'), 'SQL', clock, runner)
+        await single_habits.select_user(str(user_ids[0]))
+        returned_habits.append(await single_habits.get_habit(returned_habits[0].get_id()))
+        assert len(returned_habits) == 4
+        assert not any(current_habit.__evaluation_pending__ for current_habit in returned_habits)
+
+    asyncio.run(run_async_handlers())
+    runner.shutdown()
+
+def test_db_migrations(tmp_path):
+    """
+    tests the migration of a database created before versioning and of a new database
+    """
+    pool = db_handler.ConnectionPool(str(tmp_path / 'migration_test.db'), 1, 16)
+    # habits table as it was created before evaluated_through and versioning existed
+    pool.execute('''CREATE TABLE habits (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                    title TEXT NOT NULL, description TEXT, periodicity TEXT NOT NULL, created_at TEXT NOT NULL,
+                    deactivated BIT DEFAULT 0, last_break TEXT, last_checked TEXT, streak INTEGER DEFAULT 0,
+                    longest_streak INTEGER DEFAULT 0, break_history TEXT)''')
+
+    with pool.connection() as connection:
+        latest_version = migration_handler.migrate_habits_db(connection)
+        # migrating again does not change anything
+        assert migration_handler.migrate_habits_db(connection) == latest_version
+
+    assert pool.execute('PRAGMA user_version', fetch=True)[0][0] == latest_version
+    assert 'evaluated_through' in [column[1] for column in pool.execute('PRAGMA table_info(habits)', fetch=True)]
+    assert 'habits_active_user_id' in [index[1] for index in pool.execute('PRAGMA index_list(habits)', fetch=True)]
+    # the sorted queries of the sql query mode are read in index order without sorting
+    for order_by, index_name in (('streak DESC, id', 'habits_active_user_streak'),
+                                 ('longest_streak DESC, id', 'habits_active_user_longest_streak'),
+                                 ('created_at, id', 'habits_active_user_created')):
+        query_plan = str(pool.execute('''EXPLAIN QUERY PLAN SELECT * FROM habits WHERE user_id = ? AND deactivated = 0
+                                         ORDER BY {} LIMIT 5'''.format(order_by), ('user',), True))
+        assert index_name in query_plan and 'TEMP B-TREE' not in query_plan
+
+    new_pool = db_handler.ConnectionPool(str(tmp_path / 'migration_test_users.db'), 1, 16)
+    with new_pool.connection() as connection:
+        assert migration_handler.migrate_users_db(connection) == 1
+    assert new_pool.execute("INSERT INTO users (name) VALUES ('user')") == 1
+
+    pool.close()
+    new_pool.close()
+
+def test_db_prepared_once(tmp_path):
+    """
+    tests that the migrations and the break storage conversion are only checked by the first handler of a database
+    """
+    database = str(tmp_path / 'prepare_test.db')
+    habits_handler.Habits(database, 'MEMORY')
+    statements = []
+    with db_handler.get_pool(database).connection() as connection:
+        connection.set_trace_callback(statements.append)
+        habits_handler.Habits(database, 'SQL')
+        habits_store.HabitsStore(database, 'MEMORY').session('prepare_user')
+        connection.set_trace_callback(None)
+    assert not any('user_version' in statement or 'settings' in statement for statement in statements)
+
+def test_break_storage_conversion(tmp_path):
+    """
+    tests the conversion of the break history between the json column and the habit_breaks table
+    """
+    pool = db_handler.ConnectionPool(str(tmp_path / 'break_storage_test.db'), 1, 16)
+    break_history = {'2024': {'11': 3, '12': 31}, '2025': {'1': 4}}
+    with pool.connection() as connection:
+        migration_handler.migrate_habits_db(connection)
+        connection.execute('''INSERT INTO habits (user_id, title, periodicity, created_at, break_history)
+                              VALUES (?, ?, ?, ?, ?)''', ('user', 'title', '0', '2024-11-01 00:00:00',
+                                                          json.dumps(break_history)))
+        connection.execute('''INSERT INTO habits (user_id, title, periodicity, created_at, break_history)
+                              VALUES (?, ?, ?, ?, ?)''', ('user', 'title', '0', '2024-11-01 00:00:00', '{}'))
+
+        assert not migration_handler.convert_break_storage(connection, 'JSON')
+        assert migration_handler.convert_break_storage(connection, 'TABLE')
+        assert connection.execute('SELECT year, month, count FROM habit_breaks WHERE habit_id = 1 ORDER BY year, month'
+                                  ).fetchall() == [(2024, 11, 3), (2024, 12, 31), (2025, 1, 4)]
+        assert connection.execute('SELECT COUNT(*) FROM habits WHERE break_history IS NOT NULL').fetchone()[0] == 0
+        query_plan = connection.execute('''EXPLAIN QUERY PLAN SELECT habit_id, count FROM habit_breaks
+                                           WHERE year = 2024 AND month = 12''').fetchall()
+        assert 'COVERING INDEX habit_breaks_month' in str(query_plan)
+
+        assert migration_handler.convert_break_storage(connection, 'JSON')
+        assert [json.loads(row[0]) for row in connection.execute('SELECT break_history FROM habits ORDER BY id')
+                ] == [break_history, {}]
+        assert connection.execute('SELECT COUNT(*) FROM habit_breaks').fetchone()[0] == 0
+
+        # valid json which is not a break history is skipped like an unparsable string
+        for invalid_history in ('null', '[]', '5', '{"2024": 3}', 'not json'):
+            connection.execute('''INSERT INTO habits (user_id, title, periodicity, created_at, break_history)
+                                  VALUES (?, ?, ?, ?, ?)''', ('user', 'title', '0', '2024-11-01 00:00:00',
+                                                              invalid_history))
+        assert migration_handler.convert_break_storage(connection, 'TABLE')
+        assert connection.execute('SELECT COUNT(*) FROM habit_breaks').fetchone()[0] == 3
+    pool.close()
+
+    for invalid_history in ('null', '[]', '5'):
+        invalid_habit = habit.Habit(1, 'user', 'title', '', Const.get_periodicity_daily(), '2024-11-01 00:00:00', '',
+                                    '', 0, 0, invalid_history)
+        assert isinstance(invalid_habit.get_break_history(), dict)
+
+    # a habit loaded from the table gets the same break history and reports the months changed by the calculation
+    created = str(time_handler.get_start_of_day(datetime.today()) - timedelta(days=3))
+    test_habit = habit.Habit(1, 'user', 'title', '', Const.get_periodicity_daily(), created, '', '', 0, 0, {})
+    yesterday = datetime.today() - timedelta(days=1)
+    assert test_habit.get_breaks_sum() == 2
+    assert sum(count for _, _, count in test_habit.get_changed_breaks()) == 2
+    assert (yesterday.year, yesterday.month) in [(year, month) for year, month, _ in test_habit.get_changed_breaks()]
+    assert test_habit.create_evaluation_query('user', False)['values'][2] is None
+    test_habit.set_evaluation_saved()
+    assert test_habit.get_changed_breaks() == []
+
+def __reference_break_catch_up__(periodicity, created, last_break, last_checked, break_history):
+    """
+    day-by-day reference implementation of the break calculation in Habit.__init__ for the equivalence test
+
+    :return: tuple of break_history, last_break and if the streak was reset
+    """
+    break_history = json.loads(break_history)
+    today = time_handler.get_start_of_day(datetime.today())
+    yesterday = today - timedelta(days=1)
+    last_checked_date = time_handler.get_start_of_day(
+        time_handler.parse_string_to_datetime(last_checked if len(last_checked) != 0 else created))
+    last_interaction_date = last_checked_date
+    if len(last_break) != 0:
+        last_break_date = time_handler.get_start_of_day(time_handler.parse_string_to_datetime(last_break))
+        if last_break_date > last_checked_date:
+            last_interaction_date = last_break_date
+
+    if periodicity == Const.get_periodicity_daily():
+        step, limit, current_date, end_date = timedelta(days=1), 3650, last_interaction_date + timedelta(days=1), today
+    else:
+        step, limit = timedelta(days=7), 420
+        current_date = time_handler.get_start_of_week(last_interaction_date) + step
+        end_date = time_handler.get_start_of_week(yesterday) if today.weekday() != 0 else today
+
+    counter = 0
+    while counter <= limit and current_date < end_date:
+        year_history = break_history.setdefault(str(current_date.year), {})
+        year_history[str(current_date.month)] = year_history.get(str(current_date.month), 0) + 1
+        counter += 1
+        current_date += step
+
+    return break_history, (str(yesterday) if counter != 0 else last_break), counter != 0
+
+def test_break_catch_up_equivalence():
+    """
+    property test: the per-month break calculation of Habit.__init__ has to match the day-by-day calculation
+    for random dates, periodicities and existing break histories (including the ~10 year limit)
+    """
+    randomizer = random.Random(2025)
+    now = datetime.now()
+
+    for _ in range(500):
+        created_date = now - timedelta(days=randomizer.randint(0, 5000), seconds=randomizer.randint(0, 86399))
+        days_since_created = (now - created_date).days
+        last_checked = str(created_date + timedelta(days=randomizer.randint(0, days_since_created))) \
+            if randomizer.random() < 0.7 else ''
+        last_break = str(created_date + timedelta(days=randomizer.randint(0, days_since_created))) \
+            if randomizer.random() < 0.5 else ''
+        periodicity = randomizer.choice([Const.get_periodicity_daily(), Const.get_periodicity_weekly()])
+        break_history = json.dumps({str(created_date.year): {str(created_date.month): randomizer.randint(0, 3)}})
+
+        expected_history, expected_last_break, expected_reset = __reference_break_catch_up__(
+            periodicity, str(created_date), last_break, last_checked, break_history)
+        current_habit = habit.Habit(1, Const.get_user_test_id_a(), 'catch up', '', periodicity, str(created_date),
+                                    last_break, last_checked, 3, 3, break_history)
+
+        assert current_habit.get_break_history() == expected_history
+        assert current_habit.get_last_break() == expected_last_break
+        assert current_habit.get_streak() == (0 if expected_reset else 3)
+
+def test_rollover(tmp_path):
+    """
+    tests that the rollover writes the same breaks as loading the habits and only evaluates stale habits
+    """
+    clock = time_handler.FrozenClock(datetime(2025, 3, 3, 12))
+    database = str(tmp_path / 'rollover_test.db')
+    rollover_habits = habits_handler.Habits(database, 'MEMORY', clock)
+    for user_id in ('user_b', 'user_a'):
+        rollover_habits.select_user(user_id)
+        rollover_habits.add_habit('daily', '', Const.get_periodicity_daily())
+        rollover_habits.add_habit('weekly', '', Const.get_periodicity_weekly())
+        rollover_habits.check_habit(rollover_habits.get_habits()[0].get_id())
+    rollover_habits.delete_habit(4)
+
+    progress = []
+    stats = rollover_handler.rollover(database, max_workers=2, batch_size=1, now=datetime(2025, 3, 24, 8),
+                                      progress=progress.append)
+    assert (stats['users'], stats['habits'], stats['failed']) == (2, 3, 0) and len(progress) == 2
+    assert rollover_handler.rollover(database, max_workers=1, now=datetime(2025, 3, 24, 20))['habits'] == 0
+
+    clock.set_now(datetime(2025, 3, 24, 8))
+    rollover_habits.select_user('user_a')
+    rolled_habit = rollover_habits.get_habit(3)
+    assert rolled_habit.get_evaluated_through() == '2025-03-24' and rolled_habit.is_evaluation_saved()
+    assert rolled_habit.get_breaks_sum() == 20 and rolled_habit.get_streak() == 0
+    rollover_habits.select_user('user_b')
+    assert [current_habit.get_breaks_sum() for current_habit in rollover_habits.get_habits()] == [20, 2]
+
+    # a habit checked between reading and writing a batch keeps the check, the other habits are written
+    pool = db_handler.get_pool(database)
+    rows = list(rollover_handler.__iter_stale_rows__(pool, '2025-03-31'))
+    queries, break_rows, failed = rollover_handler.__evaluate_batch__(rows, None, datetime(2025, 3, 31, 8))
+    assert [row[0] for row in rows] == [3, 1, 2] and break_rows == [] and failed == 0
+    clock.set_now(datetime(2025, 3, 31, 8))
+    rollover_habits.select_user('user_a')
+    rollover_habits.check_habit(3)
+    rollover_handler.__write_batch__(pool, queries, [(3, 2025, 3, 99)], '2025-03-31')
+    assert pool.execute('SELECT id, streak, evaluated_through FROM habits WHERE id IN (1, 3) ORDER BY id', (),
+                        True) == [(1, 0, '2025-03-31'), (3, 1, '2025-03-31')]
+    assert pool.execute('SELECT COUNT(*) FROM habit_breaks', (), True)[0][0] == 0
@@ -0,0 +1,65 @@
+import asyncio
+from helper import async_handler
+from users import user_handler
+
+
+class AsyncUserHandler:
+    """
+    asyncio front end of the UserHandler, the calls run on the thread pool of an AsyncRunner.
+    the UserHandler only keeps the shared connection pool, so its calls can run at the same time.
+
+    provided functions:
+    create_user()
+    rename_user()
+    delete_user()
+    get_all_users()
+    """
+
+    def __init__(self, database='./users/user.db', runner=None):
+        """
+        initial function, the UserHandler is created on the thread pool by the first call because creating it
+        migrates the database
+
+        :param database: path to the database file (optional, default ./users/user.db)
+        :param runner: AsyncRunner (optional, default async_handler.get_async_runner())
+        """
+        self.__database__ = database
+        self.__runner__ = runner if runner is not None else async_handler.get_async_runner()
+        self.__user_handler__ = None
+        self.__init_lock__ = asyncio.Lock()
+
+    async def __run__(self, function_name, *args):
+        """
+        calls the function of the UserHandler on the runner, the UserHandler is created once by the first call
+
+        :return: result of the function
+        """
+        if self.__user_handler__ is None:
+            async with self.__init_lock__:
+                if self.__user_handler__ is None:
+                    self.__user_handler__ = await self.__runner__.run(user_handler.UserHandler, self.__database__)
+        return await self.__runner__.run(getattr(self.__user_handler__, function_name), *args)
+
+    async def create_user(self, name):
+        """
+        see UserHandler.create_user()
+        """
+        return await self.__run__('create_user', name)
+
+    async def rename_user(self, user_id, name):
+        """
+        see UserHandler.rename_user()
+        """
+        return await self.__run__('rename_user', user_id, name)
+
+    async def delete_user(self, user_id):
+        """
+        see UserHandler.delete_user()
+        """
+        return await self.__run__('delete_user', user_id)
+
+    async def get_all_users(self):
+        """
+        see UserHandler.get_all_users()
+        """
+        return await self.__run__('get_all_users')
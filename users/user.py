@@ -6,8 +6,7 @@ class User:
     get_user_id()
     get_name()
     """
-    __name__ = ''
-    __user_id__ = ''
+    __slots__ = ('__user_id__', '__name__')
 
     def __init__(self, user_id, name):
         self.__user_id__ = user_id
@@ -1,8 +1,9 @@
-import sqlite3
 import logging
-from helper import const_handler
+from helper import const_handler, db_handler, log_handler, migration_handler
 from users import user
 
+log_handler.setup_logging()
+
 
 class UserHandler:
     """
@@ -16,12 +17,10 @@ class UserHandler:
     """
 
     const = const_handler.ConstHandler()
-    logging.basicConfig(level=const.get_logger_log_level(), format=const.get_logger_log_format(),
-                        filename=const.get_logger_log_filename(), filemode=const.get_logger_log_filemode(), force=True)
 
     def __sql_call__(self, query, params=(), fetch=False):
         """
-        private function for sql-handling
+        private function for sql-handling, uses the shared connection pool of the users database
 
         :param query: sql query as string
         :param params: tuple of parameters to pass to sql query
@@ -29,25 +28,17 @@ class UserHandler:
 
         :return: tuple of results from sql query
         """
-        return_value = True
-
-        connection = sqlite3.connect('./users/user.db')
-        cursor = connection.cursor()
-        cursor.execute(query, params)
-        connection.commit()
-        if fetch:
-            return_value = cursor.fetchall()
-        elif query.startswith('INSERT'):
-            return_value = cursor.lastrowid # returns the new users-id when created
-        connection.close()
-        return return_value
-
-    def __init__(self):
-        """initial function, creates the database if it doesn't exist yet."""
-        query = '''CREATE TABLE IF NOT EXISTS users (
-                   id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, deactivated BIT DEFAULT 0)'''
+        return self.__pool__.execute(query, params, fetch) # returns the new users-id when created
 
-        self.__sql_call__(query)
+    def __init__(self, database='./users/user.db'):
+        """
+        initial function, creates or migrates the database once per database file
+        (see migration_handler.prepare_users_db()).
+
+        :param database: path to the database file (optional, default ./users/user.db)
+        """
+        self.__pool__ = db_handler.get_pool(database)
+        migration_handler.prepare_users_db(self.__pool__)
 
     def create_user(self, name):
         """